@@ -1,365 +1,1574 @@
-import os
-import google.generativeai as genai
-from flask import Flask, render_template, request, redirect, url_for, flash, send_from_directory, abort
-from werkzeug.utils import secure_filename
-from PIL import Image as PILImage # Use PILImage to avoid conflict
-import io
-import time
-import re # Import regex for parsing Gemini responses
-from datetime import datetime
-
-# Import config and models
-try:
-    from config import (
-        GEMINI_TEXT_API_KEY, GEMINI_IMAGE_API_KEY, SECRET_KEY, DATABASE_URI,
-        UPLOAD_FOLDER, ALLOWED_EXTENSIONS, GEMINI_MODEL_NAME,
-        DESCRIPTION_SIMILARITY_THRESHOLD, METADATA_SIMILARITY_THRESHOLD,
-        IMAGE_SIMILARITY_THRESHOLD
-    )
-except ImportError as e:
-    print(f"CRITICAL ERROR: Could not import from config.py: {e}")
-    print("Ensure config.py exists and has correct variables.")
-    exit()
-
-try:
-    from models import db, Item
-except ImportError as e:
-    print(f"CRITICAL ERROR: Could not import from models.py: {e}")
-    print("Ensure models.py exists and defines db and Item.")
-    exit()
-
-# --- Flask App Setup ---
-app = Flask(__name__)
-try:
-    app.config['SECRET_KEY'] = SECRET_KEY
-    app.config['SQLALCHEMY_DATABASE_URI'] = DATABASE_URI
-    app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
-    app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024 # 16MB max upload size
-    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-    # Store extensions in config for allowed_file helper
-    app.config['ALLOWED_EXTENSIONS'] = ALLOWED_EXTENSIONS
-    print("Flask app configured.")
-except Exception as e:
-    print(f"CRITICAL ERROR: Failed to set Flask config values: {e}")
-    exit()
-
-# Initialize SQLAlchemy
-try:
-    db.init_app(app)
-    print("SQLAlchemy initialized with app.")
-except Exception as e:
-    print(f"CRITICAL ERROR: db.init_app(app) failed: {e}")
-    exit()
-
-# --- Gemini API Configuration ---
-print("--- Attempting Gemini API Configuration ---")
-try:
-    genai.configure(api_key=GEMINI_TEXT_API_KEY)
-    print(f"Gemini API configured successfully (using text key ending ...{GEMINI_TEXT_API_KEY[-4:]}).")
-except Exception as e:
-    print(f"ERROR during genai.configure: {e}. Check GEMINI_TEXT_API_KEY.")
-
-text_model = None
-vision_model = None
-try:
-    text_model = genai.GenerativeModel(GEMINI_MODEL_NAME)
-    vision_model = genai.GenerativeModel(GEMINI_MODEL_NAME) # Assumes same model okay
-    print(f"Gemini models ('{GEMINI_MODEL_NAME}') initialized successfully.")
-except Exception as e:
-     print(f"ERROR creating Gemini models ('{GEMINI_MODEL_NAME}'): {e}. AI features will likely fail.")
-print("--- Finished Gemini API Configuration Attempt ---")
-
-# --- Helper Functions ---
-
-def allowed_file(filename):
-    """Checks if the file extension is allowed."""
-    return '.' in filename and \
-           filename.rsplit('.', 1)[1].lower() in app.config['ALLOWED_EXTENSIONS']
-
-def generate_description_gemini(image_path):
-    """Generates a description for an image using Gemini."""
-    if not text_model:
-        print("Attempted to generate description, but text_model is not available.")
-        return "Error: Gemini text model not initialized."
-    if not os.path.exists(image_path):
-        print(f"Image file not found at path: {image_path}")
-        return "Error: Image file not found."
-
-    try:
-        print(f"Generating description for: {os.path.basename(image_path)}")
-        img = PILImage.open(image_path)
-        if img.mode != 'RGB': img = img.convert('RGB')
-        prompt = "Describe this item in detail for a lost and found platform. Focus on visual characteristics like type, color, material, shape, and any unique markings."
-        contents = [prompt, img]
-        response = text_model.generate_content(contents)
-        print(f"Gemini Description Response: {response.text[:100]}...")
-        return response.text.strip() if hasattr(response, 'text') and response.text else "AI could not generate a description."
-    except Exception as e:
-        print(f"Error generating description with Gemini: {e}")
-        error_message = f"Error generating AI description: {type(e).__name__}."
-        if "API key" in str(e): error_message = "Error: Invalid/missing Gemini API key (Text)."
-        elif "quota" in str(e).lower(): error_message = "Error: Gemini API quota exceeded."
-        elif "DeadlineExceeded" in str(e): error_message = "Error: Gemini API request timed out."
-        elif "ResourceExhausted" in str(e): error_message = "Error: Gemini API resource exhausted."
-        return error_message
-
-def compare_descriptions_gemini(desc1, desc2):
-    """Compares two descriptions for semantic similarity using Gemini."""
-    if not text_model:
-        print("Attempted description comparison, but text_model is not available.")
-        return 0.0
-    if not desc1 or not desc2: return 0.0
-
-    try:
-        print("Comparing descriptions...")
-        prompt = f"""
-        On a scale of 0.0 to 1.0, how semantically similar are these descriptions?
-        1: "{desc1}"
-        2: "{desc2}"
-        Respond ONLY with the numerical score (e.g., 0.75).
-        """
-        response = text_model.generate_content(prompt)
-        print(f"Gemini Description Similarity Response: {response.text}")
-        try:
-            match = re.search(r"[-+]?\d*\.\d+|\d+", response.text)
-            if match:
-                similarity = float(match.group())
-                return max(0.0, min(1.0, similarity))
-            else:
-                 print(f"Warning: Could not parse number from description similarity response: {response.text}")
-                 return 0.0
-        except (ValueError, AttributeError) as parse_err:
-            print(f"Warning: Error parsing similarity score ({parse_err}): {response.text}")
-            return 0.0
-    except Exception as e:
-        print(f"Error comparing descriptions with Gemini: {e}")
-        return 0.0
-
-def compare_images_gemini(image_path1, image_path2):
-    """Compares two images for visual similarity using Gemini Vision."""
-    if not vision_model:
-        print("Attempted image comparison, but vision_model is not available.")
-        return 0.0
-    if not os.path.exists(image_path1): print(f"Image file 1 not found: {image_path1}"); return 0.0
-    if not os.path.exists(image_path2): print(f"Image file 2 not found: {image_path2}"); return 0.0
-
-    try:
-        print(f"Comparing images: {os.path.basename(image_path1)} and {os.path.basename(image_path2)}")
-        img1 = PILImage.open(image_path1); img2 = PILImage.open(image_path2)
-        if img1.mode != 'RGB': img1 = img1.convert('RGB')
-        if img2.mode != 'RGB': img2 = img2.convert('RGB')
-        prompt = """
-        On a scale of 0.0 to 1.0, how visually similar are the items in these two images?
-        Respond ONLY with the numerical score (e.g., 0.90).
-        """
-        contents = [prompt, img1, img2]
-        response = vision_model.generate_content(contents)
-        print(f"Gemini Image Similarity Response: {response.text}")
-        try:
-            match = re.search(r"[-+]?\d*\.\d+|\d+", response.text)
-            if match:
-                similarity = float(match.group())
-                return max(0.0, min(1.0, similarity))
-            else:
-                 print(f"Warning: Could not parse number from image similarity response: {response.text}")
-                 return 0.0
-        except (ValueError, AttributeError) as parse_err:
-            print(f"Warning: Error parsing image similarity score ({parse_err}): {response.text}")
-            return 0.0
-    except Exception as e:
-        print(f"Error comparing images with Gemini: {e}")
-        return 0.0
-
-def calculate_metadata_similarity(item_meta1, item_meta2):
-    """Calculates similarity based on item type, color, brand, location."""
-    score = 0; max_possible_score = 0
-    # Item Type (Exact Match, High Weight)
-    max_possible_score += 1.5
-    if item_meta1.get("item_type") and item_meta1["item_type"] == item_meta2.get("item_type"): score += 1.5
-    # Color (Partial Match)
-    max_possible_score += 1.0
-    if item_meta1.get("color") and item_meta1["color"] == item_meta2.get("color"): score += 1.0
-    elif item_meta1.get("color") and item_meta2.get("color") and (item_meta1["color"] in item_meta2["color"] or item_meta2["color"] in item_meta1["color"]): score += 0.5
-    # Brand (Partial Match, Bonus if both missing)
-    max_possible_score += 1.0
-    if item_meta1.get("brand") and item_meta1["brand"] == item_meta2.get("brand"): score += 1.0
-    elif item_meta1.get("brand") and item_meta2.get("brand") and (item_meta1["brand"] in item_meta2["brand"] or item_meta2["brand"] in item_meta1["brand"]): score += 0.5
-    elif not item_meta1.get("brand") and not item_meta2.get("brand"): score += 0.25
-    # Location (Simple Substring Match)
-    max_possible_score += 1.0
-    if item_meta1.get("location") and item_meta1["location"] == item_meta2.get("location"): score += 1.0
-    elif item_meta1.get("location") and item_meta2.get("location") and (item_meta1["location"] in item_meta2["location"] or item_meta2["location"] in item_meta1["location"]): score += 0.5
-    return score / max_possible_score if max_possible_score > 0 else 0
-
-# --- Context Processor ---
-@app.context_processor
-def inject_now():
-    """Injects the current datetime into the template context."""
-    return {'now': datetime.utcnow}
-
-# --- Routes ---
-
-@app.route('/')
-def index():
-    """Renders the home page."""
-    print("Serving index page.")
-    return render_template('index.html')
-
-@app.route('/report_found', methods=['GET', 'POST'])
-def report_found():
-    """Handles reporting a found item."""
-    item_types = ["Electronics", "Keys", "Wallet/Purse", "Clothing", "Bag/Backpack", "Jewelry/Watch", "Book/Notebook", "Pet", "Identification", "Other"]
-    if request.method == 'POST':
-        if 'item_image' not in request.files: flash('No image file part selected', 'danger'); return redirect(request.url)
-        file = request.files['item_image']
-        if file.filename == '': flash('No image selected for uploading', 'danger'); return redirect(request.url)
-        item_type = request.form.get('item_type'); location = request.form.get('location'); contact_info = request.form.get('contact_info')
-        if not all([item_type, location, contact_info]): flash('Item Type, Location Found, and Contact Info are required fields.', 'danger'); return render_template('report_found.html', item_types=item_types, entered_data=request.form)
-        if not file or not allowed_file(file.filename): flash('Invalid file type. Allowed types: png, jpg, jpeg, gif', 'danger'); return render_template('report_found.html', item_types=item_types, entered_data=request.form)
-
-        filepath = None
-        try:
-            basefilename, file_extension = os.path.splitext(file.filename)
-            safe_base = secure_filename(basefilename)
-            filename = f"found_{int(time.time())}_{safe_base}{file_extension}"
-            filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-            file.save(filepath)
-            print(f"Image saved to: {filepath}")
-
-            ai_description = generate_description_gemini(filepath)
-            if ai_description.startswith("Error:"): flash(f'AI description failed: {ai_description}. Item saved.', 'warning'); ai_description = "AI description generation failed."
-
-            color = request.form.get('color'); brand = request.form.get('brand')
-            new_item = Item(status='found', item_type=item_type, color=color, brand=brand, location=location, image_filename=filename, ai_description=ai_description, contact_info=contact_info)
-            db.session.add(new_item); db.session.commit()
-            flash('Found item reported successfully!', 'success')
-            if not ai_description.startswith("AI description generation failed"): flash(f'AI Generated Description: {ai_description}', 'info')
-            return redirect(url_for('index'))
-        except Exception as e:
-            db.session.rollback(); flash(f'An error occurred: {e}', 'danger'); print(f"Error reporting found item: {e}")
-            if filepath and os.path.exists(filepath):
-                 try: os.remove(filepath); print(f"Cleaned up failed upload: {filepath}")
-                 except OSError as rm_err: print(f"Error removing file after failure: {rm_err}")
-            return render_template('report_found.html', item_types=item_types, entered_data=request.form) # Return to form
-
-    # GET request
-    return render_template('report_found.html', item_types=item_types, entered_data={})
-
-@app.route('/search_lost', methods=['GET', 'POST'])
-def search_lost():
-    """Handles searching for a lost item."""
-    item_types = ["Electronics", "Keys", "Wallet/Purse", "Clothing", "Bag/Backpack", "Jewelry/Watch", "Book/Notebook", "Pet", "Identification", "Other"]
-    if request.method == 'POST':
-        if 'item_image' not in request.files: flash('No image file part selected for search', 'danger'); return redirect(request.url)
-        file = request.files['item_image']
-        if file.filename == '': flash('No image selected for searching', 'danger'); return redirect(request.url)
-        item_type = request.form.get('item_type'); location = request.form.get('location')
-        if not all([item_type, location]): flash('Item Type and Last Known Location are required.', 'danger'); return render_template('search_lost.html', item_types=item_types, entered_data=request.form)
-        if not file or not allowed_file(file.filename): flash('Invalid file type for search image.', 'danger'); return render_template('search_lost.html', item_types=item_types, entered_data=request.form)
-
-        search_filepath = None
-        try:
-            basefilename, file_extension = os.path.splitext(file.filename)
-            safe_base = secure_filename(basefilename)
-            search_filename = f"search_{int(time.time())}_{safe_base}{file_extension}"
-            search_filepath = os.path.join(app.config['UPLOAD_FOLDER'], search_filename)
-            file.save(search_filepath)
-            print(f"Search image saved temporarily to: {search_filepath}")
-
-            lost_ai_description = generate_description_gemini(search_filepath)
-            if lost_ai_description.startswith("Error:"): flash(f'AI description failed: {lost_ai_description}. Search quality might be affected.', 'warning'); lost_ai_description = ""
-
-            lost_item_details = {"item_type": item_type.lower(), "color": request.form.get('color', '').lower(), "brand": request.form.get('brand', '').lower(), "location": location.lower(), "ai_description": lost_ai_description, "image_path": search_filepath}
-            found_items = Item.query.filter_by(status='found').all()
-            matches = []
-            print(f"\n--- Starting Match Process for {search_filename} ---")
-
-            for found_item in found_items:
-                print(f"\nComparing with Found Item ID: {found_item.id} ({found_item.item_type})")
-                match_scores = {"description": 0.0, "metadata": 0.0, "image": 0.0, "confidence": 0.0}
-                desc_similarity = 0.0; meta_similarity = 0.0; img_similarity = 0.0
-
-                # Tier 1: Description
-                if lost_item_details["ai_description"] and found_item.ai_description and "failed" not in found_item.ai_description.lower():
-                    desc_similarity = compare_descriptions_gemini(lost_item_details["ai_description"], found_item.ai_description)
-                    match_scores["description"] = desc_similarity
-                    print(f"  Desc Similarity: {desc_similarity:.2f} (Thresh: {DESCRIPTION_SIMILARITY_THRESHOLD})")
-                else: print("  Skipping description comparison (missing/failed).")
-
-                if desc_similarity < DESCRIPTION_SIMILARITY_THRESHOLD: print("  Skipping further checks (low desc similarity)."); continue
-
-                # Tier 2: Metadata
-                found_item_meta = found_item.get_metadata()
-                meta_similarity = calculate_metadata_similarity(lost_item_details, found_item_meta)
-                match_scores["metadata"] = meta_similarity
-                print(f"  Meta Similarity: {meta_similarity:.2f} (Thresh: {METADATA_SIMILARITY_THRESHOLD})")
-
-                if meta_similarity < METADATA_SIMILARITY_THRESHOLD: print("  Skipping further checks (low meta similarity)."); continue
-
-                # Tier 3: Image
-                found_image_path = os.path.join(app.config['UPLOAD_FOLDER'], found_item.image_filename)
-                if os.path.exists(found_image_path):
-                    img_similarity = compare_images_gemini(lost_item_details["image_path"], found_image_path)
-                    match_scores["image"] = img_similarity
-                    print(f"  Image Similarity: {img_similarity:.2f} (Thresh: {IMAGE_SIMILARITY_THRESHOLD})")
-                else: print(f"  Skipping image comparison: Found item image not found at {found_image_path}")
-
-                if img_similarity < IMAGE_SIMILARITY_THRESHOLD: print("  Match failed image similarity threshold."); continue
-
-                # --- Match Found! ---
-                confidence = (desc_similarity * 0.3) + (meta_similarity * 0.3) + (img_similarity * 0.4)
-                match_scores["confidence"] = confidence
-                print(f"  >>> STRONG MATCH FOUND! Confidence: {confidence:.2f}")
-                matches.append({"found_item": found_item, "scores": match_scores, "confidence": confidence})
-
-            if search_filepath and os.path.exists(search_filepath):
-                try: os.remove(search_filepath); print(f"Temporary search image removed: {search_filepath}")
-                except OSError as e: print(f"Error removing temporary search image {search_filepath}: {e}")
-
-            matches.sort(key=lambda x: x["confidence"], reverse=True)
-            return render_template('results.html', matches=matches, search_description=lost_ai_description if lost_ai_description else "N/A")
-
-        except Exception as e:
-            flash(f'An error occurred during search: {e}', 'danger'); print(f"Error during search process: {e}")
-            if search_filepath and os.path.exists(search_filepath):
-                try: os.remove(search_filepath)
-                except OSError as rm_err: print(f"Error removing search file after failure: {rm_err}")
-            return redirect(url_for('search_lost')) # Redirect back to search form
-
-    # GET request
-    return render_template('search_lost.html', item_types=item_types, entered_data={})
-
-@app.route('/uploads/<path:filename>')
-def uploaded_file(filename):
-    """Serves uploaded files from the UPLOAD_FOLDER securely."""
-    if '..' in filename or filename.startswith('/'): abort(404)
-    try:
-        return send_from_directory(app.config['UPLOAD_FOLDER'], filename, as_attachment=False)
-    except FileNotFoundError: abort(404)
-
-# --- Database Initialization ---
-def init_db():
-     with app.app_context():
-        print("Attempting to create database tables if they don't exist...")
-        try:
-            db.create_all()
-            print("Database tables checked/created successfully.")
-        except Exception as e:
-            print(f"CRITICAL Error creating database tables: {e}")
-
-# --- Run Application ---
-if __name__ == '__main__':
-    print("--- Starting Lost & Found Application ---")
-    # Ensure the upload folder exists
-    if not os.path.exists(UPLOAD_FOLDER):
-        try: os.makedirs(UPLOAD_FOLDER); print(f"Created upload directory: {UPLOAD_FOLDER}")
-        except OSError as e: print(f"CRITICAL Error creating upload directory {UPLOAD_FOLDER}: {e}")
-
-    # Initialize the database
-    init_db()
-
-    # Run the Flask development server
-    print("Starting Flask development server...")
-    # Use port 5000 again for the main app
-    app.run(debug=True, host='0.0.0.0', port=5000)
-    print("--- Lost & Found Application Stopped ---")
\ No newline at end of file
+import os
+from flask import Flask, Blueprint, current_app, render_template, request, redirect, url_for, flash, send_from_directory, abort, jsonify, g, session, make_response, Response, stream_with_context
+import hashlib
+import time
+import re # Import regex for parsing Gemini responses
+import json
+import logging
+import sys
+import mimetypes
+import click
+from flask.cli import AppGroup
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+import numpy as np
+
+# Import config and models
+try:
+    from config import (
+        GEMINI_TEXT_API_KEY, GEMINI_IMAGE_API_KEY, SECRET_KEY, SECRET_KEY_FILENAME, DATABASE_URI, DATABASE_POOL_SIZE,
+        DATABASE_MAX_OVERFLOW, DATABASE_POOL_RECYCLE_SECONDS, SQLITE_WAL, SQLITE_BUSY_TIMEOUT_SECONDS,
+        UPLOAD_FOLDER, ALLOWED_EXTENSIONS, GEMINI_MODEL_NAME,
+        MATCH_CASCADE, EMBEDDING_BACKEND, EMBEDDING_MODEL_NAME,
+        EMBEDDING_DIM, VECTOR_INDEX_FILENAME, VECTOR_INDEX_SAVE_EVERY, VECTOR_INDEX_VERSION_FILENAME, GEMINI_MAX_CONCURRENT_CALLS,
+        MATCH_DEADLINE_SECONDS, MATCH_STOP_AFTER, MATCH_STOP_CONFIDENCE,
+        DESCRIPTION_BATCH_SIZE, IMAGE_BATCH_SIZE,
+        SCORE_CACHE_ENABLED, SCORE_CACHE_FILENAME, SCORE_CACHE_MEMORY_ENTRIES, SCORE_CACHE_MAX_ENTRIES,
+        SCORE_CACHE_TTL_SECONDS, JOB_WORKERS, JOB_MAX_ATTEMPTS, JOB_BACKOFF_SECONDS, JOB_BACKOFF_MAX_SECONDS,
+        JOB_POLL_SECONDS, JOB_LEASE_SECONDS, DERIVED_SUBFOLDER, ANALYSIS_IMAGE_MAX_SIZE, THUMBNAIL_MAX_SIZE, DERIVATIVE_JPEG_QUALITY,
+        SEARCH_MATCH_ITEM_TYPE, SEARCH_MAX_AGE_DAYS, QUERY_BATCH_SIZE, LOG_LEVEL, METRICS_ENABLED,
+        PROFILE_SAMPLE_RATE, PROFILE_DIR, LOST_SEARCH_OPEN_DAYS, LOST_VECTOR_INDEX_FILENAME,
+        SEARCH_STREAM_POLL_SECONDS, SEARCH_STREAM_MAX_SECONDS, SEARCH_STREAM_RETRY_SECONDS, BLOB_SUBFOLDER, BLOB_SHARD_LEVELS, BLOB_GC_GRACE_SECONDS,
+        UPLOAD_CACHE_MAX_AGE, UPLOAD_SENDFILE, UPLOAD_ACCEL_PREFIX, GEMINI_REQUESTS_PER_MINUTE, GEMINI_BURST,
+        GEMINI_RATE_LIMIT_WAIT_SECONDS, GEMINI_TIMEOUT_SECONDS, GEMINI_MAX_RETRIES, GEMINI_RETRY_BACKOFF_SECONDS,
+        GEMINI_BREAKER_FAILURES, GEMINI_BREAKER_RESET_SECONDS, IMPORT_WORKERS, IMPORT_BATCH_SIZE,
+        BROWSE_PAGE_SIZE, BROWSE_MAX_PAGE_SIZE, BROWSE_CACHE_ENTRIES, BROWSE_CACHE_TTL_SECONDS, BROWSE_HTTP_MAX_AGE, CATALOG_VERSION_FILENAME,
+        MAINTENANCE_INTERVAL_SECONDS, MAINTENANCE_MAX_SECONDS, MAINTENANCE_BATCH_SIZE, MAINTENANCE_PAUSE_SECONDS, ARCHIVE_FOUND_AFTER_DAYS,
+        ARCHIVE_SEARCHES_AFTER_DAYS, SQLITE_INCREMENTAL_VACUUM_PAGES, LEXICAL_BM25_WEIGHTS, LEXICAL_MAX_TERMS,
+        GAZETTEER_FILENAME, LOCATION_NEARBY_METERS, LOCATION_PARTITIONING, LOCATION_INCLUDE_UNPLACED
+    )
+except ImportError as e:
+    raise ImportError(f"Could not import from config.py: {e}. Ensure config.py exists and has correct variables.") from e
+
+logging.basicConfig(level=LOG_LEVEL, format='%(asctime)s %(levelname)s %(name)s: %(message)s')
+log = logging.getLogger(__name__)
+
+try:
+    from models import (db, Item, Match, Blob, ensure_schema, candidate_query, browse_query, register_blob, recount_blobs, assign_places,
+                        engine_options, configure_sqlite, normalize_item_type)
+except ImportError as e:
+    raise ImportError(f"Could not import from models.py: {e}. Ensure models.py exists and defines db and Item.") from e
+
+from embeddings import get_embedder, VectorIndex, is_usable_description
+from fingerprints import score_candidates
+from metadata_scoring import MetadataBlock, score_metadata_batch, find_parity_mismatches, PARITY_EDGE_CASES
+from match_engine import MatchPool, Deadline
+from cascade import Cascade, CascadeContext, VectorScores
+from score_cache import ScoreCache, FileHasher, normalize_text
+from jobs import JobQueue
+from metrics import Metrics, SampledProfiler
+from imaging import ImagePipeline
+from blobstore import BlobStore
+from bulk import ImportCheckpoint, find_manifest, read_manifest, batched
+from listing import CatalogVersion, ListingCache, encode_cursor, decode_cursor
+from maintenance import Maintenance
+from lexical import match_query, fulltext_available, search as fulltext_search
+from gazetteer import campus, load_places, normalize_place_text
+from model_client import ModelClient, TokenBucket, CircuitBreaker, ModelUnavailable, PerProcess
+
+# Routes, template helpers and CLI commands; registered on the app by create_app()
+bp = Blueprint('main', __name__, cli_group=None)
+
+# --- Gemini API Configuration ---
+def init_gemini():
+    """Configures the Gemini SDK and creates this process's models: {api role: GenerativeModel or None}.
+
+    Runs on first use (see PerProcess): importing the SDK costs about a second and most of a worker's memory, and
+    processes that never call Gemini (CLI commands, benchmarks with a fake model) skip it.
+    """
+    models = {'text': None, 'image': None}
+    try:
+        import google.generativeai as genai
+        genai.configure(api_key=GEMINI_TEXT_API_KEY)
+        log.info("Gemini API configured (using text key ending ...%s).", GEMINI_TEXT_API_KEY[-4:])
+    except Exception as e:
+        log.error("Error during genai.configure: %s. Check GEMINI_TEXT_API_KEY.", e)
+        return models
+    try:
+        models = {'text': genai.GenerativeModel(GEMINI_MODEL_NAME), 'image': genai.GenerativeModel(GEMINI_MODEL_NAME)} # Assumes same model okay
+        log.info("Gemini models ('%s') initialized.", GEMINI_MODEL_NAME)
+    except Exception as e:
+        log.error("Error creating Gemini models ('%s'): %s. AI features will likely fail.", GEMINI_MODEL_NAME, e)
+    return models
+
+gemini_models = PerProcess(init_gemini)
+
+def build_model_clients():
+    """One ModelClient per API role; roles sharing a key share its rate limit and circuit breaker (quota is per key)."""
+    guards = {} # api key -> (TokenBucket, CircuitBreaker)
+    clients = {}
+    for api, api_key in (('text', GEMINI_TEXT_API_KEY), ('image', GEMINI_IMAGE_API_KEY)):
+        if api_key not in guards:
+            guards[api_key] = (TokenBucket(GEMINI_REQUESTS_PER_MINUTE / 60.0, GEMINI_BURST), CircuitBreaker(GEMINI_BREAKER_FAILURES, GEMINI_BREAKER_RESET_SECONDS))
+        limiter, breaker = guards[api_key]
+        clients[api] = ModelClient(api, limiter, breaker, max_retries=GEMINI_MAX_RETRIES, backoff_seconds=GEMINI_RETRY_BACKOFF_SECONDS,
+                                   acquire_timeout=GEMINI_RATE_LIMIT_WAIT_SECONDS, metrics=metrics)
+    return clients
+
+# --- Embedding Retrieval Setup ---
+def init_embedder():
+    if EMBEDDING_BACKEND == 'gemini': gemini_models.get() # The Gemini backend needs the SDK configured
+    try:
+        backend = get_embedder(EMBEDDING_BACKEND, dim=EMBEDDING_DIM, model_name=EMBEDDING_MODEL_NAME)
+        log.info("Embedding backend '%s' initialized.", backend.name)
+        return backend
+    except Exception as e:
+        log.error("Error creating embedding backend '%s': %s. Searches will find no candidates.", EMBEDDING_BACKEND, e)
+        return None
+
+embedding_backend = PerProcess(init_embedder)
+
+# One description index per item status: found items (searched by lost-item queries) and saved lost searches (new reports)
+VECTOR_INDEX_FILES = {'found': VECTOR_INDEX_FILENAME, 'lost': LOST_VECTOR_INDEX_FILENAME}
+vector_indexes = {} # status -> VectorIndex, loaded lazily by get_vector_index() inside an app context
+vector_index_stamps = {} # status -> vector_index_version stamp when this process loaded its copy
+vector_index_version = None # Stamp file in the instance folder, set up by create_app()
+
+# Shared by all searches so GEMINI_MAX_CONCURRENT_CALLS bounds total in-flight comparison calls
+match_pool = MatchPool(GEMINI_MAX_CONCURRENT_CALLS)
+
+# --- Model Result Cache Setup ---
+file_hasher = FileHasher()
+score_cache = None # Set up by create_app() (the SQLite file lives in the instance folder)
+
+# Decode-once upload pipeline; AI calls and result pages use its cached derivatives, not the originals
+image_pipeline = ImagePipeline(UPLOAD_FOLDER, DERIVED_SUBFOLDER, analysis_max_size=ANALYSIS_IMAGE_MAX_SIZE,
+                               thumbnail_max_size=THUMBNAIL_MAX_SIZE, quality=DERIVATIVE_JPEG_QUALITY, hasher=file_hasher)
+# Uploads are stored once per distinct content; Item.image_filename points into the store
+blob_store = BlobStore(UPLOAD_FOLDER, BLOB_SUBFOLDER, shard_levels=BLOB_SHARD_LEVELS, hasher=file_hasher)
+
+# --- Background Job Queue Setup ---
+job_queue = JobQueue(workers=JOB_WORKERS, max_attempts=JOB_MAX_ATTEMPTS, backoff_seconds=JOB_BACKOFF_SECONDS,
+                     backoff_max_seconds=JOB_BACKOFF_MAX_SECONDS, poll_seconds=JOB_POLL_SECONDS, lease_seconds=JOB_LEASE_SECONDS)
+if MAINTENANCE_INTERVAL_SECONDS: job_queue.recurring('maintenance', MAINTENANCE_INTERVAL_SECONDS)
+
+# --- Metrics & Profiling ---
+metrics = Metrics(enabled=METRICS_ENABLED)
+metrics.describe('stage_seconds', 'histogram', 'Time spent in each hot-path stage of reporting and searching.')
+metrics.describe('request_seconds', 'histogram', 'Request latency by endpoint.')
+metrics.describe('model_calls_total', 'counter', 'Gemini requests by call kind.')
+metrics.describe('model_call_seconds', 'histogram', 'Gemini request latency by call kind.')
+metrics.describe('model_parse_failures_total', 'counter', 'Gemini replies without a usable score, by call kind.')
+metrics.describe('cache_lookups_total', 'counter', 'Model result and browse cache lookups by kind and result.')
+metrics.describe('tier_candidates_total', 'counter', 'Candidates entering (in) and surviving (passed) each matching tier.')
+metrics.describe('errors_total', 'counter', 'Errors by stage and exception type.')
+metrics.describe('uploads_total', 'counter', 'Uploaded images by outcome (stored, or deduplicated against an identical blob).')
+metrics.describe('model_retries_total', 'counter', 'Gemini calls retried after a transient error, by API key role.')
+metrics.describe('model_rejected_total', 'counter', 'Gemini calls refused without a request (circuit open or rate limited).')
+metrics.describe('model_coalesced_total', 'counter', 'Gemini calls answered by an identical call already in flight.')
+metrics.describe('maintenance_total', 'counter', 'Items archived, files removed and pages vacuumed by maintenance passes, by step.')
+metrics.describe('degraded_scores_total', 'counter', 'Candidates scored locally because the model was unavailable, by tier.')
+profiler = None # Writes to the instance folder, set up by create_app()
+# Every Gemini request goes through these (see call_model)
+model_clients = PerProcess(build_model_clients)
+
+# --- Browse Listing Cache ---
+browse_cache = ListingCache(BROWSE_CACHE_ENTRIES, BROWSE_CACHE_TTL_SECONDS, metrics=metrics)
+catalog_version = None # Stamp file in the instance folder, set up by create_app()
+
+@db.event.listens_for(db.session, 'before_flush')
+def note_catalog_change(db_session, flush_context, instances):
+    """Flags sessions that add, change or delete found items, so their commit invalidates the browse caches."""
+    if any(isinstance(obj, Item) and obj.status == 'found' for obj in (*db_session.new, *db_session.dirty, *db_session.deleted)):
+        db_session.info['catalog_changed'] = True
+
+@db.event.listens_for(db.session, 'after_commit')
+def bump_catalog_version(db_session):
+    if db_session.info.pop('catalog_changed', False) and catalog_version is not None:
+        try: catalog_version.bump()
+        except OSError as e: log.error("Could not update the catalogue version stamp: %s", e)
+
+@db.event.listens_for(db.session, 'after_rollback')
+def forget_catalog_change(db_session):
+    db_session.info.pop('catalog_changed', None)
+
+ITEM_TYPES = ["Electronics", "Keys", "Wallet/Purse", "Clothing", "Bag/Backpack", "Jewelry/Watch", "Book/Notebook", "Pet", "Identification", "Other"]
+
+# Bump a prompt's version whenever its wording changes so results cached for the old prompt are not reused
+PROMPT_VERSIONS = {"describe": 1, "compare_descriptions": 1, "compare_images": 1}
+
+# --- Helper Functions ---
+
+def allowed_file(filename):
+    """Checks if the file extension is allowed."""
+    return '.' in filename and \
+           filename.rsplit('.', 1)[1].lower() in current_app.config['ALLOWED_EXTENSIONS']
+
+def store_upload(file):
+    """Streams an uploaded image into the blob store and registers it in the current session. Returns the StoredBlob.
+
+    Identical bytes are stored once. If the request fails afterwards the file is left for `flask blobs gc`, since
+    another upload may already share it.
+    """
+    with metrics.span('save_upload'): stored = blob_store.save(file.stream, os.path.splitext(file.filename)[1])
+    register_blob(stored)
+    metrics.inc('uploads_total', outcome='stored' if stored.created else 'deduplicated')
+    log.debug("Image %s as %s", 'saved' if stored.created else 'deduplicated', stored.filename)
+    return stored
+
+def model_cache_key(kind, *parts):
+    """Cache key for a model call: the inputs plus the model name and the prompt version."""
+    return ScoreCache.make_key(kind, GEMINI_MODEL_NAME, PROMPT_VERSIONS[kind], *parts)
+
+def cached_result(kind, cache_key):
+    """Score cache lookup, counted per call kind in cache_lookups_total."""
+    value = score_cache.get(cache_key)
+    metrics.inc('cache_lookups_total', kind=kind, result='miss' if value is None else 'hit')
+    return value
+
+def call_model(model, kind, contents, key=None):
+    """model.generate_content through its API key's ModelClient, counted and timed per call kind (errors are counted, then re-raised).
+
+    Concurrent calls with the same `key` (the result's cache key) share one request. Raises ModelUnavailable
+    without a request while the key's circuit is open or its rate limit cannot be met.
+    """
+    client = model_clients.get()['image' if kind.startswith('compare_images') else 'text']
+    def request():
+        metrics.inc('model_calls_total', kind=kind)
+        with metrics.timed('model_call_seconds', kind=kind): return model.generate_content(contents, request_options={"timeout": GEMINI_TIMEOUT_SECONDS})
+    try:
+        return client.call(request, key)
+    except Exception as e:
+        metrics.error(f'model_{kind}', e); raise
+
+def models_available():
+    """False while the circuit of a Gemini API key is open."""
+    return all(client.available() for client in model_clients.get().values())
+
+def record_tier(tier, considered, passed, pipeline='search'):
+    """Counts candidates entering and surviving a tier, for a search ('search') or reverse matching of a new report ('new_item')."""
+    metrics.inc('tier_candidates_total', considered, pipeline=pipeline, tier=tier, outcome='in')
+    metrics.inc('tier_candidates_total', passed, pipeline=pipeline, tier=tier, outcome='passed')
+    log.info("%s tier kept %d of %d candidate(s) (%s).", tier.capitalize(), passed, considered, pipeline)
+
+def description_pair_key(desc1, desc2):
+    return model_cache_key("compare_descriptions", normalize_text(desc1), normalize_text(desc2))
+
+def image_pair_key(image_path1, image_path2):
+    return model_cache_key("compare_images", file_hasher.sha256(image_path1), file_hasher.sha256(image_path2))
+
+def generate_description_gemini(image_path):
+    """Generates a description for an image using Gemini."""
+    text_model = gemini_models.get()['text']
+    if not text_model:
+        log.error("Attempted to generate description, but text_model is not available.")
+        return "Error: Gemini text model not initialized."
+    if not os.path.exists(image_path):
+        log.error("Image file not found at path: %s", image_path)
+        return "Error: Image file not found."
+
+    try:
+        cache_key = model_cache_key("describe", file_hasher.sha256(image_path))
+        cached = cached_result("describe", cache_key)
+        if cached is not None: log.debug("Using cached description for: %s", os.path.basename(image_path)); return cached
+        log.debug("Generating description for: %s", os.path.basename(image_path))
+        img = image_pipeline.open_derivative(image_path)
+        prompt = "Describe this item in detail for a lost and found platform. Focus on visual characteristics like type, color, material, shape, and any unique markings."
+        contents = [prompt, img]
+        response = call_model(text_model, "describe", contents, key=cache_key)
+        log.debug("Gemini Description Response: %s...", response.text[:100])
+        if not (hasattr(response, 'text') and response.text): return "AI could not generate a description."
+        score_cache.set(cache_key, response.text.strip())
+        return response.text.strip()
+    except Exception as e:
+        log.error("Error generating description with Gemini: %s", e)
+        error_message = f"Error generating AI description: {type(e).__name__}."
+        if isinstance(e, ModelUnavailable): error_message = "Error: Gemini API temporarily unavailable."
+        elif "API key" in str(e): error_message = "Error: Invalid/missing Gemini API key (Text)."
+        elif "quota" in str(e).lower(): error_message = "Error: Gemini API quota exceeded."
+        elif "DeadlineExceeded" in str(e): error_message = "Error: Gemini API request timed out."
+        elif "ResourceExhausted" in str(e): error_message = "Error: Gemini API resource exhausted."
+        return error_message
+
+def compare_descriptions_gemini(desc1, desc2):
+    """Compares two descriptions for semantic similarity using Gemini."""
+    text_model = gemini_models.get()['text']
+    if not text_model:
+        log.error("Attempted description comparison, but text_model is not available.")
+        return 0.0
+    if not desc1 or not desc2: return 0.0
+    cache_key = description_pair_key(desc1, desc2)
+    cached = cached_result("compare_descriptions", cache_key)
+    if cached is not None: return cached
+
+    try:
+        prompt = f"""
+        On a scale of 0.0 to 1.0, how semantically similar are these descriptions?
+        1: "{desc1}"
+        2: "{desc2}"
+        Respond ONLY with the numerical score (e.g., 0.75).
+        """
+        response = call_model(text_model, "compare_descriptions", prompt, key=cache_key)
+        log.debug("Gemini Description Similarity Response: %s", response.text)
+        try:
+            match = re.search(r"[-+]?\d*\.\d+|\d+", response.text)
+            if match:
+                similarity = max(0.0, min(1.0, float(match.group())))
+                score_cache.set(cache_key, similarity)
+                return similarity
+            else:
+                 metrics.inc('model_parse_failures_total', kind="compare_descriptions")
+                 log.warning("Could not parse number from description similarity response: %s", response.text)
+                 return 0.0
+        except (ValueError, AttributeError) as parse_err:
+            metrics.inc('model_parse_failures_total', kind="compare_descriptions")
+            log.warning("Error parsing similarity score (%s): %s", parse_err, response.text)
+            return 0.0
+    except ModelUnavailable: raise # Callers fall back to local scoring
+    except Exception as e:
+        log.error("Error comparing descriptions with Gemini: %s", e)
+        return 0.0
+
+def compare_images_gemini(image_path1, image_path2):
+    """Compares two images for visual similarity using Gemini Vision."""
+    vision_model = gemini_models.get()['image']
+    if not vision_model:
+        log.error("Attempted image comparison, but vision_model is not available.")
+        return 0.0
+    if not os.path.exists(image_path1): log.error("Image file 1 not found: %s", image_path1); return 0.0
+    if not os.path.exists(image_path2): log.error("Image file 2 not found: %s", image_path2); return 0.0
+
+    try:
+        cache_key = image_pair_key(image_path1, image_path2)
+        cached = cached_result("compare_images", cache_key)
+        if cached is not None: return cached
+        log.debug("Comparing images: %s and %s", os.path.basename(image_path1), os.path.basename(image_path2))
+        img1 = image_pipeline.open_derivative(image_path1); img2 = image_pipeline.open_derivative(image_path2)
+        prompt = """
+        On a scale of 0.0 to 1.0, how visually similar are the items in these two images?
+        Respond ONLY with the numerical score (e.g., 0.90).
+        """
+        contents = [prompt, img1, img2]
+        response = call_model(vision_model, "compare_images", contents, key=cache_key)
+        log.debug("Gemini Image Similarity Response: %s", response.text)
+        try:
+            match = re.search(r"[-+]?\d*\.\d+|\d+", response.text)
+            if match:
+                similarity = max(0.0, min(1.0, float(match.group())))
+                score_cache.set(cache_key, similarity)
+                return similarity
+            else:
+                 metrics.inc('model_parse_failures_total', kind="compare_images")
+                 log.warning("Could not parse number from image similarity response: %s", response.text)
+                 return 0.0
+        except (ValueError, AttributeError) as parse_err:
+            metrics.inc('model_parse_failures_total', kind="compare_images")
+            log.warning("Error parsing image similarity score (%s): %s", parse_err, response.text)
+            return 0.0
+    except ModelUnavailable: raise
+    except Exception as e:
+        log.error("Error comparing images with Gemini: %s", e)
+        return 0.0
+
+def parse_batch_scores(text, count):
+    """Parses a {"scores": [{"id": n, "score": x}, ...]} reply into a list of `count` scores.
+
+    Entries that are missing, duplicated or malformed are returned as None so the caller can retry them one by one.
+    """
+    scores = [None] * count
+    try:
+        cleaned = re.sub(r"^```(?:json)?|```$", "", text.strip(), flags=re.MULTILINE).strip()
+        entries = json.loads(cleaned)
+        if isinstance(entries, dict): entries = entries.get("scores", [])
+        seen = set()
+        for entry in entries:
+            try: index = int(entry["id"]) - 1; score = float(entry["score"])
+            except (KeyError, TypeError, ValueError): continue
+            if 0 <= index < count and index not in seen:
+                seen.add(index); scores[index] = max(0.0, min(1.0, score))
+    except (ValueError, AttributeError, TypeError) as parse_err: # TypeError: valid JSON of the wrong shape, e.g. {"scores": 0.5}
+        log.warning("Could not parse batched similarity response (%s): %s", parse_err, text[:200])
+    return scores
+
+def compare_descriptions_batch_gemini(desc, candidate_descs):
+    """Scores one description against several in a single Gemini request, returning one score per candidate."""
+    if len(candidate_descs) == 1: return [compare_descriptions_gemini(desc, candidate_descs[0])]
+    text_model = gemini_models.get()['text']
+    if not text_model:
+        log.error("Attempted batched description comparison, but text_model is not available.")
+        return [0.0] * len(candidate_descs)
+    scores = [cached_result("compare_descriptions", description_pair_key(desc, candidate)) for candidate in candidate_descs]
+    pending = [i for i, score in enumerate(scores) if score is None]
+    if len(pending) > 1:
+        try:
+            log.debug("Comparing description against %d candidates in one request...", len(pending))
+            numbered = "\n".join(f'[{n}] "{candidate_descs[i]}"' for n, i in enumerate(pending, start=1))
+            prompt = f"""
+            On a scale of 0.0 to 1.0, how semantically similar is each numbered found-item description to the lost-item description?
+            Lost item: "{desc}"
+            Found items:
+            {numbered}
+            Respond ONLY with JSON of the form {{"scores": [{{"id": 1, "score": 0.75}}]}}, one entry per found item.
+            """
+            response = call_model(text_model, "compare_descriptions_batch", prompt, key=ScoreCache.make_key("batch", *(description_pair_key(desc, candidate_descs[i]) for i in pending)))
+            for i, score in zip(pending, parse_batch_scores(response.text, len(pending))):
+                if score is None: continue
+                scores[i] = score; score_cache.set(description_pair_key(desc, candidate_descs[i]), score)
+        except ModelUnavailable: raise
+        except Exception as e:
+            log.error("Error comparing descriptions in batch with Gemini: %s", e)
+    missing = [i for i, score in enumerate(scores) if score is None]
+    if len(pending) > 1 and missing:
+        metrics.inc('model_parse_failures_total', kind="compare_descriptions_batch")
+        log.warning("Batched description reply missed %d item(s), falling back to single comparisons.", len(missing))
+    for i in missing: scores[i] = compare_descriptions_gemini(desc, candidate_descs[i])
+    return scores
+
+def compare_images_batch_gemini(image_path, candidate_paths):
+    """Scores one image against several candidate thumbnails in a single Gemini request."""
+    if len(candidate_paths) == 1: return [compare_images_gemini(image_path, candidate_paths[0])]
+    vision_model = gemini_models.get()['image']
+    if not vision_model:
+        log.error("Attempted batched image comparison, but vision_model is not available.")
+        return [0.0] * len(candidate_paths)
+    scores = [cached_result("compare_images", image_pair_key(image_path, candidate_path)) for candidate_path in candidate_paths]
+    pending = [i for i, score in enumerate(scores) if score is None]
+    if len(pending) > 1:
+        try:
+            log.debug("Comparing %s against %d candidate images in one request...", os.path.basename(image_path), len(pending))
+            query_img = image_pipeline.open_derivative(image_path)
+            prompt = """
+            The first image shows a lost item. Each following image is a numbered found-item candidate.
+            On a scale of 0.0 to 1.0, how visually similar is the item in each candidate image to the lost item?
+            Respond ONLY with JSON of the form {"scores": [{"id": 1, "score": 0.90}]}, one entry per candidate.
+            """
+            contents = [prompt, query_img]
+            for n, i in enumerate(pending, start=1):
+                contents += [f"[{n}]", image_pipeline.open_derivative(candidate_paths[i], 'thumb')]
+            response = call_model(vision_model, "compare_images_batch", contents, key=ScoreCache.make_key("batch", *(image_pair_key(image_path, candidate_paths[i]) for i in pending)))
+            for i, score in zip(pending, parse_batch_scores(response.text, len(pending))):
+                if score is None: continue
+                scores[i] = score; score_cache.set(image_pair_key(image_path, candidate_paths[i]), score)
+        except ModelUnavailable: raise
+        except Exception as e:
+            log.error("Error comparing images in batch with Gemini: %s", e)
+    missing = [i for i, score in enumerate(scores) if score is None]
+    if len(pending) > 1 and missing:
+        metrics.inc('model_parse_failures_total', kind="compare_images_batch")
+        log.warning("Batched image reply missed %d item(s), falling back to single comparisons.", len(missing))
+    for i in missing: scores[i] = compare_images_gemini(image_path, candidate_paths[i])
+    return scores
+
+def chunked(items, size):
+    """Splits a list into consecutive chunks of at most `size` items."""
+    size = max(1, size)
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+def get_vector_index(status='found'):
+    """Returns the description vector index of items with `status`, loading it from disk and syncing it with the DB on first
+    use, and again once maintenance has rewritten the file (see rebuild_vector_indexes)."""
+    stamp = vector_index_version.current() if vector_index_version is not None else None
+    if vector_index_stamps.get(status) != stamp: vector_indexes.pop(status, None)
+    if status not in vector_indexes:
+        embedder = embedding_backend.get()
+        path = os.path.join(current_app.instance_path, VECTOR_INDEX_FILES[status])
+        index = VectorIndex.load(path, embedder.name)
+        rows = candidate_query(Item.id, Item.ai_description, status=status).yield_per(QUERY_BATCH_SIZE)
+        added, removed = index.sync_from_rows(rows, embedder)
+        if added or removed:
+            log.info("Vector index (%s) synced with DB: %d added, %d removed (%d items).", status, added, removed, len(index))
+            index.save()
+        vector_indexes[status] = index; vector_index_stamps[status] = stamp
+    return vector_indexes[status]
+
+def index_missing_candidates(index, ids):
+    """Embeds described candidates missing from this process's copy of an index, e.g. items reported through another worker
+    process, `flask jobs work` or `flask items import` since it was loaded. Returns the number added."""
+    embedder = embedding_backend.get()
+    missing = [item_id for item_id in ids if item_id not in index]
+    added = 0
+    for chunk in chunked(missing, QUERY_BATCH_SIZE):
+        for item_id, text in db.session.query(Item.id, Item.ai_description).filter(Item.id.in_(chunk)):
+            if is_usable_description(text): index.add(item_id, embedder.embed(text)); added += 1
+    if added:
+        log.debug("Indexed %d candidate(s) added by other processes.", added)
+        if index.dirty >= VECTOR_INDEX_SAVE_EVERY: index.save()
+    return added
+
+def index_item_description(item):
+    """Embeds an item's AI description and adds it to the vector index for its status (found item or saved search)."""
+    embedder = embedding_backend.get()
+    if not embedder or not is_usable_description(item.ai_description): return
+    try:
+        index = get_vector_index(item.status)
+        index.add(item.id, embedder.embed(item.ai_description))
+        if index.dirty >= VECTOR_INDEX_SAVE_EVERY: index.save()
+    except Exception as e:
+        metrics.error('index_description', e); log.error("Error indexing description for item %s: %s", item.id, e)
+
+# --- Match Cascade ---
+# Each stage scorer gets (query, surviving ids, CascadeContext, CascadeStage), see cascade.Cascade. The query is the
+# searched item's metadata (lowercased) plus "ai_description", "image_path" and "fingerprint"; ctx.status is the status
+# of the candidates ('found' for a search, 'lost' for reverse matching of a new report).
+def cascade_items(ctx, ids):
+    """Items for candidate ids, in the given order; loaded once per run and kept in ctx.items."""
+    missing = [item_id for item_id in ids if item_id not in ctx.items]
+    for chunk in chunked(missing, QUERY_BATCH_SIZE):
+        for item in Item.query.filter(Item.id.in_(chunk)): ctx.items[item.id] = item
+    return [ctx.items[item_id] for item_id in ids if item_id in ctx.items]
+
+def location_partition(location):
+    """Place ids a search for `location` covers: its gazetteer place and the places near it (plus '' for unplaced items),
+    or None (no restriction) when partitioning is off or the location names no known place.
+    """
+    place = campus.resolve(location) if LOCATION_PARTITIONING else None
+    if place is None: return None
+    return campus.nearby(place.id) + ([''] if LOCATION_INCLUDE_UNPLACED else [])
+
+def score_sql(query, ids, ctx, stage):
+    """SQL pre-filter: candidates of ctx.status (same item type, reported within ctx.max_age_days, at or near the query's
+    place) and their metadata columns.
+    """
+    item_type = ctx.item_type if SEARCH_MATCH_ITEM_TYPE else None
+    since = datetime.utcnow() - timedelta(days=ctx.max_age_days) if ctx.max_age_days else None
+    places = location_partition(query.get("location"))
+    if places is not None: log.debug("Location partition: %s", ", ".join(place_id or '(unplaced)' for place_id in places))
+    columns = [db.func.coalesce(norm, db.func.lower(raw)) for norm, raw in
+               ((Item.item_type_norm, Item.item_type), (Item.color_norm, Item.color), (Item.brand_norm, Item.brand), (Item.location_norm, Item.location))]
+    ctx.block = MetadataBlock.from_rows(candidate_query(Item.id, *columns, status=ctx.status, item_type=item_type, since=since, places=places).yield_per(QUERY_BATCH_SIZE))
+    return VectorScores(ctx.block.ids, None)
+
+def score_metadata(query, ids, ctx, stage):
+    """Metadata rules, vectorized over every SQL candidate. The score is symmetric, so it serves reverse matching too."""
+    return VectorScores(ctx.block.ids, score_metadata_batch(query, ctx.block))
+
+def score_lexical(query, ids, ctx, stage):
+    """BM25 rank (SQLite FTS5) of the candidates' description, type, colour and brand against the query's words.
+
+    Skipped without a full-text index or a usable query description. Candidates sharing no word with the query (still
+    awaiting their description, or described with synonyms) score 0 and fill the places left under top_k, best metadata
+    match first, so the stage only cuts them when there are more candidates than it keeps.
+    """
+    if not is_usable_description(query["ai_description"]) or not fulltext_available(db.session): return None
+    words = match_query(query["ai_description"], query.get("color"), query.get("brand"), max_terms=LEXICAL_MAX_TERMS)
+    if not words: return None
+    hits = fulltext_search(db.session, words, ctx.status, normalize_item_type(ctx.item_type) if SEARCH_MATCH_ITEM_TYPE else None, LEXICAL_BM25_WEIGHTS, ids=ids, limit=stage.top_k)
+    matched = {item_id for item_id, _ in hits}; metadata_scores = ctx.scores.get('metadata', {})
+    unmatched = sorted((item_id for item_id in (ids if ids is not None else ()) if item_id not in matched), key=lambda item_id: -metadata_scores.get(item_id, 0.0))
+    if stage.top_k: unmatched = unmatched[:max(0, stage.top_k - len(hits))]
+    return VectorScores([item_id for item_id, _ in hits] + unmatched, [score for _, score in hits] + [0.0] * len(unmatched))
+
+def score_embedding(query, ids, ctx, stage):
+    """Nearest candidates in the local description vector index of ctx.status (candidates it lacks are embedded first).
+
+    Without a usable query description there is nothing to embed; the best metadata matches are kept instead, so the
+    stage still caps what reaches the model tiers.
+    """
+    embedder = embedding_backend.get()
+    if not embedder or not is_usable_description(query["ai_description"]):
+        metadata_scores = ctx.scores.get('metadata', {})
+        return VectorScores(ids, [metadata_scores.get(item_id, 0.0) for item_id in ids])
+    index = get_vector_index(ctx.status)
+    index_missing_candidates(index, ids)
+    nearest = index.search(embedder.embed(query["ai_description"]), stage.top_k or len(ids), np.asarray(ids, dtype=np.int64))
+    if nearest: log.debug("Embedding retrieval top score %.2f.", nearest[0][1])
+    return VectorScores([item_id for item_id, _ in nearest], [score for _, score in nearest])
+
+def score_fingerprint(query, ids, ctx, stage):
+    """Local pHash/dHash + colour histogram similarity to the query image. Candidates without a stored fingerprint cannot be ranked, so they are kept unscored."""
+    if not query.get("fingerprint"): return None
+    pairs = []
+    for chunk in chunked(list(ids), QUERY_BATCH_SIZE):
+        rows = db.session.query(Item.id, Item.image_phash, Item.image_dhash, Item.color_histogram).filter(Item.id.in_(chunk)).all()
+        ranked = [row for row in rows if row.image_phash and row.image_dhash and row.color_histogram]
+        scores = score_candidates(query["fingerprint"], [{"image_phash": row.image_phash, "image_dhash": row.image_dhash, "color_histogram": row.color_histogram} for row in ranked]) if ranked else []
+        pairs += [(row.id, float(score)) for row, score in zip(ranked, scores)]
+        pairs += [(row.id, None) for row in rows if row not in ranked]
+    unranked = sum(1 for _, score in pairs if score is None)
+    if unranked: log.warning("%d candidate(s) have no fingerprint yet, run `flask backfill-fingerprints`.", unranked)
+    return pairs
+
+def fan_out_scores(stage, ctx, score, chunks, local_score):
+    """Yields (item_id, score) as match_pool finishes each chunk of (item, input) pairs; score(inputs) returns one score per input.
+
+    While the model is unavailable a chunk is scored with local_score(item_id) instead and marked degraded, so the
+    cascade applies the stage's degraded threshold to it.
+    """
+    def guarded(chunk):
+        try:
+            return score([model_input for _, model_input in chunk])
+        except ModelUnavailable:
+            ctx.degraded.update((stage.name, item.id) for item, _ in chunk); metrics.inc('degraded_scores_total', len(chunk), tier=stage.name)
+            return [local_score(item.id) for item, _ in chunk]
+    results = match_pool.fan_out(guarded, chunks, ctx.deadline)
+    try:
+        for chunk, scores in results:
+            for (item, _), item_score in zip(chunk, scores):
+                log.debug("Item %s %s similarity: %.2f", item.id, stage.name, item_score)
+                yield item.id, item_score
+    finally:
+        results.close() # Cancels queued calls when the cascade stops early
+
+def score_llm_description(query, ids, ctx, stage):
+    """Gemini description similarity; embedding similarity stands in while the text model is unavailable."""
+    if not is_usable_description(query["ai_description"]): return None
+    describable = [(item, item.ai_description) for item in cascade_items(ctx, ids) if item.ai_description and "failed" not in item.ai_description.lower()]
+    if len(describable) < len(ids): log.debug("Skipping description comparison for %d item(s) (missing/failed).", len(ids) - len(describable))
+    if ctx.status == 'found':
+        score = lambda descs: compare_descriptions_batch_gemini(query["ai_description"], descs); chunks = chunked(describable, DESCRIPTION_BATCH_SIZE)
+    else: # Each saved search is its own lost-item query, so pairs are scored one by one (and share the search's cache keys)
+        score = lambda descs: [compare_descriptions_gemini(descs[0], query["ai_description"])]; chunks = chunked(describable, 1)
+    return fan_out_scores(stage, ctx, score, chunks, lambda item_id: ctx.scores.get('embedding', {}).get(item_id, 0.0))
+
+def score_llm_image(query, ids, ctx, stage):
+    """Gemini image similarity; fingerprint similarity stands in while the image model is unavailable."""
+    targets = []
+    for item in cascade_items(ctx, ids):
+        image_path = os.path.join(current_app.config['UPLOAD_FOLDER'], item.image_filename)
+        if os.path.exists(image_path): targets.append((item, image_path))
+        else: log.warning("Skipping image comparison: image of item %s not found at %s", item.id, image_path)
+    if ctx.status == 'found':
+        score = lambda paths: compare_images_batch_gemini(query["image_path"], paths); chunks = chunked(targets, IMAGE_BATCH_SIZE)
+    else:
+        score = lambda paths: [compare_images_gemini(paths[0], query["image_path"])]; chunks = chunked(targets, 1)
+    return fan_out_scores(stage, ctx, score, chunks, lambda item_id: ctx.scores.get('fingerprint', {}).get(item_id, 0.0))
+
+# Stage name -> (score key, scorer); the score keys are the match_scores keys of a match
+CASCADE_SCORERS = {
+    'sql': ('sql', score_sql),
+    'metadata': ('metadata', score_metadata),
+    'lexical': ('lexical', score_lexical),
+    'embedding': ('embedding', score_embedding),
+    'fingerprint': ('fingerprint', score_fingerprint),
+    'llm_description': ('description', score_llm_description),
+    'llm_image': ('image', score_llm_image),
+}
+
+match_cascade = None # Planned from MATCH_CASCADE by create_app(), which raises ValueError if it is invalid
+
+def run_match_cascade(query, ctx, on_pass, stop=None):
+    """Runs match_cascade, counting each stage's candidates (tier_candidates_total) and time (stage_seconds)."""
+    report = match_cascade.run(query, ctx, on_pass, stop, record=lambda stage, considered, passed: record_tier(stage, considered, passed, ctx.pipeline), span=metrics.span)
+    log.debug("Cascade (%s): %s", ctx.pipeline, ", ".join(f"{name} {count_in}->{count_out}" for name, count_in, count_out, _ in report))
+    if ctx.degraded: log.warning("Model unavailable: %d candidate(s) were scored locally.", len({item_id for _, item_id in ctx.degraded}))
+    return report
+
+def with_confidence(scores):
+    """match_scores of a candidate that passed the final stage: every stage score, tiers it skipped as 0.0, and its confidence."""
+    match_scores = {"description": 0.0, "metadata": 0.0, "image": 0.0, **scores}
+    match_scores["confidence"] = match_confidence(match_scores)
+    return match_scores
+
+def fingerprint_image(image_path):
+    """Runs the upload pipeline (cached derivatives) and returns the image's perceptual hashes and colour histogram, or {} if it cannot be read."""
+    try:
+        return image_pipeline.process(image_path)["fingerprint"]
+    except Exception as e:
+        metrics.error('fingerprint', e); log.error("Error fingerprinting image %s: %s", image_path, e)
+        return {}
+
+def match_confidence(match_scores):
+    """Overall confidence of a pair that passed every tier."""
+    return (match_scores["description"] * 0.3) + (match_scores["metadata"] * 0.3) + (match_scores["image"] * 0.4)
+
+def record_matches(lost_item_id, matches, source):
+    """Stores (found_item_id, match_scores) pairs as Match rows of a saved search, skipping pairs already recorded."""
+    if not matches: return 0
+    existing = {found_id for (found_id,) in db.session.query(Match.found_item_id).filter(Match.lost_item_id == lost_item_id)}
+    new = [(found_id, scores) for found_id, scores in matches if found_id not in existing]
+    for found_id, scores in new:
+        db.session.add(Match(lost_item_id=lost_item_id, found_item_id=found_id, description_score=scores["description"], metadata_score=scores["metadata"],
+                             image_score=scores["image"], confidence=scores["confidence"], source=source))
+    metrics.inc('matches_recorded_total', len(new), source=source)
+    return len(new)
+
+def match_lost_item(lost_item_details, item_type, lost_fingerprint=None, on_match=None):
+    """Runs the match cascade for one lost-item query against the found-item catalogue.
+
+    on_match(match) is called as each match clears the final stage, so callers can stream results.
+    Returns (matches, deadline); matches are {"found_item", "scores", "confidence"} dicts in the order found.
+    """
+    deadline = Deadline(MATCH_DEADLINE_SECONDS); matches = []
+    ctx = CascadeContext('found', 'search', deadline, item_type=item_type, max_age_days=SEARCH_MAX_AGE_DAYS, items={})
+    log.debug("Starting match process for %s", os.path.basename(lost_item_details["image_path"]))
+    def on_pass(item_id, scores):
+        match_scores = with_confidence(scores)
+        log.debug("Strong match: item %s, confidence %.2f", item_id, match_scores["confidence"])
+        matches.append({"found_item": cascade_items(ctx, [item_id])[0], "scores": match_scores, "confidence": match_scores["confidence"]})
+        if on_match: on_match(matches[-1])
+    def enough_matches():
+        return MATCH_STOP_AFTER > 0 and sum(1 for m in matches if m["confidence"] >= MATCH_STOP_CONFIDENCE) >= MATCH_STOP_AFTER
+    run_match_cascade({**lost_item_details, "fingerprint": lost_fingerprint}, ctx, on_pass, enough_matches)
+    return matches, deadline
+
+def calculate_metadata_similarity(item_meta1, item_meta2):
+    """Calculates similarity based on item type, color, brand, location."""
+    score = 0; max_possible_score = 0
+    # Item Type (Exact Match, High Weight)
+    max_possible_score += 1.5
+    if item_meta1.get("item_type") and item_meta1["item_type"] == item_meta2.get("item_type"): score += 1.5
+    # Color (Partial Match)
+    max_possible_score += 1.0
+    if item_meta1.get("color") and item_meta1["color"] == item_meta2.get("color"): score += 1.0
+    elif item_meta1.get("color") and item_meta2.get("color") and (item_meta1["color"] in item_meta2["color"] or item_meta2["color"] in item_meta1["color"]): score += 0.5
+    # Brand (Partial Match, Bonus if both missing)
+    max_possible_score += 1.0
+    if item_meta1.get("brand") and item_meta1["brand"] == item_meta2.get("brand"): score += 1.0
+    elif item_meta1.get("brand") and item_meta2.get("brand") and (item_meta1["brand"] in item_meta2["brand"] or item_meta2["brand"] in item_meta1["brand"]): score += 0.5
+    elif not item_meta1.get("brand") and not item_meta2.get("brand"): score += 0.25
+    # Location (Gazetteer proximity when both name a known place, else substring match)
+    max_possible_score += 1.0
+    place1 = campus.resolve(item_meta1.get("location")); place2 = campus.resolve(item_meta2.get("location"))
+    if place1 and place2: score += campus.proximity(place1.id, place2.id)
+    elif item_meta1.get("location") and item_meta1["location"] == item_meta2.get("location"): score += 1.0
+    elif item_meta1.get("location") and item_meta2.get("location") and (item_meta1["location"] in item_meta2["location"] or item_meta2["location"] in item_meta1["location"]): score += 0.5
+    return score / max_possible_score if max_possible_score > 0 else 0
+
+# --- Context Processor ---
+@bp.app_context_processor
+def inject_now():
+    """Injects the current datetime into the template context."""
+    return {'now': datetime.utcnow}
+
+@bp.app_context_processor
+def inject_thumbnail_url():
+    """Lets templates show the cached thumbnail of an upload instead of the full-size original."""
+    return {'thumbnail_url': lambda image_filename: url_for('main.uploaded_file', filename=image_pipeline.thumbnail_filename(image_filename))}
+
+# --- Routes ---
+
+@bp.route('/')
+def index():
+    """Renders the home page."""
+    log.debug("Serving index page.")
+    return render_template('index.html')
+
+@bp.route('/report_found', methods=['GET', 'POST'])
+def report_found():
+    """Handles reporting a found item."""
+    item_types = ITEM_TYPES
+    if request.method == 'POST':
+        if 'item_image' not in request.files: flash('No image file part selected', 'danger'); return redirect(request.url)
+        file = request.files['item_image']
+        if file.filename == '': flash('No image selected for uploading', 'danger'); return redirect(request.url)
+        item_type = request.form.get('item_type'); location = request.form.get('location'); contact_info = request.form.get('contact_info')
+        if not all([item_type, location, contact_info]): flash('Item Type, Location Found, and Contact Info are required fields.', 'danger'); return render_template('report_found.html', item_types=item_types, entered_data=request.form)
+        if not file or not allowed_file(file.filename): flash('Invalid file type. Allowed types: png, jpg, jpeg, gif', 'danger'); return render_template('report_found.html', item_types=item_types, entered_data=request.form)
+
+        try:
+            stored = store_upload(file)
+            with metrics.span('fingerprint'): fingerprint = fingerprint_image(blob_store.path(stored.filename)) # Single decode: also writes the analysis and thumbnail derivatives (reused for duplicate images)
+
+            # Commit right away; the AI description and embedding are filled in by a background job
+            color = request.form.get('color'); brand = request.form.get('brand')
+            with metrics.span('db_commit'):
+                new_item = Item(status='found', item_type=item_type, color=color, brand=brand, location=location, image_filename=stored.filename, image_sha256=stored.sha256, contact_info=contact_info, description_status='pending', **fingerprint)
+                db.session.add(new_item); db.session.flush()
+                job_queue.enqueue('enrich_found_item', item_id=new_item.id)
+                db.session.commit()
+            job_queue.notify()
+            flash('Found item reported successfully! The AI description is being generated.', 'success')
+            return redirect(url_for('main.report_status', item_id=new_item.id))
+        except Exception as e:
+            db.session.rollback(); flash(f'An error occurred: {e}', 'danger'); log.error("Error reporting found item: %s", e); metrics.error('report_found', e)
+            return render_template('report_found.html', item_types=item_types, entered_data=request.form) # Return to form
+
+    # GET request
+    return render_template('report_found.html', item_types=item_types, entered_data={})
+
+@bp.route('/report_found/<int:item_id>')
+def report_status(item_id):
+    """Confirmation page for a report; polls item_status until the AI description is ready."""
+    item = db.session.get(Item, item_id)
+    if item is None or item.status != 'found': abort(404)
+    return render_template('report_status.html', item=item)
+
+@bp.route('/items/<int:item_id>/status')
+def item_status(item_id):
+    """JSON status of an item's background AI enrichment, for polling."""
+    item = db.session.get(Item, item_id)
+    if item is None: abort(404)
+    return jsonify({"id": item.id, "description_status": item.description_status or 'done', "ai_description": item.ai_description})
+
+def browse_filters(args):
+    """Browse filters from a query string: item_type, location, since/until (YYYY-MM-DD, inclusive), cursor, limit. 400 on bad values."""
+    try:
+        since = datetime.strptime(args['since'], '%Y-%m-%d') if args.get('since') else None
+        until = datetime.strptime(args['until'], '%Y-%m-%d') + timedelta(days=1) if args.get('until') else None
+        after = decode_cursor(args['cursor']) if args.get('cursor') else None
+        limit = min(max(int(args.get('limit', BROWSE_PAGE_SIZE)), 1), BROWSE_MAX_PAGE_SIZE)
+    except ValueError as e:
+        abort(400, description=str(e))
+    return {"item_type": args.get('item_type') or None, "location": (args.get('location') or '').strip() or None,
+            "since": since, "until": until, "after": after, "limit": limit}
+
+def browse_item_json(row):
+    description_status = row.description_status or 'done'
+    return {"id": row.id, "item_type": row.item_type, "color": row.color, "brand": row.brand, "location": row.location,
+            "reported": row.timestamp.isoformat(), "description_status": description_status,
+            "ai_description": row.ai_description if description_status == 'done' else None,
+            "thumbnail_url": url_for('main.uploaded_file', filename=image_pipeline.thumbnail_filename(row.image_filename)),
+            "image_url": url_for('main.uploaded_file', filename=row.image_filename)}
+
+def browse_page(version, filters):
+    """One page of the browse listing: (item dicts, next cursor or None), cached per catalogue version and filters.
+
+    Reads only the listed columns and one row past the page (to know whether there is a next page), walking the
+    (status, [item_type,] timestamp, id) index from the cursor instead of counting or skipping rows.
+    """
+    def load():
+        columns = (Item.id, Item.item_type, Item.color, Item.brand, Item.location, Item.timestamp,
+                   Item.ai_description, Item.description_status, Item.image_filename)
+        query_filters = {key: value for key, value in filters.items() if key != 'limit'}
+        with metrics.span('browse_query'): rows = browse_query(*columns, **query_filters).limit(filters['limit'] + 1).all()
+        more = len(rows) > filters['limit']; rows = rows[:filters['limit']]
+        return [browse_item_json(row) for row in rows], encode_cursor(rows[-1].timestamp, rows[-1].id) if more else None
+    return browse_cache.get_or_compute(('page', version, *sorted(filters.items())), load)
+
+def browse_etag(version):
+    """ETag of a browse response: changes with the catalogue version and the query string."""
+    return hashlib.sha1(f"{version}|{request.full_path}".encode()).hexdigest()
+
+def next_page_url(endpoint, next_cursor):
+    return url_for(endpoint, **{**request.args.to_dict(), 'cursor': next_cursor}) if next_cursor else None
+
+@bp.route('/items')
+def browse_items():
+    """Browse page of found items, newest first, with filters and keyset pagination.
+
+    The rendered item grid is cached per catalogue version, and responses carry an ETag so revisits and back
+    navigation are answered with a 304. Pages showing flash messages are never marked cacheable.
+    """
+    filters = browse_filters(request.args)
+    version = catalog_version.current(); etag = browse_etag(version)
+    cacheable = '_flashes' not in session
+    if cacheable and request.if_none_match.contains(etag):
+        response = Response(status=304)
+    else:
+        def render_grid():
+            items, next_cursor = browse_page(version, filters)
+            newest_url = url_for('main.browse_items', **{key: value for key, value in request.args.items() if key != 'cursor'}) if filters['after'] else None
+            return render_template('_item_grid.html', items=items, next_url=next_page_url('main.browse_items', next_cursor), newest_url=newest_url)
+        grid = browse_cache.get_or_compute(('html', version, request.full_path), render_grid, kind='browse_html')
+        response = make_response(render_template('browse.html', grid=grid, item_types=ITEM_TYPES, filters=request.args))
+    if cacheable: response.set_etag(etag); response.cache_control.no_cache = True
+    return response
+
+@bp.route('/api/items')
+def browse_items_api():
+    """JSON browse listing: {"items": [...], "next_cursor", "next"}. Same filters as /items, plus ?limit= (up to BROWSE_MAX_PAGE_SIZE).
+
+    Clients and proxies may reuse a response for BROWSE_HTTP_MAX_AGE seconds, then revalidate it with its ETag.
+    """
+    filters = browse_filters(request.args)
+    version = catalog_version.current(); etag = browse_etag(version)
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+    else:
+        items, next_cursor = browse_page(version, filters)
+        response = jsonify({"items": items, "next_cursor": next_cursor, "next": next_page_url('main.browse_items_api', next_cursor)})
+    response.set_etag(etag); response.cache_control.public = True; response.cache_control.max_age = BROWSE_HTTP_MAX_AGE
+    return response
+
+@bp.route('/search_lost', methods=['GET', 'POST'])
+def search_lost():
+    """Handles searching for a lost item."""
+    item_types = ITEM_TYPES
+    if request.method == 'POST':
+        if 'item_image' not in request.files: flash('No image file part selected for search', 'danger'); return redirect(request.url)
+        file = request.files['item_image']
+        if file.filename == '': flash('No image selected for searching', 'danger'); return redirect(request.url)
+        item_type = request.form.get('item_type'); location = request.form.get('location')
+        if not all([item_type, location]): flash('Item Type and Last Known Location are required.', 'danger'); return render_template('search_lost.html', item_types=item_types, entered_data=request.form)
+        if not file or not allowed_file(file.filename): flash('Invalid file type for search image.', 'danger'); return render_template('search_lost.html', item_types=item_types, entered_data=request.form)
+
+        try:
+            stored = store_upload(file)
+            search_filepath = blob_store.path(stored.filename)
+
+            with metrics.span('describe'): lost_ai_description = generate_description_gemini(search_filepath)
+            if lost_ai_description.startswith("Error:"): flash(f'AI description failed: {lost_ai_description}. Search quality might be affected.', 'warning'); lost_ai_description = ""
+            with metrics.span('fingerprint'): lost_fingerprint = fingerprint_image(search_filepath)
+
+            lost_item_details = {"item_type": normalize_item_type(item_type), "color": request.form.get('color', '').lower(), "brand": request.form.get('brand', '').lower(), "location": location.lower(), "ai_description": lost_ai_description, "image_path": search_filepath}
+            matches, deadline = match_lost_item(lost_item_details, item_type, lost_fingerprint)
+            if deadline.hit: metrics.inc('search_deadline_hits_total'); flash('The search took too long and was stopped early. Some matches may be missing, try again later.', 'warning')
+            if not models_available(): flash('AI comparison is temporarily unavailable, so some results are based on local similarity only.', 'warning')
+
+            # Save the search (and its image) so found items reported later are matched against it, see match_found_item
+            with metrics.span('db_commit'):
+                lost_item = Item(status='lost', item_type=item_type, color=request.form.get('color'), brand=request.form.get('brand'), location=location,
+                                 image_filename=stored.filename, image_sha256=stored.sha256, ai_description=lost_ai_description or None, contact_info=request.form.get('contact_info_search', ''),
+                                 description_status='done' if lost_ai_description else 'failed', **lost_fingerprint)
+                db.session.add(lost_item); db.session.flush()
+                record_matches(lost_item.id, [(m["found_item"].id, m["scores"]) for m in matches], 'search')
+                db.session.commit()
+            index_item_description(lost_item)
+
+            matches.sort(key=lambda x: x["confidence"], reverse=True)
+            with metrics.span('render'):
+                return render_template('results.html', matches=matches, search_description=lost_ai_description if lost_ai_description else "N/A", lost_item=lost_item, open_days=LOST_SEARCH_OPEN_DAYS)
+
+        except Exception as e:
+            db.session.rollback(); flash(f'An error occurred during search: {e}', 'danger'); log.error("Error during search process: %s", e); metrics.error('search_lost', e)
+            return redirect(url_for('main.search_lost')) # Redirect back to search form
+
+    # GET request
+    return render_template('search_lost.html', item_types=item_types, entered_data={})
+
+def standing_matches(lost_item_id):
+    """Recorded matches of a saved search, best first, with their found items loaded."""
+    return Match.query.filter_by(lost_item_id=lost_item_id).options(db.joinedload(Match.found_item)).order_by(Match.confidence.desc()).all()
+
+@bp.route('/searches/<int:item_id>')
+def search_status(item_id):
+    """A saved lost-item search and its standing matches, including found items reported after the search."""
+    lost_item = db.session.get(Item, item_id)
+    if lost_item is None or lost_item.status != 'lost': abort(404)
+    open_until = lost_item.timestamp + timedelta(days=LOST_SEARCH_OPEN_DAYS)
+    return render_template('search_status.html', lost_item=lost_item, matches=standing_matches(item_id), open_until=open_until, is_open=open_until > datetime.utcnow(),
+                           running=lost_item.search_status == 'running')
+
+def match_json(m, with_html=False):
+    """A Match as JSON for polling and streaming; with_html adds the rendered result card."""
+    data = {"id": m.id, "found_item_id": m.found_item_id, "item_type": m.found_item.item_type, "location": m.found_item.location, "contact_info": m.found_item.contact_info,
+            "thumbnail_url": url_for('main.uploaded_file', filename=image_pipeline.thumbnail_filename(m.found_item.image_filename)),
+            "confidence": m.confidence, "scores": m.scores, "source": m.source, "matched_at": m.created_at.isoformat()}
+    if with_html: data["html"] = render_template('_match_card.html', match=m)
+    return data
+
+def search_state_json(lost_item):
+    return {"id": lost_item.id, "search_status": lost_item.search_status or 'done', "description_status": lost_item.description_status or 'done', "ai_description": lost_item.ai_description}
+
+@bp.route('/searches/<int:item_id>/matches')
+def search_matches(item_id):
+    """JSON standing matches of a saved search, for polling (also the fallback when a results stream drops). ?html=1 adds rendered cards."""
+    lost_item = db.session.get(Item, item_id)
+    if lost_item is None or lost_item.status != 'lost': abort(404)
+    open_until = lost_item.timestamp + timedelta(days=LOST_SEARCH_OPEN_DAYS)
+    with_html = request.args.get('html', type=int) == 1
+    return jsonify({**search_state_json(lost_item), "open": open_until > datetime.utcnow(), "open_until": open_until.isoformat(),
+                    "matches": [match_json(m, with_html) for m in standing_matches(item_id)]})
+
+@bp.route('/searches', methods=['POST'])
+def start_search():
+    """Streaming search: saves the search and queues it, returning its id at once (202).
+
+    The run_search job does the matching; results arrive through search_events (or polling search_matches).
+    """
+    file = request.files.get('item_image')
+    item_type = request.form.get('item_type'); location = request.form.get('location')
+    if not file or not file.filename or not allowed_file(file.filename): return jsonify({"error": "An image is required. Allowed types: png, jpg, jpeg, gif"}), 400
+    if not all([item_type, location]): return jsonify({"error": "Item Type and Last Known Location are required."}), 400
+
+    try:
+        stored = store_upload(file)
+        with metrics.span('db_commit'):
+            lost_item = Item(status='lost', item_type=item_type, color=request.form.get('color'), brand=request.form.get('brand'), location=location,
+                             image_filename=stored.filename, image_sha256=stored.sha256, contact_info=request.form.get('contact_info_search', ''),
+                             description_status='pending', search_status='running')
+            db.session.add(lost_item); db.session.flush()
+            job_queue.enqueue('run_search', item_id=lost_item.id)
+            db.session.commit()
+        job_queue.notify()
+    except Exception as e:
+        db.session.rollback(); log.error("Error starting search: %s", e); metrics.error('start_search', e)
+        return jsonify({"error": f"An error occurred: {e}"}), 500
+    return jsonify({"id": lost_item.id, "page_url": url_for('main.search_status', item_id=lost_item.id),
+                    "events_url": url_for('main.search_events', item_id=lost_item.id), "matches_url": url_for('main.search_matches', item_id=lost_item.id)}), 202
+
+def sse(event, data, event_id=None):
+    """One Server-Sent Events message."""
+    return (f"id: {event_id}\n" if event_id is not None else "") + f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@bp.route('/searches/<int:item_id>/events')
+def search_events(item_id):
+    """Server-Sent Events for a search: 'state' (description and status), one 'match' per recorded match, then 'done'.
+
+    Progress is read from the DB, where the run_search job commits each match as it clears the image tier, so any web
+    process can serve the stream. A stream only lasts SEARCH_STREAM_MAX_SECONDS, so it never holds a worker thread for
+    a whole search: the browser then reconnects by itself after SEARCH_STREAM_RETRY_SECONDS and resumes after
+    Last-Event-ID (the last match id it saw).
+    """
+    lost_item = db.session.get(Item, item_id)
+    if lost_item is None or lost_item.status != 'lost': abort(404)
+    last_id = request.headers.get('Last-Event-ID', type=int, default=0)
+
+    def events():
+        sent = last_id; state = None; started = time.monotonic()
+        yield f"retry: {int(SEARCH_STREAM_RETRY_SECONDS * 1000)}\n\n"
+        while True:
+            db.session.rollback() # End the read transaction so commits made by the job are visible
+            item = db.session.get(Item, item_id)
+            if search_state_json(item) != state:
+                state = search_state_json(item); yield sse('state', state)
+            for m in Match.query.filter(Match.lost_item_id == item_id, Match.id > sent).options(db.joinedload(Match.found_item)).order_by(Match.id):
+                sent = m.id; yield sse('match', match_json(m, with_html=True), event_id=m.id)
+            if state["search_status"] != 'running': yield sse('done', state); return
+            if time.monotonic() - started >= SEARCH_STREAM_MAX_SECONDS: return # The browser reconnects
+            time.sleep(SEARCH_STREAM_POLL_SECONDS)
+
+    return Response(stream_with_context(events()), mimetype='text/event-stream', headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@bp.route('/cache/stats')
+def cache_stats():
+    """Hit/miss counters and sizes of the model result cache."""
+    return jsonify(score_cache.stats())
+
+@bp.route('/metrics')
+def metrics_endpoint():
+    """Counters and stage timings of this process in the Prometheus text format."""
+    if not METRICS_ENABLED: abort(404)
+    for name, value in score_cache.stats().items():
+        if name.endswith('entries'): metrics.set_gauge('cache_entries', value, tier=name.split('_')[0])
+    for status, count in job_queue.stats().items(): metrics.set_gauge('jobs', count, status=status)
+    for status, index in vector_indexes.items(): metrics.set_gauge('vector_index_items', len(index), status=status)
+    for api, client in model_clients.get().items(): metrics.set_gauge('model_circuit_open', int(not client.available()), api=api)
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+@bp.route('/uploads/<path:filename>')
+def uploaded_file(filename):
+    """Serves uploaded files from the UPLOAD_FOLDER securely.
+
+    Blobs and derivatives are named by content hash, so they get a strong ETag (the hash) and immutable caching.
+    With UPLOAD_SENDFILE set, the web server sends the bytes (X-Accel-Redirect / X-Sendfile) instead of this process.
+    """
+    if '..' in filename or filename.startswith('/'): abort(404)
+    content_addressed = blob_store.is_blob(filename) or filename.startswith(DERIVED_SUBFOLDER + '/')
+    etag = os.path.basename(filename).split('.', 1)[0] if content_addressed else True
+    if UPLOAD_SENDFILE == 'x-accel-redirect':
+        if not os.path.isfile(os.path.join(current_app.config['UPLOAD_FOLDER'], filename)): abort(404)
+        response = Response(mimetype=mimetypes.guess_type(filename)[0] or 'application/octet-stream')
+        response.headers['X-Accel-Redirect'] = UPLOAD_ACCEL_PREFIX + filename
+        if content_addressed: response.set_etag(etag)
+        response = response.make_conditional(request)
+    else:
+        try:
+            response = send_from_directory(current_app.config['UPLOAD_FOLDER'], filename, as_attachment=False, etag=etag, max_age=UPLOAD_CACHE_MAX_AGE if content_addressed else None)
+        except FileNotFoundError: abort(404)
+    if content_addressed:
+        response.cache_control.public = True; response.cache_control.max_age = UPLOAD_CACHE_MAX_AGE; response.cache_control.immutable = True
+    return response
+
+# --- Background Jobs ---
+def mark_description_failed(item_id):
+    """Dead-letter handler: records that the AI description could not be generated."""
+    item = db.session.get(Item, item_id)
+    if item is None: return
+    item.ai_description = "AI description generation failed."; item.description_status = 'failed'
+
+@job_queue.handler('enrich_found_item', on_dead=mark_description_failed)
+def enrich_found_item(item_id):
+    """Fingerprints a newly reported item, generates its AI description and adds it to the vector index."""
+    item = db.session.get(Item, item_id)
+    if item is None or item.description_status not in ('pending', None): return # Deleted or already processed
+    image_path = os.path.join(current_app.config['UPLOAD_FOLDER'], item.image_filename)
+    if not item.get_fingerprint():
+        for field, value in fingerprint_image(image_path).items(): setattr(item, field, value)
+        db.session.commit() # Keep the fingerprint even if the description attempt below fails
+    ai_description = generate_description_gemini(image_path)
+    if ai_description.startswith("Error:"): raise RuntimeError(ai_description)
+    item.ai_description = ai_description; item.description_status = 'done'
+    db.session.commit()
+    index_item_description(item)
+    job_queue.enqueue('match_found_item', item_id=item.id) # Now that it has a description, match it against saved searches
+    db.session.commit(); job_queue.notify()
+    log.info("Background enrichment finished for item %s.", item_id)
+
+def mark_search_failed(item_id):
+    """Dead-letter handler for run_search: ends the stream with a failed status."""
+    item = db.session.get(Item, item_id)
+    if item is None: return
+    item.search_status = 'failed'
+    if item.description_status == 'pending': item.description_status = 'failed'
+
+@job_queue.handler('run_search', on_dead=mark_search_failed)
+def run_search(item_id):
+    """Streaming search: describes a saved search's image, then records each match as soon as it clears the image tier."""
+    lost_item = db.session.get(Item, item_id)
+    if lost_item is None or lost_item.search_status != 'running': return
+    image_path = os.path.join(current_app.config['UPLOAD_FOLDER'], lost_item.image_filename)
+    if not lost_item.get_fingerprint():
+        with metrics.span('fingerprint'):
+            for field, value in fingerprint_image(image_path).items(): setattr(lost_item, field, value)
+    if lost_item.description_status == 'pending':
+        with metrics.span('describe'): ai_description = generate_description_gemini(image_path)
+        if ai_description.startswith("Error:"): lost_item.description_status = 'failed' # Search on, like the classic path
+        else: lost_item.ai_description = ai_description; lost_item.description_status = 'done'
+    db.session.commit() # Streamed to the page as a 'state' event
+
+    lost_item_details = {**lost_item.get_metadata(), "ai_description": lost_item.ai_description or "", "image_path": image_path}
+    def stream_match(match):
+        record_matches(item_id, [(match["found_item"].id, match["scores"])], 'search'); db.session.commit()
+    matches, deadline = match_lost_item(lost_item_details, lost_item.item_type, lost_item.get_fingerprint(), on_match=stream_match)
+    if deadline.hit: metrics.inc('search_deadline_hits_total')
+    lost_item.search_status = 'done'; db.session.commit()
+    index_item_description(lost_item)
+    log.info("Streaming search %s finished with %d match(es).", item_id, len(matches))
+
+@job_queue.handler('match_found_item')
+def match_found_item(item_id):
+    """Reverse matching: scores one newly reported found item against the open saved searches and records matches.
+
+    Runs the match cascade with the roles swapped (candidates are open lost items, embedding retrieval uses the
+    lost-search vector index), so the cost depends on the number of open searches, not the catalogue size.
+    """
+    found_item = db.session.get(Item, item_id)
+    if found_item is None or found_item.status != 'found' or not is_usable_description(found_item.ai_description): return
+    # Nobody is waiting on this job, so while a model is unavailable it is retried later instead of scoring locally
+    if not models_available(): raise ModelUnavailable("Gemini unavailable, reverse matching deferred")
+    query = {**found_item.get_metadata(), "ai_description": found_item.ai_description, "fingerprint": found_item.get_fingerprint(),
+             "image_path": os.path.join(current_app.config['UPLOAD_FOLDER'], found_item.image_filename)}
+    ctx = CascadeContext('lost', 'new_item', Deadline(MATCH_DEADLINE_SECONDS), item_type=found_item.item_type, max_age_days=LOST_SEARCH_OPEN_DAYS, items={})
+    matched = 0
+    def on_pass(lost_item_id, scores):
+        nonlocal matched
+        matched += record_matches(lost_item_id, [(found_item.id, with_confidence(scores))], 'new_item')
+    run_match_cascade(query, ctx, on_pass)
+    if ctx.degraded or not models_available(): raise ModelUnavailable("Gemini became unavailable during reverse matching") # Retried from scratch
+    db.session.commit()
+    if matched: log.info("Found item %s matched %d saved search(es).", item_id, matched)
+
+def rebuild_vector_indexes(reembed=False):
+    """Rewrites the vector index files from the live rows (re-embedding every description with reembed=True), then bumps
+    vector_index_version so every process reloads them.
+
+    Run after items are archived: a process still holding an archived item's vector would otherwise give it to a new
+    item that reuses its id (SQLite does), and index_missing_candidates would never embed the new one. Returns
+    {status: (added, removed)}.
+    """
+    embedder = embedding_backend.get()
+    if not embedder: return {}
+    changes = {}
+    for status, filename in VECTOR_INDEX_FILES.items():
+        path = os.path.join(current_app.instance_path, filename)
+        index = VectorIndex(path, embedder.name) if reembed else VectorIndex.load(path, embedder.name)
+        changes[status] = index.sync_from_rows(candidate_query(Item.id, Item.ai_description, status=status).yield_per(QUERY_BATCH_SIZE), embedder)
+        index.save(); vector_indexes[status] = index
+    if vector_index_version is not None: vector_index_version.bump()
+    stamp = vector_index_version.current() if vector_index_version is not None else None
+    vector_index_stamps.update((status, stamp) for status in VECTOR_INDEX_FILES)
+    return changes
+
+def run_maintenance(dry_run=False, vacuum=False, max_seconds=MAINTENANCE_MAX_SECONDS, pause_seconds=MAINTENANCE_PAUSE_SECONDS):
+    """One maintenance pass (see maintenance.Maintenance), in order: archive expired saved searches and stale found items,
+    rebuild the vector indexes without them, remove unreferenced blobs, legacy uploads and derivatives, then
+    ANALYZE/vacuum and optimize the full-text index.
+    Returns {step: count}.
+    """
+    run = Maintenance(blob_store, image_pipeline, batch_size=MAINTENANCE_BATCH_SIZE, pause_seconds=pause_seconds, max_seconds=max_seconds,
+                      grace_seconds=BLOB_GC_GRACE_SECONDS, dry_run=dry_run)
+    run.archive_expired(found_after_days=ARCHIVE_FOUND_AFTER_DAYS, searches_after_days=ARCHIVE_SEARCHES_AFTER_DAYS)
+    if any(run.archived.values()): rebuild_vector_indexes()
+    for step in (run.remove_unreferenced_blobs, run.remove_orphan_uploads, run.remove_orphan_derivatives):
+        if not run.out_of_time(): step()
+    run.optimize_database(vacuum=vacuum, vacuum_pages=SQLITE_INCREMENTAL_VACUUM_PAGES)
+    for step, count in run.counts.items():
+        if count and not dry_run: metrics.inc('maintenance_total', count, step=step)
+    log.info("Maintenance pass%s finished in %.1fs: %s%s", " (dry run)" if dry_run else "", time.monotonic() - run.started,
+             ", ".join(f"{step} {count}" for step, count in run.counts.items()) or "nothing to do", " (time budget used up)" if run.out_of_time() else "")
+    return run.counts
+
+@job_queue.handler('maintenance')
+def maintenance_job():
+    """Recurring maintenance pass, every MAINTENANCE_INTERVAL_SECONDS (see JobQueue.recurring)."""
+    run_maintenance()
+
+@bp.before_app_request
+def start_job_workers():
+    """Starts the background workers with the first request of each process (no-op afterwards)."""
+    job_queue.start(current_app._get_current_object())
+
+# --- Request Timing & Profiling ---
+@bp.before_app_request
+def start_request_timing():
+    g.request_started = time.perf_counter()
+    g.profile = profiler.start()
+
+@bp.teardown_app_request
+def finish_request_timing(exc):
+    started = g.pop('request_started', None)
+    endpoint = (request.endpoint or 'unknown').split('.')[-1] # Without the blueprint name
+    if started is not None: metrics.observe('request_seconds', time.perf_counter() - started, endpoint=endpoint)
+    profiler.stop(g.pop('profile', None), endpoint)
+
+# --- Database Initialization ---
+def init_db():
+    """Creates missing tables and columns (inside an app context)."""
+    log.info("Attempting to create database tables if they don't exist...")
+    try:
+        db.create_all()
+        ensure_schema()
+        log.info("Database tables checked/created successfully.")
+    except Exception as e:
+        log.critical("Error creating database tables: %s", e)
+
+@bp.cli.command('init-db')
+def init_db_command():
+    """Creates missing tables and columns (run once after upgrading when using `flask run` or wsgi.py)."""
+    init_db()
+
+@bp.cli.command('backfill-fingerprints')
+@click.option('--force', is_flag=True, help='Recompute fingerprints that already exist.')
+@click.option('--workers', default=4, show_default=True, help='Images decoded in parallel.')
+@click.option('--batch-size', default=100, show_default=True, help='Items committed per transaction.')
+def backfill_fingerprints_command(force, workers, batch_size):
+    """Computes image fingerprints and cached derivatives for items uploaded before they existed."""
+    ensure_schema()
+    query = Item.query.order_by(Item.id)
+    if not force: query = query.filter(Item.image_phash.is_(None))
+    items = query.all()
+    print(f"Fingerprinting {len(items)} item image(s) with {workers} worker(s)...")
+    paths = [os.path.join(current_app.config['UPLOAD_FOLDER'], item.image_filename) for item in items]
+    done = 0; missing = 0
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for item, fingerprint in zip(items, pool.map(fingerprint_image, paths)):
+            if not fingerprint: missing += 1; continue
+            for field, value in fingerprint.items(): setattr(item, field, value)
+            done += 1
+            if done % batch_size == 0: db.session.commit(); print(f"  {done} fingerprinted...")
+    db.session.commit()
+    print(f"Backfill complete: {done} fingerprinted, {missing} skipped (missing or unreadable image).")
+
+jobs_cli = AppGroup('jobs', help='Inspect and manage background jobs.')
+bp.cli.add_command(jobs_cli)
+
+@jobs_cli.command('stats')
+def jobs_stats_command():
+    """Prints job counts by status."""
+    for status, count in job_queue.stats().items(): print(f"{status:>8}: {count}")
+
+@jobs_cli.command('retry-dead')
+def jobs_retry_dead_command():
+    """Requeues dead-lettered jobs with a fresh attempt budget."""
+    print(f"Requeued {job_queue.retry_dead()} dead job(s).")
+
+@jobs_cli.command('work')
+@click.option('--workers', default=max(JOB_WORKERS, 1), show_default=True, help='Worker threads.')
+def jobs_work_command(workers):
+    """Runs job workers in the foreground until interrupted (e.g. a separate worker process)."""
+    job_queue.workers = workers
+    job_queue.start(current_app._get_current_object())
+    try:
+        while True: time.sleep(3600)
+    except KeyboardInterrupt:
+        job_queue.stop()
+
+blobs_cli = AppGroup('blobs', help='Manage the content-addressed upload store.')
+bp.cli.add_command(blobs_cli)
+
+@blobs_cli.command('stats')
+def blobs_stats_command():
+    """Prints stored blobs, their size and how many item images they deduplicate."""
+    blobs, size, refs = db.session.query(db.func.count(Blob.sha256), db.func.coalesce(db.func.sum(Blob.size), 0), db.func.coalesce(db.func.sum(Blob.ref_count), 0)).one()
+    legacy = Item.query.filter(Item.image_sha256.is_(None)).count()
+    print(f"{blobs} blob(s), {size / 1024 / 1024:.1f} MB, referenced by {refs} item(s); {legacy} item(s) still use pre-store uploads (see `blobs migrate`).")
+
+@blobs_cli.command('migrate')
+@click.option('--batch-size', default=100, show_default=True, help='Items committed per transaction.')
+def blobs_migrate_command(batch_size):
+    """Moves uploads saved before the blob store into it, keeping one copy of identical images."""
+    ensure_schema()
+    moved = missing = 0; legacy_files = set()
+    for item in Item.query.filter(Item.image_sha256.is_(None)).order_by(Item.id).all():
+        legacy_path = os.path.join(current_app.config['UPLOAD_FOLDER'], item.image_filename)
+        if not os.path.isfile(legacy_path): missing += 1; continue
+        with open(legacy_path, 'rb') as f: stored = blob_store.save(f, os.path.splitext(item.image_filename)[1])
+        register_blob(stored)
+        legacy_files.add(item.image_filename)
+        item.image_filename = stored.filename; item.image_sha256 = stored.sha256; moved += 1
+        if moved % batch_size == 0: db.session.commit()
+    db.session.commit()
+    print(f"Corrected {recount_blobs()} blob reference count(s).")
+    still_used = {filename for (filename,) in db.session.query(Item.image_filename).filter(Item.image_filename.in_(legacy_files))} if legacy_files else set()
+    for filename in legacy_files - still_used: os.remove(os.path.join(current_app.config['UPLOAD_FOLDER'], filename))
+    print(f"Migrated {moved} item image(s), removed {len(legacy_files - still_used)} legacy file(s); {missing} item(s) skipped (image missing).")
+
+@blobs_cli.command('gc')
+@click.option('--grace-seconds', default=BLOB_GC_GRACE_SECONDS, show_default=True, help='Keep unreferenced blobs younger than this.')
+@click.option('--dry-run', is_flag=True, help='Only report what would be removed.')
+def blobs_gc_command(grace_seconds, dry_run):
+    """Removes blobs no item references any more, and files left by failed or interrupted uploads."""
+    recount_blobs()
+    referenced = {sha256 for (sha256,) in db.session.query(Blob.sha256).filter(Blob.ref_count > 0)}
+    removed = 0
+    for filename, sha256 in blob_store.iter_files(older_than_seconds=grace_seconds):
+        if sha256 in referenced: continue
+        removed += 1
+        if dry_run: print(f"  would remove {filename}"); continue
+        blob_store.delete(filename)
+        Blob.query.filter_by(sha256=sha256, ref_count=0).delete()
+    if not dry_run: db.session.commit(); removed += blob_store.clean_tmp(grace_seconds)
+    print(f"{'Would remove' if dry_run else 'Removed'} {removed} unreferenced file(s).")
+
+items_cli = AppGroup('items', help='Bulk import and export of found items.')
+bp.cli.add_command(items_cli)
+
+def import_row_error(directory, row, default_contact):
+    """Why a manifest row cannot be imported, or None if it can."""
+    if "_error" in row: return row["_error"]
+    missing = [field for field in ("image", "item_type", "location") if not row.get(field)]
+    if not (row.get("contact_info") or default_contact): missing.append("contact_info")
+    if missing: return f"missing {', '.join(missing)}"
+    if not allowed_file(row["image"]): return f"not an allowed image type: {row['image']}"
+    root = os.path.realpath(directory); image_path = os.path.realpath(os.path.join(root, row["image"]))
+    if os.path.commonpath([root, image_path]) != root or not os.path.isfile(image_path): return f"image not found in {directory}: {row['image']}"
+    if row.get("timestamp"):
+        try: datetime.fromisoformat(row["timestamp"])
+        except ValueError: return f"invalid timestamp: {row['timestamp']}"
+    return None
+
+def store_import_image(image_path):
+    """Worker thread: streams one import image into the blob store (no DB access). Returns the StoredBlob."""
+    with open(image_path, 'rb') as f: return blob_store.save(f, os.path.splitext(image_path)[1])
+
+def enrich_import_image(image_path, description, describe):
+    """Worker thread: fingerprints an imported image (writing its derivatives) and describes it unless the manifest did.
+
+    Returns (fingerprint, description); the description is None when generation failed or was left to the job workers.
+    """
+    fingerprint = fingerprint_image(image_path)
+    if description or not describe: return fingerprint, description
+    description = generate_description_gemini(image_path)
+    return fingerprint, None if description.startswith("Error:") else description
+
+def import_batch(pool, directory, batch, default_contact, describe):
+    """Imports one batch of manifest rows in a single transaction. Returns (imported, duplicates, failed).
+
+    Image work runs on the pool; the session is only used from this thread. A row whose image is already a found
+    item with the same type and location is a duplicate (e.g. a batch re-run after an interrupted checkpoint write).
+    """
+    rows = []; failed = 0
+    for number, row in batch:
+        error = import_row_error(directory, row, default_contact)
+        if error: print(f"  Row {number}: {error}"); failed += 1
+        else: rows.append((number, row, os.path.join(directory, row["image"])))
+    stored = []
+    for (number, row, image_path), future in [(entry, pool.submit(store_import_image, entry[2])) for entry in rows]:
+        try: stored.append((number, row, future.result()))
+        except Exception as e: print(f"  Row {number}: could not store {row['image']} ({e})"); failed += 1
+    seen = {tuple(row) for row in db.session.query(Item.image_sha256, Item.item_type, Item.location)
+            .filter(Item.status == 'found', Item.image_sha256.in_({blob.sha256 for _, _, blob in stored}))}
+    new = []
+    for number, row, blob in stored:
+        key = (blob.sha256, row["item_type"], row["location"])
+        if key not in seen: seen.add(key); new.append((number, row, blob))
+    enriched = [pool.submit(enrich_import_image, blob_store.path(blob.filename), row.get("ai_description"), describe) for _, row, blob in new]
+    items = []
+    for (number, row, blob), future in zip(new, enriched):
+        fingerprint, description = future.result() # Neither step raises: failures come back as {} / None
+        register_blob(blob)
+        item = Item(status='found', item_type=row["item_type"], color=row.get("color"), brand=row.get("brand"), location=row["location"],
+                    image_filename=blob.filename, image_sha256=blob.sha256, contact_info=row.get("contact_info") or default_contact,
+                    ai_description=description, description_status='done' if description else 'pending', **fingerprint)
+        if row.get("timestamp"): item.timestamp = datetime.fromisoformat(row["timestamp"])
+        items.append(item)
+    db.session.add_all(items); db.session.flush()
+    for item in items: job_queue.enqueue('match_found_item' if item.description_status == 'done' else 'enrich_found_item', item_id=item.id)
+    db.session.commit()
+    for item in items: index_item_description(item)
+    return len(items), len(stored) - len(new), failed
+
+@items_cli.command('import')
+@click.argument('directory', type=click.Path(exists=True, file_okay=False))
+@click.option('--manifest', type=click.Path(exists=True, dir_okay=False), help='CSV (with a header row) or JSONL manifest. Default: manifest.csv or manifest.jsonl in DIRECTORY.')
+@click.option('--checkpoint', 'checkpoint_path', type=click.Path(dir_okay=False), help='Progress file. Default: the manifest path + .checkpoint.')
+@click.option('--restart', is_flag=True, help='Ignore the checkpoint and import from the first row.')
+@click.option('--contact-info', default=None, help='Contact info for rows without one (e.g. the front desk).')
+@click.option('--describe/--no-describe', default=True, show_default=True, help='Generate AI descriptions during the import, or queue them for the job workers.')
+@click.option('--workers', default=IMPORT_WORKERS, show_default=True, help='Images stored, fingerprinted and described in parallel.')
+@click.option('--batch-size', default=IMPORT_BATCH_SIZE, show_default=True, help='Rows inserted per transaction and per checkpoint.')
+def items_import_command(directory, manifest, checkpoint_path, restart, contact_info, describe, workers, batch_size):
+    """Imports found items from a directory of photos and a manifest (columns: see bulk.MANIFEST_FIELDS).
+
+    The manifest is streamed; progress is checkpointed after each committed batch, so running the same command
+    again after an interruption continues where it stopped (and only imports rows appended since a finished run).
+    """
+    ensure_schema()
+    manifest = manifest or find_manifest(directory)
+    if not manifest: raise click.UsageError(f"No manifest.csv or manifest.jsonl in {directory}; pass --manifest.")
+    checkpoint_path = checkpoint_path or manifest + '.checkpoint'
+    try:
+        checkpoint = ImportCheckpoint(checkpoint_path, manifest) if restart else ImportCheckpoint.load(checkpoint_path, manifest)
+    except ValueError as e:
+        raise click.UsageError(str(e))
+    if checkpoint.rows_done: print(f"Resuming after row {checkpoint.rows_done} ({checkpoint.imported} imported so far).")
+    print(f"Importing {manifest} with {workers} worker(s)...")
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for batch in batched(read_manifest(manifest, skip=checkpoint.rows_done), batch_size):
+            checkpoint.advance(len(batch), *import_batch(pool, directory, batch, contact_info, describe)); checkpoint.save()
+            print(f"  {checkpoint.rows_done} row(s): {checkpoint.imported} imported, {checkpoint.duplicates} duplicate(s), {checkpoint.failed} failed")
+    for index in vector_indexes.values():
+        if index.dirty: index.save()
+    pending = Item.query.filter_by(status='found', description_status='pending').count()
+    print(f"Import complete: {checkpoint.imported} imported, {checkpoint.duplicates} duplicate(s), {checkpoint.failed} failed (checkpoint {checkpoint_path}).")
+    if pending: print(f"{pending} item(s) wait for an AI description from the job workers (`flask jobs work`).")
+
+@items_cli.command('export')
+@click.argument('output', type=click.File('w', encoding='utf-8'), default='-')
+@click.option('--status', type=click.Choice(['found', 'lost']), default='found', show_default=True)
+@click.option('--since', type=click.DateTime(), default=None, help='Only items reported on or after this date.')
+def items_export_command(output, status, since):
+    """Writes items as JSONL (default: to stdout), streamed in id order without loading the catalogue into memory.
+
+    Found items are written in the import manifest format, with image paths relative to the upload folder, so
+    `flask items import <upload folder> --manifest <file>` loads them into another instance.
+    """
+    columns = (Item.id, Item.item_type, Item.color, Item.brand, Item.location, Item.contact_info, Item.image_filename,
+               Item.image_sha256, Item.ai_description, Item.description_status, Item.timestamp)
+    count = 0
+    for row in candidate_query(*columns, status=status, since=since).order_by(Item.id).yield_per(QUERY_BATCH_SIZE):
+        record = row._asdict()
+        record["image"] = record.pop("image_filename"); record["timestamp"] = row.timestamp.isoformat() if row.timestamp else None
+        if record["description_status"] != 'done': record["ai_description"] = None # Error text or not generated yet
+        output.write(json.dumps(record) + "\n"); count += 1
+    print(f"Exported {count} {status} item(s).", file=sys.stderr) # stdout may be the export itself
+
+@items_cli.command('claim')
+@click.argument('item_ids', nargs=-1, type=int, required=True)
+def items_claim_command(item_ids):
+    """Archives found items returned to their owners: they leave searches and the browse listing at once."""
+    run = Maintenance(blob_store, image_pipeline, batch_size=MAINTENANCE_BATCH_SIZE, pause_seconds=0, max_seconds=float('inf'))
+    moved = run.archive(Item.query.filter(Item.id.in_(item_ids), Item.status == 'found'), 'claimed')
+    if moved: rebuild_vector_indexes()
+    print(f"Archived {moved} claimed item(s); {len(set(item_ids)) - moved} id(s) were not found items.")
+
+maintenance_cli = AppGroup('maintenance', help='Retention and compaction of items, uploads and the database.')
+bp.cli.add_command(maintenance_cli)
+
+@maintenance_cli.command('run')
+@click.option('--dry-run', is_flag=True, help='Only count what would be archived or removed.')
+@click.option('--vacuum', is_flag=True, help='Also rewrite the database with VACUUM (locks it; run off-peak). Enables incremental vacuuming on SQLite.')
+@click.option('--max-seconds', default=MAINTENANCE_MAX_SECONDS, show_default=True, help='Time budget; what is left is done by the next run.')
+@click.option('--pause-seconds', default=MAINTENANCE_PAUSE_SECONDS, show_default=True, help='Pause between batches (0 when nothing else uses the database).')
+def maintenance_run_command(dry_run, vacuum, max_seconds, pause_seconds):
+    """Runs one maintenance pass now (the job workers also run one every MAINTENANCE_INTERVAL_SECONDS)."""
+    counts = run_maintenance(dry_run=dry_run, vacuum=vacuum, max_seconds=max_seconds, pause_seconds=pause_seconds)
+    for step, count in counts.items(): print(f"{step:>16}: {count}{' (dry run)' if dry_run and step != 'analyzed' else ''}")
+    if not counts: print("Nothing to do.")
+
+places_cli = AppGroup('places', help='Resolve item locations to gazetteer places.')
+bp.cli.add_command(places_cli)
+
+@places_cli.command('reindex')
+@click.option('--batch-size', default=1000, show_default=True, help='Items updated per transaction.')
+def places_reindex_command(batch_size):
+    """Re-resolves every item's location against the gazetteer (run after editing it)."""
+    print(f"Gazetteer has {len(campus)} place(s); {assign_places(batch_size, reassign=True)} item(s) changed place.")
+
+@places_cli.command('check')
+@click.option('--top', default=20, show_default=True, help='Unresolved locations listed.')
+def places_check_command(top):
+    """Items per place, and the most common locations that name no known place (candidates for new aliases)."""
+    counts = dict(db.session.query(Item.place_id, db.func.count(Item.id)).group_by(Item.place_id).all())
+    for place in campus: print(f"{place.id:<30} {counts.get(place.id, 0):>8}  {place.name}")
+    unresolved = {}
+    for (location,) in db.session.query(Item.location).filter(Item.place_id == '').yield_per(QUERY_BATCH_SIZE):
+        key = normalize_place_text(location); unresolved[key] = unresolved.get(key, 0) + 1
+    print(f"{'(unplaced)':<30} {counts.get('', 0):>8}" + (f"  (+{counts[None]} not resolved yet, run `flask init-db`)" if counts.get(None) else ""))
+    for location, count in sorted(unresolved.items(), key=lambda entry: -entry[1])[:top]: print(f"  {count:>6}  {location}")
+
+@bp.cli.command('check-metadata-parity')
+@click.option('--queries', default=200, show_default=True, help='Catalogue items reused as lost-item queries.')
+def check_metadata_parity_command(queries):
+    """Verifies the vectorized metadata scorer gives exactly the scores of calculate_metadata_similarity."""
+    items = candidate_query().yield_per(QUERY_BATCH_SIZE).all()
+    lost_metas = [item.get_metadata() for item in items[:queries]] + PARITY_EDGE_CASES
+    mismatches = find_parity_mismatches(lost_metas, items, calculate_metadata_similarity)
+    print(f"Compared {len(lost_metas)} queries x {len(items)} found items: {len(mismatches)} mismatch(es).")
+    for lost_meta, item_id, batch_score, reference_score in mismatches[:20]:
+        print(f"  {lost_meta} vs item {item_id}: batch {batch_score!r} != reference {reference_score!r}")
+    if mismatches: raise SystemExit(1)
+
+@bp.cli.command('rebuild-vector-index')
+def rebuild_vector_index_command():
+    """Re-embeds every found item's and saved search's description and rewrites the vector index files."""
+    embedder = embedding_backend.get()
+    if not embedder: print("No embedding backend available, cannot rebuild the vector index."); return
+    for status, (added, _) in rebuild_vector_indexes(reembed=True).items():
+        print(f"Vector index ({status}) rebuilt with {added} item(s).")
+
+@bp.cli.command('match-plan')
+def match_plan_command():
+    """Prints the match cascade in the order it runs (from MATCH_CASCADE in config.py)."""
+    print(f"{'stage':<16} {'cost':>6} {'threshold':>10} {'degraded':>9} {'top_k':>6}")
+    for stage in match_cascade.stages:
+        threshold, degraded = (f"{t:.2f}" if t is not None else '-' for t in (stage.threshold, stage.degraded_threshold))
+        print(f"{stage.name:<16} {stage.cost:>6} {threshold:>10} {degraded:>9} {stage.top_k or '-':>6}")
+
+# --- Application Factory ---
+def load_gazetteer(path):
+    """Loads the campus places from `path` into the shared gazetteer (left empty if there is no file).
+
+    Raises ValueError, naming the file, if it is invalid.
+    """
+    if not os.path.exists(path):
+        log.info("No gazetteer at %s: locations are compared as text and searches are not partitioned by place.", path); return
+    try:
+        campus.configure(load_places(path), LOCATION_NEARBY_METERS)
+    except ValueError as e:
+        raise ValueError(f"Invalid gazetteer {path}: {e}") from e
+    log.info("Gazetteer loaded: %d place(s).", len(campus))
+
+def load_secret_key(path):
+    """The secret key kept at `path`, generated on first use. Created atomically, so concurrently starting workers agree on one key."""
+    if not os.path.exists(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as f: f.write(os.urandom(32))
+        os.chmod(tmp_path, 0o600)
+        try:
+            os.link(tmp_path, path)
+        except FileExistsError:
+            pass # Another worker created it first
+        finally:
+            os.remove(tmp_path)
+    with open(path, 'rb') as f: return f.read()
+
+def create_app(overrides=None):
+    """Builds the Flask app (used by wsgi.py, `flask --app app` and `python app.py`); `overrides` updates app.config.
+
+    Nothing slow or fork-unsafe happens here: Gemini models, model clients, the embedding backend, database and
+    score cache connections are created on first use in each process, and job workers start with its first request.
+    """
+    global score_cache, profiler, catalog_version, vector_index_version, match_cascade
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = DATABASE_URI
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(DATABASE_URI, pool_size=DATABASE_POOL_SIZE, max_overflow=DATABASE_MAX_OVERFLOW,
+                                                             pool_recycle=DATABASE_POOL_RECYCLE_SECONDS, sqlite_timeout=SQLITE_BUSY_TIMEOUT_SECONDS)
+    app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
+    app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024 # 16MB max upload size
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    # Store extensions in config for allowed_file helper
+    app.config['ALLOWED_EXTENSIONS'] = ALLOWED_EXTENSIONS
+    app.config['USE_X_SENDFILE'] = UPLOAD_SENDFILE == 'x-sendfile'
+    app.config.update(overrides or {})
+    if not app.config.get('SECRET_KEY'):
+        app.config['SECRET_KEY'] = SECRET_KEY or load_secret_key(os.path.join(app.instance_path, SECRET_KEY_FILENAME))
+
+    try:
+        match_cascade = Cascade(MATCH_CASCADE, CASCADE_SCORERS)
+    except ValueError as e:
+        raise ValueError(f"Invalid MATCH_CASCADE in config.py: {e}") from e
+    log.info("Match cascade: %s", match_cascade.describe())
+
+    db.init_app(app)
+    with app.app_context(): configure_sqlite(db.engine, wal=SQLITE_WAL) # Creates the engine, not a connection
+    app.register_blueprint(bp)
+
+    score_cache = ScoreCache(os.path.join(app.instance_path, SCORE_CACHE_FILENAME), memory_entries=SCORE_CACHE_MEMORY_ENTRIES,
+                             max_entries=SCORE_CACHE_MAX_ENTRIES, ttl_seconds=SCORE_CACHE_TTL_SECONDS, enabled=SCORE_CACHE_ENABLED)
+    profiler = SampledProfiler(PROFILE_SAMPLE_RATE, os.path.join(app.instance_path, PROFILE_DIR))
+    catalog_version = CatalogVersion(os.path.join(app.instance_path, CATALOG_VERSION_FILENAME))
+    vector_index_version = CatalogVersion(os.path.join(app.instance_path, VECTOR_INDEX_VERSION_FILENAME))
+    load_gazetteer(os.path.join(app.instance_path, GAZETTEER_FILENAME))
+    log.info("Flask app configured.")
+    return app
+
+# --- Run Application ---
+if __name__ == '__main__':
+    log.info("--- Starting Lost & Found Application ---")
+    # Ensure the upload folder exists
+    if not os.path.exists(UPLOAD_FOLDER):
+        try: os.makedirs(UPLOAD_FOLDER); log.info("Created upload directory: %s", UPLOAD_FOLDER)
+        except OSError as e: log.critical("Error creating upload directory %s: %s", UPLOAD_FOLDER, e)
+
+    app = create_app()
+    # Initialize the database
+    with app.app_context(): init_db()
+
+    # Run the Flask development server (use wsgi.py with gunicorn in production)
+    log.info("Starting Flask development server...")
+    # Use port 5000 again for the main app
+    app.run(debug=True, host='0.0.0.0', port=5000)
+    log.info("--- Lost & Found Application Stopped ---")
\ No newline at end of file
@@ -0,0 +1,49 @@
+"""Serial vs. concurrent Gemini comparison throughput, measured offline against FakeGenerativeModel.
+
+Usage: python benchmarks/bench_fanout.py [--candidates 40] [--latency 0.3] [--concurrency 1 4 8]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import config
+config.GEMINI_REQUESTS_PER_MINUTE = 10 ** 6 # Measure the fan-out, not the API-key rate limiter
+config.SCORE_CACHE_ENABLED = False # Every run makes its own model calls
+import app as lost_and_found
+from fake_gemini import FakeGenerativeModel
+from match_engine import MatchPool, Deadline
+
+
+def run(concurrency, candidates, latency):
+    model = FakeGenerativeModel(latency=latency, jitter=latency / 2)
+    lost_and_found.gemini_models.set({'text': model, 'image': model})
+    pool = MatchPool(concurrency)
+    query = "A black HP wireless computer mouse, plastic, oval."
+    descriptions = [f"Found item {i}: a black computer mouse with a logo." for i in range(candidates)]
+    started = time.perf_counter()
+    results = list(pool.fan_out(lambda desc: lost_and_found.compare_descriptions_gemini(query, desc), descriptions, Deadline(600)))
+    elapsed = time.perf_counter() - started
+    pool.shutdown()
+    assert len(results) == candidates
+    return elapsed, model.calls, model.peak_in_flight
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--candidates', type=int, default=40)
+    parser.add_argument('--latency', type=float, default=0.3, help='Mean fake model latency in seconds')
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 4, 8])
+    args = parser.parse_args()
+    lost_and_found.create_app() # Sets up the score cache the comparisons go through
+
+    print(f"\n{'workers':>8} {'seconds':>8} {'calls':>6} {'calls/s':>8} {'peak in flight':>15}")
+    for concurrency in args.concurrency:
+        elapsed, calls, peak = run(concurrency, args.candidates, args.latency)
+        print(f"{concurrency:>8} {elapsed:>8.2f} {calls:>6} {calls / elapsed:>8.1f} {peak:>15}")
+
+
+if __name__ == '__main__':
+    main()
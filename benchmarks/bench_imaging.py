@@ -0,0 +1,76 @@
+"""Per-call image cost before and after the upload preprocessing pipeline (decode CPU, decoded memory, model payload).
+
+"Before" opens the original upload and converts it to RGB as the Gemini helpers used to; "after" opens the cached
+analysis derivative. Payload bytes are measured with the Gemini SDK's own image-to-blob conversion.
+
+Usage: python benchmarks/bench_imaging.py [image ...]   (defaults to every image in UPLOAD_FOLDER)
+"""
+import argparse
+import glob
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PIL import Image as PILImage
+
+from config import UPLOAD_FOLDER, ANALYSIS_IMAGE_MAX_SIZE, THUMBNAIL_MAX_SIZE, DERIVATIVE_JPEG_QUALITY
+from imaging import ImagePipeline
+
+try:
+    from google.generativeai.types.content_types import image_to_blob
+except ImportError:
+    image_to_blob = None
+
+
+def payload_bytes(img):
+    if image_to_blob is None: return float('nan')
+    return len(image_to_blob(img).data)
+
+
+def measure(open_image, repeat):
+    """Mean seconds, decoded pixel buffer bytes and payload size of opening and preparing one image for the model."""
+    started = time.perf_counter()
+    for _ in range(repeat):
+        img = open_image(); img.load(); size = payload_bytes(img)
+    elapsed = (time.perf_counter() - started) / repeat
+    return elapsed, img.width * img.height * len(img.getbands()), size
+
+
+def open_original(path):
+    img = PILImage.open(path)
+    return img if img.mode == 'RGB' else img.convert('RGB')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('images', nargs='*')
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+    images = args.images or sorted(p for p in glob.glob(os.path.join(UPLOAD_FOLDER, '*')) if os.path.isfile(p))
+
+    work_dir = tempfile.mkdtemp(prefix='bench_imaging_')
+    pipeline = ImagePipeline(work_dir, analysis_max_size=ANALYSIS_IMAGE_MAX_SIZE, thumbnail_max_size=THUMBNAIL_MAX_SIZE, quality=DERIVATIVE_JPEG_QUALITY)
+    print(f"\n{'image':<36} {'':>6} {'ms/call':>8} {'pixels MB':>9} {'payload KB':>11}")
+    totals = {'before': [0, 0, 0], 'after': [0, 0, 0]}
+    try:
+        for path in images:
+            started = time.perf_counter(); pipeline.process(path); upload_ms = (time.perf_counter() - started) * 1000
+            rows = {'before': measure(lambda: open_original(path), args.repeat),
+                    'after': measure(lambda: pipeline.open_derivative(path), args.repeat)}
+            for label, (elapsed, peak, size) in rows.items():
+                name = os.path.basename(path)[:36] if label == 'before' else f"  (one-off upload processing {upload_ms:.0f} ms)"
+                print(f"{name:<36} {label:>6} {elapsed * 1000:>8.1f} {peak / 2**20:>9.1f} {size / 1024:>11.0f}")
+                totals[label][0] += elapsed; totals[label][1] = max(totals[label][1], peak); totals[label][2] += size
+        if images:
+            print(f"\n{'total':<36} {'before':>6} {totals['before'][0] * 1000:>8.1f} {totals['before'][1] / 2**20:>9.1f} {totals['before'][2] / 1024:>11.0f}")
+            print(f"{'':<36} {'after':>6} {totals['after'][0] * 1000:>8.1f} {totals['after'][1] / 2**20:>9.1f} {totals['after'][2] / 1024:>11.0f}")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
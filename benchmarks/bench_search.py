@@ -0,0 +1,192 @@
+"""End-to-end report_found / search_lost cost on synthetic catalogues, offline with FakeGenerativeModel.
+
+For each catalogue size it reports p50/p95 request latency, model calls per request, DB time per request and the
+process's peak RSS. The catalogue grows between sizes (100 -> 10k -> 100k by default). The DB, uploads, score cache
+and vector index live in a temporary directory, so the real instance/ and uploads/ are never touched.
+The metadata tier is also checked against calculate_metadata_similarity on each catalogue (exit status 1 on a mismatch).
+
+Usage: python benchmarks/bench_search.py [--sizes 100 10000 100000] [--searches 20] [--reports 10] [--latency 0.05]
+"""
+import argparse
+import contextlib
+import io
+import os
+import random
+import shutil
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+try:
+    import resource
+except ImportError: # Windows
+    resource = None
+
+
+def peak_rss_mb():
+    if resource is None: return float('nan')
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024 # bytes on macOS, KB on Linux
+
+
+class DbTimer:
+    """Accumulates time spent inside SQLite on an engine, across threads: statement execution and row fetching.
+
+    SQLite does most of a query's work while rows are fetched, so cursor execute events alone under-count streamed
+    queries. Connections are opened with a timing cursor instead; attach before the engine's first connection.
+    """
+
+    def __init__(self, engine):
+        from sqlalchemy import event
+        self.seconds = 0.0
+        self._lock = threading.Lock()
+        timer = self
+
+        class TimedCursor(sqlite3.Cursor):
+            def execute(self, *args): return timer.timed(super().execute, *args)
+            def executemany(self, *args): return timer.timed(super().executemany, *args)
+            def fetchone(self): return timer.timed(super().fetchone)
+            def fetchmany(self, *args): return timer.timed(super().fetchmany, *args)
+            def fetchall(self): return timer.timed(super().fetchall)
+
+        class TimedConnection(sqlite3.Connection):
+            def cursor(self, factory=TimedCursor): return super().cursor(factory)
+
+        @event.listens_for(engine, 'do_connect')
+        def use_timed_connection(dialect, conn_rec, cargs, cparams):
+            cparams['factory'] = TimedConnection # Returning None lets SQLAlchemy connect as usual
+
+    def timed(self, fn, *args):
+        started = time.perf_counter()
+        try:
+            return fn(*args)
+        finally:
+            elapsed = time.perf_counter() - started
+            with self._lock: self.seconds += elapsed
+
+
+class Scenario:
+    """Per-request samples of one scenario: wall time, model calls and DB time."""
+
+    def __init__(self, name):
+        self.name = name
+        self.latencies = []; self.model_calls = []; self.db_seconds = []
+
+    def measure(self, model, db_timer, fn, quiet=True):
+        calls = model.calls; db_seconds = db_timer.seconds
+        started = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()) if quiet else contextlib.nullcontext():
+            result = fn()
+        self.latencies.append(time.perf_counter() - started)
+        self.model_calls.append(model.calls - calls); self.db_seconds.append(db_timer.seconds - db_seconds)
+        return result
+
+    def row(self, size):
+        if not self.latencies: return f"{size:>8} {self.name:<14} {'(no samples)':>10}"
+        p50, p95 = np.percentile(self.latencies, [50, 95]) * 1000
+        return (f"{size:>8} {self.name:<14} {len(self.latencies):>5} {p50:>9.1f} {p95:>9.1f} {np.mean(self.model_calls):>12.2f} "
+                f"{np.mean(self.db_seconds) * 1000:>10.1f} {peak_rss_mb():>13.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100, 10000, 100000], help='Catalogue sizes (found items), run in increasing order')
+    parser.add_argument('--searches', type=int, default=20, help='search_lost requests per size')
+    parser.add_argument('--reports', type=int, default=10, help='report_found requests per size (each followed by its enrichment and reverse-matching jobs)')
+    parser.add_argument('--latency', type=float, default=0.05, help='Mean fake model latency in seconds')
+    parser.add_argument('--images', type=int, default=60, help='Distinct generated images shared by the catalogue rows')
+    parser.add_argument('--cache', action='store_true', help='Keep the model result cache enabled (off: every search pays for its model calls)')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--verbose', action='store_true', help="Show the app's own output")
+    parser.add_argument('--keep', action='store_true', help='Keep the temporary working directory')
+    args = parser.parse_args()
+
+    # Point the app at a scratch directory before it is imported (it reads config at import time)
+    work_dir = tempfile.mkdtemp(prefix='bench_search_')
+    import config
+    config.DATABASE_URI = 'sqlite:///' + os.path.join(work_dir, 'items.db')
+    config.UPLOAD_FOLDER = os.path.join(work_dir, 'uploads')
+    config.SCORE_CACHE_FILENAME = os.path.join(work_dir, 'score_cache.db')
+    config.SCORE_CACHE_ENABLED = args.cache
+    config.VECTOR_INDEX_FILENAME = os.path.join(work_dir, 'vector_index.npz')
+    config.LOST_VECTOR_INDEX_FILENAME = os.path.join(work_dir, 'lost_vector_index.npz')
+    config.JOB_WORKERS = 0 # Jobs are run in the foreground so their cost is measured
+    config.GEMINI_REQUESTS_PER_MINUTE = 10 ** 6 # The fake model has no quota; measure the app, not the rate limiter
+    if not args.verbose: config.LOG_LEVEL = 'WARNING'
+    os.makedirs(config.UPLOAD_FOLDER)
+
+    with contextlib.redirect_stdout(io.StringIO()) if not args.verbose else contextlib.nullcontext():
+        import app as lost_and_found
+        from fake_gemini import FakeGenerativeModel
+        from metadata_scoring import find_parity_mismatches, PARITY_EDGE_CASES
+        from models import db, candidate_query
+        import synthetic
+    model = FakeGenerativeModel(latency=args.latency, jitter=args.latency / 2, seed=args.seed)
+    lost_and_found.gemini_models.set({'text': model, 'image': model})
+    app = lost_and_found.create_app(); client = app.test_client()
+    rng = random.Random(args.seed)
+    parity_failures = 0
+
+    try:
+        with app.app_context():
+            db_timer = DbTimer(db.engine)
+            with contextlib.redirect_stdout(io.StringIO()) if not args.verbose else contextlib.nullcontext():
+                lost_and_found.init_db()
+            started = time.perf_counter()
+            pool = synthetic.ImagePool(config.UPLOAD_FOLDER, lost_and_found.image_pipeline, args.images, args.seed)
+            print(f"Generated {args.images} images in {time.perf_counter() - started:.1f}s (work dir {work_dir}).")
+
+            print(f"\n{'items':>8} {'scenario':<14} {'runs':>5} {'p50 ms':>9} {'p95 ms':>9} {'model calls':>12} {'db ms':>10} {'peak RSS MB':>13}")
+            catalogue = 0
+            for size in sorted(args.sizes):
+                started = time.perf_counter()
+                catalogue += synthetic.insert_catalogue(pool, size - catalogue, seed=args.seed + size, batch_size=config.QUERY_BATCH_SIZE)
+                insert_seconds = time.perf_counter() - started
+                started = time.perf_counter()
+                with contextlib.redirect_stdout(io.StringIO()) if not args.verbose else contextlib.nullcontext():
+                    lost_and_found.vector_indexes.clear(); lost_and_found.get_vector_index() # Embed the new rows now, not in the first search
+                print(f"{size:>8} {'(build)':<14} inserted in {insert_seconds:.1f}s, vector index synced in {time.perf_counter() - started:.1f}s")
+
+                items = candidate_query().limit(2000).all()
+                lost_metas = [item.get_metadata() for item in items[:20]] + synthetic_queries(rng, synthetic) + PARITY_EDGE_CASES
+                mismatches = find_parity_mismatches(lost_metas, items, lost_and_found.calculate_metadata_similarity)
+                parity_failures += len(mismatches)
+                if mismatches: print(f"{size:>8} {'(parity)':<14} {len(mismatches)} metadata score mismatch(es), e.g. {mismatches[0]}")
+
+                reports = Scenario('report_found'); jobs = Scenario('background job'); searches = Scenario('search_lost')
+                for n in range(args.reports):
+                    form = synthetic.report_form(rng, pool, f"{size}_{n}")
+                    response = reports.measure(model, db_timer, lambda: client.post('/report_found', data=form), not args.verbose)
+                    if response.status_code != 302: print(f"  report_found returned {response.status_code}")
+                while jobs.measure(model, db_timer, lambda: lost_and_found.job_queue.run_pending(limit=1), not args.verbose):
+                    pass
+                jobs.latencies.pop(); jobs.model_calls.pop(); jobs.db_seconds.pop() # The final, empty poll
+                catalogue += args.reports
+                for _ in range(args.searches):
+                    form = synthetic.search_form(rng, pool)
+                    response = searches.measure(model, db_timer, lambda: client.post('/search_lost', data=form), not args.verbose)
+                    if response.status_code != 200: print(f"  search_lost returned {response.status_code}")
+                for scenario in (reports, jobs, searches): print(scenario.row(size))
+    finally:
+        lost_and_found.match_pool.shutdown()
+        if args.keep: print(f"\nKept {work_dir}")
+        else: shutil.rmtree(work_dir, ignore_errors=True)
+    if parity_failures:
+        print(f"\nFAILED: {parity_failures} metadata parity mismatch(es).")
+        sys.exit(1)
+
+
+def synthetic_queries(rng, synthetic, count=20):
+    """Lost-item metadata drawn from the generator's vocabularies, lowercased like search_lost does."""
+    return [{"item_type": rng.choice(synthetic.ITEM_TYPES).lower(), "color": rng.choice(list(synthetic.COLORS)),
+             "brand": rng.choice(synthetic.BRANDS).lower(), "location": rng.choice(synthetic.LOCATIONS).lower()} for _ in range(count)]
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,105 @@
+"""Synthetic lost-and-found data for benchmarks: generated item photos, found-item rows and lost-item searches.
+
+Rows share a small pool of generated images (each decoded and fingerprinted once), so catalogues of 100k items
+are cheap to build. Descriptions use the same vocabulary as FakeGenerativeModel, so every matching tier sees
+realistic pass rates. Everything is seeded and repeatable.
+"""
+import io
+import os
+import random
+from datetime import datetime, timedelta
+
+from PIL import Image as PILImage, ImageDraw
+
+from models import db, Item, normalize_field, normalize_item_type, place_columns
+
+ITEM_TYPES = ["Electronics", "Keys", "Wallet/Purse", "Clothing", "Bag/Backpack", "Jewelry/Watch", "Book/Notebook", "Pet", "Identification", "Other"]
+COLORS = {"black": (20, 20, 20), "white": (235, 235, 235), "red": (200, 30, 30), "blue": (30, 60, 200), "silver": (170, 170, 180), "brown": (120, 70, 30)}
+BRANDS = ["", "", "HP", "Apple", "Samsung", "Nike", "Adidas", "Casio", "Logitech", "Dell"]
+LOCATIONS = ["Library", "Library Room 201", "Cafe", "Main Gate", "Gym", "Parking Lot", "Lecture Hall A", "Lecture Hall B", "Bus Stop", "Hostel Block C"]
+KINDS = ["wallet", "phone", "mouse", "keys", "backpack", "watch"]
+MATERIALS = ["plastic", "leather", "metal", "fabric"]
+MARKINGS = ["a small logo", "a scratch on one side", "a sticker", "no visible markings"]
+
+
+def make_image(rng, color, size=(800, 600)):
+    """A photo-sized JPEG-able image: one coloured shape on a noisy background."""
+    background = tuple(rng.randint(90, 200) for _ in range(3))
+    img = PILImage.effect_noise(size, rng.randint(10, 40)).convert('RGB')
+    img = PILImage.blend(img, PILImage.new('RGB', size, background), 0.7)
+    draw = ImageDraw.Draw(img)
+    x0, y0 = rng.randint(0, size[0] // 2), rng.randint(0, size[1] // 2)
+    box = (x0, y0, x0 + rng.randint(size[0] // 4, size[0] // 2), y0 + rng.randint(size[1] // 4, size[1] // 2))
+    (draw.ellipse if rng.random() < 0.5 else draw.rectangle)(box, fill=COLORS[color])
+    return img
+
+
+def image_bytes(img, quality=90):
+    buffer = io.BytesIO(); img.save(buffer, 'JPEG', quality=quality); buffer.seek(0)
+    return buffer
+
+
+class ImagePool:
+    """`count` generated images saved in the upload folder and run through the app's ImagePipeline once each.
+
+    entries: [(filename, colour name, fingerprint dict)].
+    """
+
+    def __init__(self, upload_folder, pipeline, count=60, seed=0):
+        rng = random.Random(seed)
+        self.upload_folder = upload_folder
+        self.entries = []
+        for n in range(count):
+            color = rng.choice(list(COLORS))
+            filename = f"synthetic_{seed}_{n}.jpg"
+            path = os.path.join(upload_folder, filename)
+            make_image(rng, color).save(path, 'JPEG', quality=90)
+            self.entries.append((filename, color, pipeline.process(path)["fingerprint"]))
+
+    def path(self, filename):
+        return os.path.join(self.upload_folder, filename)
+
+
+def describe(rng, color, kind=None):
+    return f"A {color} {kind or rng.choice(KINDS)}, {rng.choice(MATERIALS)}, with {rng.choice(MARKINGS)}."
+
+
+def found_item_rows(pool, count, seed=0, max_age_days=90):
+    """Yields `count` found-item row dicts ready for a bulk insert (normalized columns filled like the ORM listener)."""
+    rng = random.Random(seed); now = datetime.utcnow()
+    for _ in range(count):
+        filename, color, fingerprint = rng.choice(pool.entries); item_type = rng.choice(ITEM_TYPES)
+        brand = rng.choice(BRANDS); location = rng.choice(LOCATIONS); place_id, latitude, longitude = place_columns(location)
+        yield {"status": "found", "item_type": item_type, "color": color.title(), "brand": brand or None,
+               "location": location, "image_filename": filename, "ai_description": describe(rng, color),
+               "contact_info": f"finder{rng.randint(1, 9999)}@example.com", "timestamp": now - timedelta(minutes=rng.randint(0, max_age_days * 24 * 60)),
+               "item_type_norm": normalize_item_type(item_type), "color_norm": normalize_field(color), "brand_norm": normalize_field(brand), "location_norm": normalize_field(location),
+               "place_id": place_id, "latitude": latitude, "longitude": longitude, "description_status": "done", **fingerprint}
+
+
+def insert_catalogue(pool, count, seed=0, batch_size=1000):
+    """Bulk-inserts `count` synthetic found items in batches. Returns the number inserted."""
+    batch = []; inserted = 0
+    for row in found_item_rows(pool, count, seed):
+        batch.append(row)
+        if len(batch) >= batch_size:
+            db.session.execute(db.insert(Item), batch); db.session.commit(); inserted += len(batch); batch = []
+    if batch:
+        db.session.execute(db.insert(Item), batch); db.session.commit(); inserted += len(batch)
+    return inserted
+
+
+def report_form(rng, pool, n):
+    """Form fields and image upload for the n-th POST /report_found (unique file names: the app's include only the second)."""
+    _, color, _ = rng.choice(pool.entries)
+    img = make_image(rng, color)
+    return {"item_image": (image_bytes(img), f"report_{n}.jpg"), "item_type": rng.choice(ITEM_TYPES), "color": color.title(),
+            "brand": rng.choice(BRANDS), "location": rng.choice(LOCATIONS), "contact_info": "bench@example.com"}
+
+
+def search_form(rng, pool):
+    """Form fields and image upload for one POST /search_lost: a photo of a pooled item, so some searches truly match."""
+    filename, color, _ = rng.choice(pool.entries)
+    with open(pool.path(filename), 'rb') as f: photo = io.BytesIO(f.read())
+    return {"item_image": (photo, "lost.jpg"), "item_type": rng.choice(ITEM_TYPES), "color": color,
+            "brand": rng.choice(BRANDS), "location": rng.choice(LOCATIONS)}
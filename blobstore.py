@@ -0,0 +1,100 @@
+import hashlib
+import logging
+import os
+import tempfile
+import time
+from collections import namedtuple
+
+log = logging.getLogger(__name__)
+
+# filename is relative to the upload folder (what Item.image_filename stores); created is False when the bytes were already stored
+StoredBlob = namedtuple('StoredBlob', 'filename sha256 size created')
+
+
+class BlobStore:
+    """Content-addressed upload store: each distinct image is kept once, as <upload_folder>/<subfolder>/ab/cd/<sha256><ext>.
+
+    Uploads are streamed to a temporary file while being hashed, then renamed into place, or dropped when the same
+    bytes are already stored. Stored files never change, so they can be served with immutable cache headers.
+    Which items use a blob is tracked in the database (models.Blob); this class only manages files.
+    """
+
+    def __init__(self, upload_folder, subfolder='blobs', shard_levels=2, chunk_size=1024 * 1024, hasher=None):
+        self.upload_folder = upload_folder
+        self.subfolder = subfolder
+        self.shard_levels = shard_levels
+        self.chunk_size = chunk_size
+        self.hasher = hasher # Optional score_cache.FileHasher, told the digest of each file written so it is not read again
+
+    def _shard_dir(self, sha256):
+        return "/".join([self.subfolder] + [sha256[2 * level:2 * level + 2] for level in range(self.shard_levels)])
+
+    def path(self, filename):
+        return os.path.join(self.upload_folder, filename)
+
+    def is_blob(self, filename):
+        return filename.startswith(self.subfolder + "/")
+
+    def find(self, sha256):
+        """The stored filename for a digest, whatever its extension, or None."""
+        shard_dir = self._shard_dir(sha256)
+        try:
+            names = os.listdir(self.path(shard_dir))
+        except FileNotFoundError:
+            return None
+        for name in names:
+            if name.split('.', 1)[0] == sha256: return f"{shard_dir}/{name}"
+        return None
+
+    def save(self, stream, extension=''):
+        """Streams a file object into the store, hashing it on the way. Returns a StoredBlob."""
+        extension = extension.lower() if extension and extension[1:].isalnum() else ''
+        tmp_dir = self.path(os.path.join(self.subfolder, 'tmp'))
+        os.makedirs(tmp_dir, exist_ok=True)
+        digest = hashlib.sha256(); size = 0
+        fd, tmp_path = tempfile.mkstemp(dir=tmp_dir)
+        try:
+            with os.fdopen(fd, 'wb') as out:
+                for chunk in iter(lambda: stream.read(self.chunk_size), b''):
+                    digest.update(chunk); out.write(chunk); size += len(chunk)
+            sha256 = digest.hexdigest()
+            existing = self.find(sha256)
+            if existing:
+                os.remove(tmp_path)
+                os.utime(self.path(existing)) # Marks the blob as recently used, so `blobs gc` gives it a fresh grace period
+                return StoredBlob(existing, sha256, size, False)
+            filename = f"{self._shard_dir(sha256)}/{sha256}{extension}"
+            os.makedirs(os.path.dirname(self.path(filename)), exist_ok=True)
+            os.replace(tmp_path, self.path(filename))
+        except BaseException:
+            if os.path.exists(tmp_path): os.remove(tmp_path)
+            raise
+        if self.hasher: self.hasher.remember(self.path(filename), sha256)
+        return StoredBlob(filename, sha256, size, True)
+
+    def delete(self, filename):
+        try:
+            os.remove(self.path(filename))
+        except FileNotFoundError:
+            pass
+
+    def iter_files(self, older_than_seconds=0):
+        """Yields (filename, sha256) for every stored blob last written more than older_than_seconds ago."""
+        cutoff = time.time() - older_than_seconds
+        root = self.path(self.subfolder)
+        for dirpath, dirnames, filenames in os.walk(root):
+            if dirpath == root and 'tmp' in dirnames: dirnames.remove('tmp')
+            for name in filenames:
+                full_path = os.path.join(dirpath, name)
+                if os.path.getmtime(full_path) > cutoff: continue
+                yield os.path.relpath(full_path, self.upload_folder).replace(os.sep, '/'), name.split('.', 1)[0]
+
+    def clean_tmp(self, older_than_seconds=3600):
+        """Removes temporary files left by interrupted uploads. Returns the number removed."""
+        tmp_dir = self.path(os.path.join(self.subfolder, 'tmp')); removed = 0
+        if not os.path.isdir(tmp_dir): return 0
+        cutoff = time.time() - older_than_seconds
+        for name in os.listdir(tmp_dir):
+            full_path = os.path.join(tmp_dir, name)
+            if os.path.getmtime(full_path) < cutoff: os.remove(full_path); removed += 1
+        return removed
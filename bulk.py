@@ -0,0 +1,92 @@
+import csv
+import json
+import os
+import tempfile
+
+# Manifest columns: image is a path relative to the import directory; item_type and location are required,
+# contact_info unless a default is given. ai_description and timestamp (ISO 8601) are kept when present.
+MANIFEST_FIELDS = ("image", "item_type", "color", "brand", "location", "contact_info", "ai_description", "timestamp")
+
+
+def find_manifest(directory):
+    """manifest.csv or manifest.jsonl inside an import directory, or None."""
+    for name in ("manifest.csv", "manifest.jsonl"):
+        path = os.path.join(directory, name)
+        if os.path.isfile(path): return path
+    return None
+
+
+def read_manifest(path, skip=0):
+    """Streams (row number, row) pairs from a CSV (with a header row) or JSONL manifest, skipping the first `skip` rows.
+
+    Rows are dicts of stripped strings (empty values dropped). A JSONL line that does not parse is yielded as
+    {"_error": ...} so it is reported like any other bad row instead of ending the import.
+    """
+    with open(path, newline='', encoding='utf-8-sig') as f:
+        rows = csv.DictReader(f) if path.lower().endswith('.csv') else _jsonl_rows(f)
+        for number, row in enumerate(rows, 1):
+            if number <= skip: continue
+            row = {key.strip(): str(value).strip() for key, value in row.items() if key and value is not None}
+            yield number, {key: value for key, value in row.items() if value}
+
+
+def _jsonl_rows(f):
+    for line in f:
+        if not line.strip(): continue
+        try:
+            row = json.loads(line)
+        except ValueError as e:
+            row = {"_error": f"invalid JSON ({e})"}
+        yield row if isinstance(row, dict) else {"_error": "not a JSON object"}
+
+
+def batched(iterable, size):
+    """Lists of at most `size` consecutive items, consumed lazily from any iterable."""
+    batch = []
+    for entry in iterable:
+        batch.append(entry)
+        if len(batch) >= size: yield batch; batch = []
+    if batch: yield batch
+
+
+class ImportCheckpoint:
+    """Progress of one manifest's import, saved next to it after each committed batch so an interrupted run resumes.
+
+    rows_done counts manifest rows handled (imported, skipped or failed). Rows appended to the manifest later are
+    picked up by the next run; --restart starts over from the first row.
+    """
+
+    def __init__(self, path, manifest):
+        self.path = path
+        self.state = {"manifest": os.path.abspath(manifest), "rows_done": 0, "imported": 0, "duplicates": 0, "failed": 0}
+
+    @classmethod
+    def load(cls, path, manifest):
+        checkpoint = cls(path, manifest)
+        try:
+            with open(path, encoding='utf-8') as f: saved = json.load(f)
+        except FileNotFoundError:
+            return checkpoint
+        if saved.get("manifest") != checkpoint.state["manifest"]:
+            raise ValueError(f"Checkpoint {path} belongs to {saved.get('manifest')}; use --restart or another --checkpoint.")
+        checkpoint.state.update(saved)
+        return checkpoint
+
+    def __getattr__(self, name):
+        try:
+            return self.__dict__["state"][name]
+        except KeyError:
+            raise AttributeError(name) from None
+
+    def advance(self, rows, imported=0, duplicates=0, failed=0):
+        for key, count in (("rows_done", rows), ("imported", imported), ("duplicates", duplicates), ("failed", failed)): self.state[key] += count
+
+    def save(self):
+        """Writes the checkpoint atomically (a crash leaves the previous one intact)."""
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(self.path)), prefix='.checkpoint-')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f: json.dump(self.state, f)
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            if os.path.exists(tmp_path): os.remove(tmp_path)
+            raise
@@ -0,0 +1,134 @@
+import logging
+import time
+from collections import namedtuple
+from contextlib import nullcontext
+
+import numpy as np
+
+log = logging.getLogger(__name__)
+
+# A vectorized stage result: ids and their scores as arrays (scores None: every id passes unscored)
+VectorScores = namedtuple('VectorScores', 'ids scores')
+
+
+class CascadeStage:
+    """One configured stage: which scorer runs, its relative cost per candidate, pass threshold and output cap."""
+
+    def __init__(self, stage, cost=0, threshold=None, top_k=None, degraded_threshold=None):
+        self.name = stage
+        self.cost = cost
+        self.threshold = threshold
+        self.top_k = top_k
+        self.degraded_threshold = threshold if degraded_threshold is None else degraded_threshold
+
+    def __repr__(self):
+        return f'<CascadeStage {self.name} cost={self.cost} threshold={self.threshold} top_k={self.top_k}>'
+
+
+class CascadeContext:
+    """Per-run state shared by the scorers: scores of earlier stages, candidates scored locally, and scorer scratch space."""
+
+    def __init__(self, status='found', pipeline='search', deadline=None, **extra):
+        self.status = status # Status of the candidate items
+        self.pipeline = pipeline
+        self.deadline = deadline
+        self.scores = {} # score key -> {item_id: score}, filled in as stages run
+        self.degraded = set() # (stage name, item_id) pairs a scorer had to score locally
+        self.__dict__.update(extra)
+
+
+class Cascade:
+    """Runs matching stages cheapest first, each narrowing the candidates for the next, and stops once none are left.
+
+    `scorers` maps a stage name to (score key, fn). fn(query, ids, ctx, stage) gets the surviving ids (None for the
+    first stage, which produces the candidates) and returns a VectorScores, an iterable of (item_id, score) pairs
+    (score None: cannot be scored, kept; ids not yielded are dropped), or None to skip the stage. Pairs are consumed
+    as they arrive, so the final stage can report each pass at once and stop early. An invalid plan raises ValueError.
+    """
+
+    def __init__(self, stages, scorers, source='sql'):
+        self.scorers = scorers
+        try:
+            plan = [CascadeStage(**spec) for spec in stages]
+        except TypeError as e:
+            raise ValueError(f"Invalid match cascade stage: {e}") from e
+        unknown = [stage.name for stage in plan if stage.name not in scorers]
+        if unknown: raise ValueError(f"Unknown match cascade stage(s): {', '.join(unknown)}. Known: {', '.join(scorers)}.")
+        if [stage.name for stage in plan].count(source) != 1: raise ValueError(f"The match cascade needs exactly one '{source}' stage.")
+        # The source stage always runs first; the rest by cost (ties keep their configured order)
+        self.stages = sorted(plan, key=lambda stage: (stage.name != source, stage.cost))
+
+    def describe(self):
+        return " -> ".join(stage.name for stage in self.stages)
+
+    def run(self, query, ctx, on_pass=None, stop=None, record=None, span=None):
+        """Runs the plan. on_pass(item_id, scores) is called for each candidate passing the final stage; stop() ends the run.
+
+        record(stage name, candidates in, candidates out) and span(stage name) (a timing context manager) report
+        per-stage selectivity and time. Returns [(stage name, in, out, seconds or None if skipped/not run)].
+        """
+        ids = None; report = []
+        for n, stage in enumerate(self.stages):
+            if ids is not None and not len(ids):
+                report += [(later.name, 0, 0, None) for later in self.stages[n:]]; break # Early exit: nothing left to score
+            final = n == len(self.stages) - 1
+            score_key, fn = self.scorers[stage.name]
+            started = time.perf_counter()
+            with span(stage.name) if span else nullcontext():
+                result = fn(query, ids, ctx, stage)
+                if result is None:
+                    report.append((stage.name, _count(ids), _count(ids), None)); continue
+                if isinstance(result, VectorScores):
+                    passed, scores = self._vector_pass(stage, ids, result)
+                else:
+                    passed, scores = self._stream_pass(stage, ids, result, ctx, on_pass if final else None, stop if final else None)
+            ctx.scores[score_key] = scores
+            count_in = _count(ids) if ids is not None else len(passed)
+            if record: record(stage.name, count_in, len(passed))
+            report.append((stage.name, count_in, len(passed), time.perf_counter() - started))
+            ids = passed
+            if final and on_pass and isinstance(result, VectorScores):
+                for item_id in passed: on_pass(item_id, self.candidate_scores(ctx, item_id))
+        return report
+
+    def _vector_pass(self, stage, ids, result):
+        result_ids = np.asarray(result.ids, dtype=np.int64)
+        result_scores = None if result.scores is None else np.asarray(result.scores, dtype=np.float64)
+        if ids is not None:
+            keep = np.isin(result_ids, np.asarray(ids, dtype=np.int64))
+            result_ids = result_ids[keep]; result_scores = None if result_scores is None else result_scores[keep]
+        if result_scores is None: return result_ids.tolist(), {}
+        if stage.threshold is not None:
+            keep = result_scores >= stage.threshold
+            result_ids = result_ids[keep]; result_scores = result_scores[keep]
+        order = np.argsort(-result_scores, kind='stable')[:stage.top_k]
+        result_ids = result_ids[order]; result_scores = result_scores[order]
+        return result_ids.tolist(), dict(zip(result_ids.tolist(), result_scores.tolist()))
+
+    def _stream_pass(self, stage, ids, pairs, ctx, on_pass, stop):
+        allowed = None if ids is None else set(ids)
+        scored = []; unscored = []; scores = {}
+        try:
+            for item_id, score in pairs:
+                if allowed is not None and item_id not in allowed: continue
+                if score is None: unscored.append(item_id); continue
+                threshold = stage.degraded_threshold if (stage.name, item_id) in ctx.degraded else stage.threshold
+                if threshold is not None and score < threshold: continue
+                scored.append(item_id); scores[item_id] = score
+                if on_pass:
+                    ctx.scores[self.scorers[stage.name][0]] = scores
+                    on_pass(item_id, self.candidate_scores(ctx, item_id))
+                    if (stage.top_k and len(scored) >= stage.top_k) or (stop and stop()): break
+        finally:
+            if hasattr(pairs, 'close'): pairs.close() # Cancels a fan-out still in flight
+        scored.sort(key=lambda item_id: scores[item_id], reverse=True)
+        return scored[:stage.top_k] + unscored, scores # Unscored candidates are kept, outside the cap
+
+    @staticmethod
+    def candidate_scores(ctx, item_id):
+        """Every stage score of one candidate: {score key: score}, for the keys scored so far."""
+        return {key: scores[item_id] for key, scores in ctx.scores.items() if item_id in scores}
+
+
+def _count(ids):
+    return 0 if ids is None else len(ids)
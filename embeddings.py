@@ -0,0 +1,203 @@
+import hashlib
+import logging
+import os
+import re
+import tempfile
+import threading
+
+import numpy as np
+
+log = logging.getLogger(__name__)
+
+# Words that carry no signal for matching lost/found descriptions
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "has", "have", "in", "is", "it",
+    "its", "of", "on", "or", "that", "the", "there", "this", "to", "with", "item", "appears", "visible",
+    "image", "description", "lost", "found", "type", "color", "material", "shape", "markings", "unique",
+}
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def is_usable_description(text):
+    """True if an AI description is worth embedding (present and not a failure placeholder)."""
+    return bool(text) and "failed" not in text.lower() and not text.startswith("Error:")
+
+
+def _normalize(vector):
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm > 0 else vector
+
+
+class HashingEmbedder:
+    """Deterministic offline embedder: signed feature hashing over words and word pairs.
+
+    No network or model download is needed, so it doubles as the local stand-in for tests and benchmarks.
+    """
+    name = 'local'
+
+    def __init__(self, dim=256, **options):
+        self.dim = dim
+
+    def embed(self, text):
+        vector = np.zeros(self.dim, dtype=np.float32)
+        tokens = [t for t in TOKEN_RE.findall((text or "").lower()) if t not in STOPWORDS]
+        features = tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+        for feature in features:
+            h = int.from_bytes(hashlib.blake2b(feature.encode('utf-8'), digest_size=8).digest(), 'little')
+            vector[h % self.dim] += 1.0 if (h >> 63) & 1 else -1.0
+        return _normalize(vector)
+
+
+class GeminiEmbedder:
+    """Embeds text with the Gemini embedding API (requires genai.configure to have been called)."""
+    name = 'gemini'
+
+    def __init__(self, model_name='models/text-embedding-004', **options):
+        self.model_name = model_name
+
+    def embed(self, text):
+        import google.generativeai as genai
+        result = genai.embed_content(model=self.model_name, content=text)
+        return _normalize(np.asarray(result['embedding'], dtype=np.float32))
+
+
+EMBEDDING_BACKENDS = {'local': HashingEmbedder, 'gemini': GeminiEmbedder}
+
+
+def register_embedder(name, embedder_cls):
+    """Registers an additional embedding backend selectable via config.EMBEDDING_BACKEND."""
+    EMBEDDING_BACKENDS[name] = embedder_cls
+
+
+def get_embedder(backend, **options):
+    """Instantiates the configured embedding backend."""
+    try:
+        return EMBEDDING_BACKENDS[backend](**options)
+    except KeyError:
+        raise ValueError(f"Unknown embedding backend '{backend}'. Choose from: {', '.join(EMBEDDING_BACKENDS)}")
+
+
+class VectorIndex:
+    """In-memory matrix of unit vectors keyed by Item id, persisted to a .npz file.
+
+    The index is a cache of the Item table: anything missing or stale can be re-derived with sync_from_rows().
+    """
+
+    def __init__(self, path=None, backend_name=''):
+        self.path = path
+        self.backend_name = backend_name
+        self._lock = threading.RLock()
+        self._matrix = None # Capacity-doubling buffer, only the first _size rows are live
+        self._ids = np.empty(0, dtype=np.int64)
+        self._size = 0
+        self._positions = {} # item id -> row
+        self.dirty = 0 # Changes since the last save
+
+    def __len__(self):
+        return self._size
+
+    def __contains__(self, item_id):
+        return item_id in self._positions
+
+    @property
+    def ids(self):
+        return set(self._positions)
+
+    def add(self, item_id, vector):
+        """Inserts or replaces the vector for an item."""
+        vector = np.asarray(vector, dtype=np.float32).ravel()
+        with self._lock:
+            if self._matrix is None:
+                self._matrix = np.zeros((16, vector.shape[0]), dtype=np.float32)
+                self._ids = np.zeros(16, dtype=np.int64)
+            if vector.shape[0] != self._matrix.shape[1]:
+                raise ValueError(f"Vector has {vector.shape[0]} dims, index expects {self._matrix.shape[1]}.")
+            row = self._positions.get(item_id)
+            if row is None:
+                if self._size == self._matrix.shape[0]:
+                    self._matrix = np.concatenate([self._matrix, np.zeros_like(self._matrix)])
+                    self._ids = np.concatenate([self._ids, np.zeros_like(self._ids)])
+                row = self._size; self._size += 1
+                self._positions[item_id] = row; self._ids[row] = item_id
+            self._matrix[row] = vector
+            self.dirty += 1
+
+    def remove(self, item_id):
+        """Drops an item, moving the last row into its slot."""
+        with self._lock:
+            row = self._positions.pop(item_id, None)
+            if row is None: return
+            last = self._size - 1
+            if row != last:
+                self._matrix[row] = self._matrix[last]
+                self._ids[row] = self._ids[last]
+                self._positions[int(self._ids[row])] = row
+            self._size = last
+            self.dirty += 1
+
+    def search(self, query_vector, top_k, allowed_ids=None):
+        """Scores every indexed item in one matrix-vector product and returns the top_k as [(item_id, score)].
+
+        allowed_ids (an array of item ids, e.g. from an SQL pre-filter) restricts the result to those items.
+        """
+        with self._lock:
+            if self._size == 0 or top_k <= 0: return []
+            scores = self._matrix[:self._size] @ np.asarray(query_vector, dtype=np.float32)
+            ids = self._ids[:self._size].copy()
+        rows = np.arange(len(scores))
+        if allowed_ids is not None:
+            rows = rows[np.isin(ids, np.asarray(allowed_ids, dtype=np.int64))]
+            if len(rows) == 0: return []
+        if top_k < len(rows):
+            rows = rows[np.argpartition(-scores[rows], top_k - 1)[:top_k]]
+        rows = rows[np.argsort(-scores[rows], kind='stable')]
+        return [(int(ids[i]), float(scores[i])) for i in rows]
+
+    def sync_from_rows(self, rows, embedder):
+        """Makes the index match (id, description) rows: embeds missing items and drops ones no longer present.
+
+        Returns (added, removed) counts.
+        """
+        wanted = set(); added = 0
+        for item_id, text in rows: # Streamed: only the ids are kept, not every description
+            if not is_usable_description(text): continue
+            wanted.add(item_id)
+            if item_id not in self._positions:
+                self.add(item_id, embedder.embed(text)); added += 1
+        removed = [item_id for item_id in self.ids if item_id not in wanted]
+        for item_id in removed: self.remove(item_id)
+        return added, len(removed)
+
+    def save(self):
+        """Writes the index atomically to self.path."""
+        if not self.path: return
+        with self._lock:
+            matrix = self._matrix[:self._size] if self._matrix is not None else np.zeros((0, 0), dtype=np.float32)
+            ids = self._ids[:self._size]
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(self.path) or '.', prefix=os.path.basename(self.path) + '.', suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'wb') as f: np.savez(f, matrix=matrix, ids=ids, backend=np.array(self.backend_name))
+                os.replace(tmp_path, self.path) # Each process saves through its own temporary file
+            except BaseException:
+                if os.path.exists(tmp_path): os.remove(tmp_path)
+                raise
+            self.dirty = 0
+
+    @classmethod
+    def load(cls, path, backend_name):
+        """Loads a saved index. Returns an empty index if the file is missing, unreadable or from another backend."""
+        index = cls(path, backend_name)
+        if not os.path.exists(path): return index
+        try:
+            with np.load(path) as data:
+                if str(data['backend']) != backend_name:
+                    log.warning("Vector index at %s was built with '%s', rebuilding for '%s'.", path, data['backend'], backend_name)
+                    return index
+                for item_id, vector in zip(data['ids'], data['matrix']):
+                    index.add(int(item_id), vector)
+            index.dirty = 0
+        except Exception as e:
+            log.error("Error loading vector index from %s: %s. Starting with an empty index.", path, e)
+            return cls(path, backend_name)
+        return index
@@ -0,0 +1,94 @@
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+
+from PIL import Image as PILImage
+
+
+class FakeResponse:
+    def __init__(self, text):
+        self.text = text
+
+
+class ResourceExhausted(Exception):
+    """Named like google.api_core.exceptions.ResourceExhausted (HTTP 429), which the app treats as transient."""
+
+
+class FakeGenerativeModel:
+    """Offline stand-in for genai.GenerativeModel with a configurable per-call latency.
+
+    Replies are deterministic functions of the request, so benchmarks and local runs are repeatable: descriptions
+    for image prompts, word-overlap scores for description prompts and 1.0 (identical) or a hash-derived score for
+    image prompts, as a single number or as the batched JSON score list. Call counts and peak concurrency are recorded.
+    A failure_rate above 0 makes that fraction of calls raise ResourceExhausted, as under quota pressure.
+    """
+
+    def __init__(self, latency=0.5, jitter=0.0, seed=0, failure_rate=0.0):
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.in_flight = 0
+        self.peak_in_flight = 0
+
+    def _image_key(self, img):
+        return repr((img.size, img.mode)).encode() + img.resize((8, 8)).tobytes()
+
+    def _same_image(self, img1, img2):
+        """True if two images look identical at 8x8, even when one is a downscaled copy."""
+        tiny1 = img1.convert('L').resize((8, 8)).tobytes(); tiny2 = img2.convert('L').resize((8, 8)).tobytes()
+        return sum(abs(a - b) for a, b in zip(tiny1, tiny2)) / 64 < 4
+
+    def _key(self, contents):
+        digest = hashlib.sha256()
+        for part in contents if isinstance(contents, list) else [contents]:
+            if isinstance(part, PILImage.Image):
+                digest.update(self._image_key(part))
+            else:
+                digest.update(str(part).encode('utf-8'))
+        return digest.digest()
+
+    def _score(self, key):
+        return int.from_bytes(key[:4], 'big') / 0xFFFFFFFF
+
+    def _text_similarity(self, text1, text2):
+        """Word-set Jaccard similarity, so identical descriptions score 1.0 and unrelated ones near 0."""
+        words1 = set(re.findall(r"[a-z0-9]+", text1.lower())); words2 = set(re.findall(r"[a-z0-9]+", text2.lower()))
+        return len(words1 & words2) / len(words1 | words2) if words1 | words2 else 0.0
+
+    def reply_for(self, contents):
+        """The text the fake model returns for a request (no latency applied)."""
+        parts = contents if isinstance(contents, list) else [contents]
+        prompt = str(parts[0])
+        images = [p for p in parts if isinstance(p, PILImage.Image)]
+        key = self._key(contents)
+        if prompt.lstrip().startswith("Describe"):
+            colors = ["black", "white", "red", "blue", "silver", "brown"]; kinds = ["wallet", "phone", "mouse", "keys", "backpack", "watch"]
+            return f"A {colors[key[0] % len(colors)]} {kinds[key[1] % len(kinds)]}, plastic, with a small logo."
+        if images:
+            scores = [1.0 if self._same_image(images[0], img) else self._score(key + self._image_key(img)) for img in images[1:]]
+        else:
+            # Quoted descriptions may span lines, so split on the markers the app's prompts put before each one
+            quoted = re.findall(r'(?:^|\n)\s*(?:\[\d+\]|\d+:|Lost item:) "(.*?)"\s*(?=\n\s*(?:\[\d+\] "|\d+: "|Found items:|Respond ONLY))', prompt, re.DOTALL)
+            scores = [self._text_similarity(quoted[0], candidate) for candidate in quoted[1:]] if quoted else [self._score(key)]
+        if "JSON" in prompt: # Batched scoring: one entry per numbered candidate
+            return json.dumps({"scores": [{"id": i, "score": round(score, 2)} for i, score in enumerate(scores, start=1)]})
+        return f"{scores[0]:.2f}"
+
+    def generate_content(self, contents, **kwargs):
+        with self._lock:
+            self.calls += 1; self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+            delay = self.latency + (self._random.uniform(0, self.jitter) if self.jitter else 0.0)
+            fail = self.failure_rate > 0 and self._random.random() < self.failure_rate
+        try:
+            if delay > 0: time.sleep(delay)
+            if fail: raise ResourceExhausted("429 Resource has been exhausted (e.g. check quota).")
+            return FakeResponse(self.reply_for(contents))
+        finally:
+            with self._lock: self.in_flight -= 1
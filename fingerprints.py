@@ -0,0 +1,80 @@
+import numpy as np
+from PIL import Image as PILImage
+
+HASH_BITS = 64
+HISTOGRAM_BINS_PER_CHANNEL = 4 # 4x4x4 = 64 RGB bins
+
+
+def _dct_matrix(n):
+    """Orthonormal DCT-II basis, used to compute the pHash without scipy."""
+    k = np.arange(n)[:, None]; i = np.arange(n)[None, :]
+    matrix = np.cos(np.pi * (2 * i + 1) * k / (2 * n)) * np.sqrt(2.0 / n)
+    matrix[0] /= np.sqrt(2.0)
+    return matrix
+
+_DCT_32 = _dct_matrix(32)
+
+
+def _bits_to_hex(bits):
+    value = 0
+    for bit in bits.ravel(): value = (value << 1) | int(bit)
+    return f"{value:016x}"
+
+
+def phash(gray):
+    """64-bit DCT perceptual hash of a greyscale PIL image, as 16 hex chars."""
+    pixels = np.asarray(gray.resize((32, 32), PILImage.LANCZOS), dtype=np.float64)
+    low = (_DCT_32 @ pixels @ _DCT_32.T)[:8, :8]
+    return _bits_to_hex(low > np.median(low.ravel()[1:])) # Median without the DC term
+
+
+def dhash(gray):
+    """64-bit gradient hash of a greyscale PIL image, as 16 hex chars."""
+    pixels = np.asarray(gray.resize((9, 8), PILImage.LANCZOS), dtype=np.int16)
+    return _bits_to_hex(pixels[:, 1:] > pixels[:, :-1])
+
+
+def color_histogram(rgb):
+    """Normalized 64-bin RGB histogram, quantized to one byte per bin and hex encoded (128 chars)."""
+    pixels = np.asarray(rgb.resize((64, 64)), dtype=np.uint8).reshape(-1, 3) // (256 // HISTOGRAM_BINS_PER_CHANNEL)
+    codes = (pixels[:, 0].astype(np.int32) * HISTOGRAM_BINS_PER_CHANNEL + pixels[:, 1]) * HISTOGRAM_BINS_PER_CHANNEL + pixels[:, 2]
+    counts = np.bincount(codes, minlength=HISTOGRAM_BINS_PER_CHANNEL ** 3).astype(np.float64)
+    return np.round(counts / counts.sum() * 255).astype(np.uint8).tobytes().hex()
+
+
+def compute_fingerprint(image):
+    """Returns the fingerprint fields for a PIL image, or for an image file (decoded once, at reduced size where the format allows)."""
+    if isinstance(image, PILImage.Image):
+        rgb = image if image.mode == 'RGB' else image.convert('RGB')
+    else:
+        with PILImage.open(image) as img:
+            img.draft('RGB', (256, 256)) # JPEG: let the decoder downscale, avoids decoding multi-MB originals in full
+            rgb = img.convert('RGB')
+    gray = rgb.convert('L')
+    return {"image_phash": phash(gray), "image_dhash": dhash(gray), "color_histogram": color_histogram(rgb)}
+
+
+def _hashes_to_bits(hex_hashes):
+    values = np.array([int(h, 16) for h in hex_hashes], dtype=np.uint64)
+    return np.unpackbits(values.view(np.uint8).reshape(-1, 8), axis=1)
+
+
+def _histograms_to_matrix(hex_histograms):
+    return np.frombuffer(bytes.fromhex(''.join(hex_histograms)), dtype=np.uint8).reshape(len(hex_histograms), -1).astype(np.float64) / 255.0
+
+
+def score_candidates(query, candidates, hash_weight=0.6):
+    """Cheap visual similarity of one fingerprint against many, in one vectorized pass.
+
+    query and each candidate are dicts with the fields from compute_fingerprint(). The score mixes the mean
+    Hamming similarity of the pHash and dHash with the histogram intersection and lies in [0, 1].
+    """
+    if not candidates: return np.zeros(0)
+    scores = np.zeros(len(candidates))
+    for field in ("image_phash", "image_dhash"):
+        distances = (_hashes_to_bits([c[field] for c in candidates]) != _hashes_to_bits([query[field]])).sum(axis=1)
+        scores += (1.0 - distances / HASH_BITS) / 2
+    histograms = _histograms_to_matrix([c["color_histogram"] for c in candidates])
+    query_histogram = _histograms_to_matrix([query["color_histogram"]])
+    intersection = np.minimum(histograms, query_histogram).sum(axis=1)
+    return hash_weight * scores + (1 - hash_weight) * np.clip(intersection, 0.0, 1.0)
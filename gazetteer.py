@@ -0,0 +1,133 @@
+import json
+import math
+import re
+from collections import namedtuple
+
+# A canonical campus location: building, zone or landmark. lat/lon are optional (decimal degrees); adjacent lists the
+# ids of places next to it (adjacency is symmetric, declaring it on either side is enough).
+Place = namedtuple('Place', 'id name aliases lat lon adjacent')
+
+MAX_ID_LENGTH = 50 # Size of Item.place_id
+ADJACENT_SCORE = 0.5 # Proximity of declared neighbours; places within the radius score up to this, falling to 0 at its edge
+
+_WORD = re.compile(r"[^\W_]+", re.UNICODE)
+
+
+def normalize_place_text(text):
+    """Lowercased words of a location, single-spaced: 'Library, Room 201' -> 'library room 201'."""
+    return " ".join(_WORD.findall((text or "").lower()))
+
+
+def distance_meters(lat1, lon1, lat2, lon2):
+    """Great-circle (haversine) distance between two points."""
+    lat1, lon1, lat2, lon2 = map(math.radians, (lat1, lon1, lat2, lon2))
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * 6371000 * math.asin(math.sqrt(a))
+
+
+def load_places(path):
+    """Places from a gazetteer JSON file: a list of {"id", "name", "aliases", "lat", "lon", "adjacent"} objects (only id required).
+
+    Raises ValueError for a malformed file, a duplicate id or an adjacency to an unknown place.
+    """
+    with open(path, encoding='utf-8') as f:
+        try: entries = json.load(f)
+        except ValueError as e: raise ValueError(f"{path} is not valid JSON: {e}") from e
+    if not isinstance(entries, list): raise ValueError(f"{path} must contain a JSON list of places.")
+    places = []
+    for n, entry in enumerate(entries, 1):
+        if not isinstance(entry, dict) or not str(entry.get("id") or "").strip(): raise ValueError(f"{path}: place {n} needs an \"id\".")
+        lat, lon = entry.get("lat"), entry.get("lon")
+        if (lat is None) != (lon is None): raise ValueError(f"{path}: place {entry['id']!r} needs both lat and lon, or neither.")
+        places.append(Place(str(entry["id"]).strip(), entry.get("name") or str(entry["id"]), tuple(entry.get("aliases") or ()),
+                            None if lat is None else float(lat), None if lon is None else float(lon), tuple(entry.get("adjacent") or ())))
+    return places
+
+
+class Gazetteer:
+    """Resolves free-text locations to canonical places and scores how close two places are.
+
+    A location resolves to the place whose id, name or alias is the longest whole-word phrase in it, so 'library
+    room 201' and 'near the main library' both resolve to the library. Proximity is 1.0 for the same place,
+    ADJACENT_SCORE for declared neighbours and, for places with coordinates, falls linearly from ADJACENT_SCORE to 0
+    at radius_meters. Everything is precomputed when the places are configured; lookups are dictionary reads.
+    """
+
+    def __init__(self, places=(), radius_meters=150, cache_entries=10000):
+        self.cache_entries = cache_entries
+        self.configure(places, radius_meters)
+
+    def configure(self, places, radius_meters=150):
+        """Replaces the places (in place, so every module holding this instance sees the new ones)."""
+        places = list(places)
+        ids = [place.id for place in places]
+        duplicates = sorted({place_id for place_id in ids if ids.count(place_id) > 1})
+        if duplicates: raise ValueError(f"Duplicate place id(s) in the gazetteer: {', '.join(duplicates)}")
+        too_long = [place_id for place_id in ids if len(place_id) > MAX_ID_LENGTH]
+        if too_long: raise ValueError(f"Place id(s) longer than {MAX_ID_LENGTH} characters: {', '.join(too_long)}")
+        unknown = sorted({other for place in places for other in place.adjacent if other not in ids})
+        if unknown: raise ValueError(f"Unknown place id(s) in adjacency lists: {', '.join(unknown)}")
+        by_phrase = {}
+        for place in places:
+            for phrase in (place.id, place.name, *place.aliases):
+                by_phrase.setdefault(normalize_place_text(phrase), place) # The first place to claim a phrase keeps it
+        by_phrase.pop("", None)
+        by_id = {place.id: place for place in places}
+        nearby = {place.id: {place.id: 1.0} for place in places}
+        for place in places:
+            for other in place.adjacent: nearby[place.id][other] = nearby[other][place.id] = ADJACENT_SCORE
+        located = [place for place in places if place.lat is not None]
+        for i, place in enumerate(located):
+            for other in located[i + 1:]:
+                distance = distance_meters(place.lat, place.lon, other.lat, other.lon)
+                if distance >= radius_meters: continue
+                score = max(nearby[place.id].get(other.id, 0.0), ADJACENT_SCORE * (1 - distance / radius_meters))
+                nearby[place.id][other.id] = nearby[other.id][place.id] = score
+        # Meant to run at startup (create_app), before any lookup
+        self.radius_meters = radius_meters
+        self._by_id, self._by_phrase, self._nearby = by_id, by_phrase, nearby
+        self._max_words = max((len(phrase.split()) for phrase in by_phrase), default=0)
+        self._resolved = {}
+
+    def __len__(self):
+        return len(self._by_id)
+
+    def __iter__(self):
+        return iter(self._by_id.values())
+
+    def get(self, place_id):
+        return self._by_id.get(place_id)
+
+    def resolve(self, text):
+        """The Place a free-text location refers to, or None. Results are cached per distinct text."""
+        if not self._by_id or not text: return None
+        try:
+            return self._resolved[text]
+        except KeyError:
+            pass
+        place = self._resolve(normalize_place_text(text))
+        if len(self._resolved) >= self.cache_entries: self._resolved.clear()
+        self._resolved[text] = place
+        return place
+
+    def _resolve(self, normalized):
+        if normalized in self._by_phrase: return self._by_phrase[normalized]
+        words = normalized.split()
+        for size in range(min(self._max_words, len(words)), 0, -1): # Longest phrase first, then leftmost
+            for start in range(len(words) - size + 1):
+                place = self._by_phrase.get(" ".join(words[start:start + size]))
+                if place: return place
+        return None
+
+    def proximity(self, place_id, other_id):
+        """How close two places are, from 1.0 (the same place) to 0.0 (not neighbours, or further apart than the radius)."""
+        return self._nearby.get(place_id, {}).get(other_id, 0.0)
+
+    def nearby(self, place_id):
+        """Ids of the places with a non-zero proximity to place_id (itself included), closest first."""
+        neighbours = self._nearby.get(place_id, {})
+        return sorted(neighbours, key=lambda other: (-neighbours[other], other))
+
+
+# The gazetteer every module resolves locations with; create_app() loads the configured places into it
+campus = Gazetteer()
@@ -0,0 +1,16 @@
+"""gunicorn settings for wsgi.py: `gunicorn -c gunicorn.conf.py wsgi:app`. Command-line options override these."""
+import multiprocessing
+import os
+
+bind = os.environ.get('BIND', '0.0.0.0:8000')
+workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count() * 2 + 1)) # Processes, to use every core
+worker_class = 'gthread'
+threads = int(os.environ.get('THREADS', 4)) # Requests per process; most of a search is spent waiting on Gemini
+# Result streams (/searches/<id>/events) hold a thread for at most SEARCH_STREAM_MAX_SECONDS before the browser
+# reconnects, so open results pages share these threads with other requests instead of pinning them
+timeout = 120 # Seconds without a heartbeat before a worker is restarted
+# Import the app once in the master and fork the workers from it, sharing its memory. Safe because create_app()
+# opens no connections: Gemini clients, the DB pool and the score cache are created in each worker on first use.
+preload_app = True
+max_requests = 2000 # Recycle workers now and then to bound memory growth
+max_requests_jitter = 200
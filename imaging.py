@@ -0,0 +1,90 @@
+import logging
+import os
+import tempfile
+
+from PIL import Image as PILImage, ImageOps
+
+from fingerprints import compute_fingerprint
+from score_cache import FileHasher
+
+log = logging.getLogger(__name__)
+
+
+class ImagePipeline:
+    """Decodes each upload once and caches bounded-size derivatives on disk, named by content hash.
+
+    `analysis` (at most analysis_max_size px) is what the AI models see; `thumb` (at most thumbnail_max_size px)
+    is what pages display. Both are EXIF-orientation corrected RGB JPEGs under <upload_folder>/<derived_subfolder>.
+    """
+
+    def __init__(self, upload_folder, derived_subfolder='derived', analysis_max_size=1024, thumbnail_max_size=320, quality=85, hasher=None):
+        self.upload_folder = upload_folder
+        self.derived_subfolder = derived_subfolder
+        self.analysis_max_size = analysis_max_size
+        self.thumbnail_max_size = thumbnail_max_size
+        self.quality = quality
+        self.hasher = hasher or FileHasher()
+
+    def _derived_filename(self, content_hash, variant):
+        return f"{self.derived_subfolder}/{content_hash}_{variant}.jpg"
+
+    def derived_path(self, image_path, variant):
+        """Where the `analysis` or `thumb` derivative of an image lives (it may not exist yet)."""
+        return os.path.join(self.upload_folder, self._derived_filename(self.hasher.sha256(image_path), variant))
+
+    def decode(self, image_path, max_size=None):
+        """Opens an image once: reduced-scale JPEG decoding when max_size allows it, EXIF orientation applied, RGB."""
+        with PILImage.open(image_path) as img:
+            if max_size: img.draft('RGB', (max_size, max_size))
+            img = ImageOps.exif_transpose(img)
+            return img if img.mode == 'RGB' else img.convert('RGB')
+
+    def _save(self, img, path):
+        """Writes a JPEG atomically. Each writer gets its own temporary file, so threads or processes rendering the same
+        derivative never interleave their bytes, and readers only ever see a complete file."""
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=os.path.basename(path) + '.', suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f: img.save(f, format='JPEG', quality=self.quality, optimize=True)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path): os.remove(tmp_path)
+            raise
+
+    def process(self, image_path):
+        """Creates any missing derivatives for an upload and returns its content hash, derivative paths and fingerprint."""
+        content_hash = self.hasher.sha256(image_path)
+        analysis_path = os.path.join(self.upload_folder, self._derived_filename(content_hash, 'analysis'))
+        thumbnail_path = os.path.join(self.upload_folder, self._derived_filename(content_hash, 'thumb'))
+        if os.path.exists(analysis_path) and os.path.exists(thumbnail_path):
+            analysis = self.decode(analysis_path)
+        else:
+            os.makedirs(os.path.dirname(analysis_path), exist_ok=True)
+            analysis = self.decode(image_path, self.analysis_max_size)
+            analysis.thumbnail((self.analysis_max_size, self.analysis_max_size), PILImage.LANCZOS)
+            self._save(analysis, analysis_path)
+            thumbnail = analysis.copy(); thumbnail.thumbnail((self.thumbnail_max_size, self.thumbnail_max_size), PILImage.LANCZOS)
+            self._save(thumbnail, thumbnail_path)
+        return {"sha256": content_hash, "analysis_path": analysis_path, "thumbnail_path": thumbnail_path, "fingerprint": compute_fingerprint(analysis)}
+
+    def open_derivative(self, image_path, variant='analysis'):
+        """Opens the `analysis` or `thumb` derivative of an upload, creating it on first use.
+
+        The image is returned unconverted (format and filename intact), so the Gemini SDK uploads the small JPEG's
+        bytes as-is rather than re-encoding the pixels.
+        """
+        path = self.derived_path(image_path, variant)
+        if not os.path.exists(path): path = self.process(image_path)[f"{'thumbnail' if variant == 'thumb' else variant}_path"]
+        with PILImage.open(path) as img:
+            img.load() # Decoded now, so the file handle is closed on return (format and filename are kept)
+        return img
+
+    def thumbnail_filename(self, image_filename):
+        """Thumbnail path relative to the upload folder (for url_for('uploaded_file')), or the original if it cannot be made."""
+        image_path = os.path.join(self.upload_folder, image_filename)
+        try:
+            filename = self._derived_filename(self.hasher.sha256(image_path), 'thumb')
+            if not os.path.exists(os.path.join(self.upload_folder, filename)): self.process(image_path)
+            return filename
+        except Exception as e:
+            log.error("Error creating thumbnail for %s: %s", image_filename, e)
+            return image_filename
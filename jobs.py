@@ -0,0 +1,200 @@
+import json
+import logging
+import random
+import threading
+from datetime import datetime, timedelta
+
+from models import db, Job
+
+log = logging.getLogger(__name__)
+
+
+class JobQueue:
+    """Background job queue stored in the `job` table and processed by worker threads.
+
+    Queued work survives restarts. A failing job is retried with jittered exponential backoff and, after
+    max_attempts, dead-lettered (status 'dead') and passed to the kind's on_dead handler. Recurring kinds (see
+    recurring()) queue their next run when one finishes, whether it succeeded or was dead-lettered.
+
+    Several processes may work the same table. A claimed job is leased: its process refreshes heartbeat_at every
+    lease_seconds / 4 while it runs, and only jobs whose heartbeat is older than lease_seconds (their process died)
+    are requeued, so a starting process never takes over work another live process is doing.
+    """
+
+    def __init__(self, workers=2, max_attempts=5, backoff_seconds=5.0, backoff_max_seconds=600.0, poll_seconds=2.0, lease_seconds=300.0):
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.backoff_seconds = backoff_seconds
+        self.backoff_max_seconds = backoff_max_seconds
+        self.poll_seconds = poll_seconds
+        self.lease_seconds = lease_seconds
+        self.handlers = {}
+        self.dead_handlers = {}
+        self.intervals = {} # kind -> seconds between runs of a recurring job
+        self.app = None
+        self._threads = []
+        self._running = set() # ids of the jobs this process is running, kept alive by _heartbeat()
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+
+    def handler(self, kind, on_dead=None):
+        """Decorator registering the function that runs jobs of `kind` (called with the job payload as kwargs)."""
+        def register(fn):
+            self.handlers[kind] = fn
+            if on_dead: self.dead_handlers[kind] = on_dead
+            return fn
+        return register
+
+    def recurring(self, kind, every_seconds):
+        """Runs jobs of `kind` (no payload) every `every_seconds`: one is queued when workers start and after each run."""
+        self.intervals[kind] = every_seconds
+
+    def enqueue(self, kind, max_attempts=None, delay_seconds=0, **payload):
+        """Adds a job to the current DB session. Workers see it once the caller commits; call notify() after that."""
+        job = Job(kind=kind, payload=json.dumps(payload), max_attempts=max_attempts or self.max_attempts, run_after=datetime.utcnow() + timedelta(seconds=delay_seconds))
+        db.session.add(job)
+        return job
+
+    def _schedule_next(self, kind, delay_seconds):
+        """Queues the next run of a recurring job unless one is already pending (several processes may try at once)."""
+        if Job.query.filter(Job.kind == kind, Job.status.in_(('queued', 'running'))).first() is None:
+            self.enqueue(kind, delay_seconds=delay_seconds)
+        db.session.commit()
+
+    def notify(self):
+        """Wakes an idle worker instead of waiting for the next poll."""
+        self._wakeup.set()
+
+    def start(self, app):
+        """Starts the worker threads (and their heartbeat) once per process, after requeueing jobs whose lease expired."""
+        with self._lock:
+            if self._threads or self.workers <= 0: return
+            self.app = app
+            self._stopping.clear()
+            with app.app_context():
+                self.requeue_expired()
+                for kind in self.intervals: self._schedule_next(kind, 0)
+            for n in range(self.workers):
+                thread = threading.Thread(target=self._work, name=f'job-worker-{n}', daemon=True)
+                thread.start(); self._threads.append(thread)
+            thread = threading.Thread(target=self._heartbeat, name='job-heartbeat', daemon=True)
+            thread.start(); self._threads.append(thread)
+            log.info("Started %d background job worker(s).", self.workers)
+
+    def requeue_expired(self):
+        """Requeues 'running' jobs whose process stopped refreshing their lease (killed or crashed). Returns the number requeued."""
+        cutoff = datetime.utcnow() - timedelta(seconds=self.lease_seconds)
+        requeued = Job.query.filter(Job.status == 'running', db.func.coalesce(Job.heartbeat_at, Job.updated_at) < cutoff).update(
+            {'status': 'queued', 'heartbeat_at': None}, synchronize_session=False)
+        db.session.commit()
+        if requeued: log.info("Requeued %d job(s) whose worker stopped (lease expired).", requeued)
+        return requeued
+
+    def _heartbeat(self):
+        """Refreshes the lease of this process's running jobs and requeues expired ones, every lease_seconds / 4."""
+        while not self._stopping.wait(self.lease_seconds / 4):
+            with self.app.app_context():
+                try:
+                    running = list(self._running)
+                    if running:
+                        Job.query.filter(Job.id.in_(running), Job.status == 'running').update({'heartbeat_at': datetime.utcnow()}, synchronize_session=False)
+                        db.session.commit()
+                    self.requeue_expired()
+                except Exception as e:
+                    log.error("Error refreshing job leases: %s", e)
+                    db.session.rollback()
+
+    def stop(self, timeout=5.0):
+        self._stopping.set(); self._wakeup.set()
+        for thread in self._threads: thread.join(timeout)
+        self._threads = []
+        self._running = set()
+
+    def _claim(self):
+        """Atomically moves the next due job from 'queued' to 'running'. Returns it, or None if nothing is due."""
+        while True:
+            now = datetime.utcnow()
+            job = Job.query.filter(Job.status == 'queued', Job.run_after <= now).order_by(Job.run_after, Job.id).first()
+            if job is None: return None
+            claimed = Job.query.filter_by(id=job.id, status='queued').update({'status': 'running', 'attempts': Job.attempts + 1, 'updated_at': now, 'heartbeat_at': now})
+            db.session.commit()
+            if claimed:
+                db.session.refresh(job)
+                self._running.add(job.id)
+                return job
+
+    def _work(self):
+        while not self._stopping.is_set():
+            with self.app.app_context():
+                try:
+                    job = self._claim()
+                except Exception as e:
+                    log.error("Error claiming background job: %s", e)
+                    db.session.rollback(); job = None
+                if job is not None:
+                    self._run(job)
+                    continue
+            self._wakeup.wait(self.poll_seconds)
+            self._wakeup.clear()
+
+    def _run(self, job):
+        try:
+            self._run_leased(job)
+        finally:
+            self._running.discard(job.id)
+
+    def _run_leased(self, job):
+        job_id = job.id; kind = job.kind; payload = json.loads(job.payload)
+        try:
+            handler = self.handlers.get(kind)
+            if handler is None: raise LookupError(f"No handler registered for job kind '{kind}'.")
+            handler(**payload)
+            db.session.commit()
+            Job.query.filter_by(id=job_id).update({'status': 'done', 'last_error': None, 'updated_at': datetime.utcnow()})
+            db.session.commit()
+            if kind in self.intervals: self._schedule_next(kind, self.intervals[kind])
+            return
+        except Exception as e:
+            db.session.rollback()
+            error = f"{type(e).__name__}: {e}"
+        job = db.session.get(Job, job_id)
+        job.last_error = error; job.updated_at = datetime.utcnow()
+        if job.attempts >= job.max_attempts:
+            job.status = 'dead'
+            log.error("Job %s (%s) failed %d time(s) and was dead-lettered: %s", job_id, kind, job.attempts, error)
+            db.session.commit()
+            on_dead = self.dead_handlers.get(kind)
+            if on_dead:
+                try:
+                    on_dead(**payload); db.session.commit()
+                except Exception as dead_err:
+                    db.session.rollback(); log.error("Error in dead-letter handler for job %s: %s", job_id, dead_err)
+            if kind in self.intervals: self._schedule_next(kind, self.intervals[kind])
+        else:
+            delay = min(self.backoff_max_seconds, self.backoff_seconds * 2 ** (job.attempts - 1)) * random.uniform(0.5, 1.0)
+            job.status = 'queued'; job.run_after = datetime.utcnow() + timedelta(seconds=delay)
+            log.warning("Job %s (%s) attempt %d failed (%s), retrying in %.0fs.", job_id, kind, job.attempts, error, delay)
+            db.session.commit()
+
+    def run_pending(self, limit=None):
+        """Runs due jobs in the calling thread (inside an app context) until none are left or `limit` have run.
+
+        Returns the number of jobs run. Used by benchmarks to time job handlers without background workers.
+        """
+        count = 0
+        while limit is None or count < limit:
+            job = self._claim()
+            if job is None: break
+            self._run(job); count += 1
+        return count
+
+    def retry_dead(self):
+        """Requeues every dead-lettered job with a fresh attempt budget. Returns the number requeued."""
+        count = Job.query.filter_by(status='dead').update({'status': 'queued', 'attempts': 0, 'run_after': datetime.utcnow()})
+        db.session.commit()
+        return count
+
+    def stats(self):
+        counts = dict(db.session.query(Job.status, db.func.count(Job.id)).group_by(Job.status).all())
+        return {status: counts.get(status, 0) for status in ('queued', 'running', 'done', 'dead')}
@@ -0,0 +1,92 @@
+import json
+import logging
+import re
+
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+log = logging.getLogger(__name__)
+
+FTS_TABLE = "item_fts"
+FTS_COLUMNS = ("ai_description", "item_type", "color", "brand") # bm25() weights are given in this order
+
+# External-content FTS5 index over item: it stores only the token index, reading column values from item by rowid.
+# The triggers keep it in step with every insert, update and delete, whichever code path (or tool) writes the row.
+FTS_DDL = [
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5({', '.join(FTS_COLUMNS)}, content='item', content_rowid='id', tokenize='porter unicode61')",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON item BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, {', '.join(FTS_COLUMNS)}) VALUES (new.id, {', '.join('new.' + c for c in FTS_COLUMNS)}); END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON item BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, {', '.join(FTS_COLUMNS)}) VALUES ('delete', old.id, {', '.join('old.' + c for c in FTS_COLUMNS)}); END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF {', '.join(FTS_COLUMNS)} ON item BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, {', '.join(FTS_COLUMNS)}) VALUES ('delete', old.id, {', '.join('old.' + c for c in FTS_COLUMNS)});
+        INSERT INTO {FTS_TABLE}(rowid, {', '.join(FTS_COLUMNS)}) VALUES (new.id, {', '.join('new.' + c for c in FTS_COLUMNS)}); END""",
+]
+
+# Words every description shares; they would match nearly every row and only slow the query down
+STOPWORDS = frozenset("""a an and are as at be by for from has have in is it its of on or that the this to with was were
+    item items object appears appear looks look some any very which visible no not""".split())
+
+_TOKEN = re.compile(r"[^\W_]+", re.UNICODE)
+
+
+def match_query(*texts, max_terms=32):
+    """FTS5 MATCH expression OR-ing the distinct words of the given texts (stopwords and 1-letter words dropped), or None.
+
+    Every term is quoted, so user-supplied words are never parsed as FTS5 operators.
+    """
+    terms = []
+    for value in texts:
+        for word in _TOKEN.findall((value or "").lower()):
+            if len(word) > 1 and word not in STOPWORDS and word not in terms: terms.append(word)
+    return " OR ".join(f'"{term}"' for term in terms[:max_terms]) or None
+
+
+_available = {} # engine -> whether the FTS5 table exists
+
+
+def ensure_fulltext_index(engine):
+    """Creates the FTS5 table and its triggers on SQLite, filling it from existing rows the first time. Returns True if available.
+
+    Other databases, or SQLite builds without FTS5, get no index; the lexical cascade stage is then skipped.
+    """
+    if engine.dialect.name != 'sqlite': return False
+    try:
+        with engine.begin() as conn:
+            existed = conn.execute(text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"), {"name": FTS_TABLE}).first() is not None
+            for statement in FTS_DDL: conn.exec_driver_sql(statement)
+            if not existed:
+                conn.exec_driver_sql(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+                log.info("Built the full-text index %s from existing items.", FTS_TABLE)
+    except OperationalError as e:
+        log.warning("Full-text index unavailable (%s); the lexical match stage will be skipped.", e)
+        _available[engine] = False
+        return False
+    _available[engine] = True
+    return True
+
+
+def fulltext_available(session):
+    """True if the FTS5 table exists in the session's database (checked once per engine)."""
+    engine = session.get_bind()
+    if engine not in _available:
+        _available[engine] = engine.dialect.name == 'sqlite' and session.execute(
+            text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"), {"name": FTS_TABLE}).first() is not None
+    return _available[engine]
+
+
+def search(session, query, status, item_type=None, weights=(1.0, 0.5, 2.0, 2.0), ids=None, limit=None):
+    """(item_id, score) for the items of `status` (and normalized item_type, see models.normalize_item_type) matching an
+    FTS5 MATCH expression, best first.
+
+    The score is the negated BM25 rank, so higher is better. `ids` restricts the hits to those items (the cascade's
+    surviving candidates, passed as one JSON parameter) and `limit` keeps only the best ones, so SQLite ranks with a
+    bounded top-N sort and never hands the whole match set to Python.
+    """
+    rank = f"bm25({FTS_TABLE}, {', '.join(str(float(weight)) for weight in weights)})"
+    sql = (f"SELECT {FTS_TABLE}.rowid, -{rank} AS score FROM {FTS_TABLE} JOIN item ON item.id = {FTS_TABLE}.rowid "
+           f"WHERE {FTS_TABLE} MATCH :query AND item.status = :status" + (" AND item.item_type_norm = :item_type" if item_type else "")
+           + (" AND item.id IN (SELECT value FROM json_each(:ids))" if ids is not None else "")
+           + f" ORDER BY {rank}" + (" LIMIT :limit" if limit else ""))
+    params = {"query": query, "status": status, "item_type": item_type, "ids": None if ids is None else json.dumps([int(item_id) for item_id in ids]), "limit": limit}
+    return [(row[0], row[1]) for row in session.execute(text(sql), params)]
@@ -0,0 +1,81 @@
+import base64
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+
+
+def encode_cursor(timestamp, item_id):
+    """Opaque keyset cursor for the item after which the next page starts."""
+    return base64.urlsafe_b64encode(f"{timestamp.isoformat()}|{item_id}".encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    """(timestamp, item_id) from encode_cursor(). Raises ValueError for a malformed cursor."""
+    try:
+        timestamp, item_id = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode().split("|")
+        return datetime.fromisoformat(timestamp), int(item_id)
+    except (ValueError, UnicodeDecodeError) as e:
+        raise ValueError(f"Invalid cursor: {cursor!r}") from e
+
+
+class CatalogVersion:
+    """Change stamp of the found-item catalogue shared by every process on the host: a file replaced on each change.
+
+    Reading it is one stat() call, so browse caches can key their entries by it on every request and a report
+    committed in one worker invalidates the caches of all the others without a DB round-trip.
+    """
+
+    def __init__(self, path):
+        self.path = path
+
+    def current(self):
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return "0"
+        return f"{stat.st_ino:x}.{stat.st_mtime_ns:x}"
+
+    def bump(self):
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.version-')
+        with os.fdopen(fd, 'w') as f: f.write(str(time.time_ns()))
+        os.replace(tmp_path, self.path) # A new inode, so the stamp changes even within one mtime tick
+
+
+class ListingCache:
+    """In-process LRU of browse query results and rendered fragments.
+
+    Callers put the CatalogVersion stamp in their keys, so entries for an older catalogue are never hit again and
+    simply age out; the TTL only bounds staleness after writes that bypass the ORM (and so never bump the stamp).
+    """
+
+    def __init__(self, max_entries=512, ttl_seconds=300, metrics=None):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.metrics = metrics
+        self._entries = OrderedDict() # key -> (value, stored_at)
+        self._lock = threading.Lock()
+
+    def get_or_compute(self, key, compute, kind='browse'):
+        """The cached value for `key`, or compute() stored under it. compute runs outside the lock."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and now - entry[1] < self.ttl_seconds:
+                self._entries.move_to_end(key)
+                if self.metrics: self.metrics.inc('cache_lookups_total', kind=kind, result='hit')
+                return entry[0]
+        if self.metrics: self.metrics.inc('cache_lookups_total', kind=kind, result='miss')
+        value = compute()
+        with self._lock:
+            self._entries[key] = (value, now)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries: self._entries.popitem(last=False)
+        return value
+
+    def clear(self):
+        with self._lock: self._entries.clear()
@@ -0,0 +1,167 @@
+import logging
+import os
+import time
+from datetime import datetime, timedelta
+
+from bulk import batched
+from lexical import FTS_TABLE, fulltext_available
+from models import db, Item, ArchivedItem, Match, Blob
+
+log = logging.getLogger(__name__)
+
+
+class Maintenance:
+    """One incremental maintenance pass: archive expired items, remove files nothing references, compact the database.
+
+    Work is done in batches of `batch_size` rows or files with `pause_seconds` between them, and stops once
+    `max_seconds` have passed, so it can run next to live traffic. Every step works out what is left from the
+    database and the file system, so the next pass simply continues where this one stopped. Files younger than
+    `grace_seconds` are never removed (an upload may still be on its way into the database).
+    """
+
+    def __init__(self, blob_store, image_pipeline, batch_size=200, pause_seconds=0.2, max_seconds=120, grace_seconds=24 * 3600, dry_run=False):
+        self.blob_store = blob_store
+        self.image_pipeline = image_pipeline
+        self.batch_size = batch_size
+        self.pause_seconds = pause_seconds
+        self.max_seconds = max_seconds
+        self.grace_seconds = grace_seconds
+        self.dry_run = dry_run
+        self.started = time.monotonic()
+        self.counts = {} # step -> rows or files handled (would be handled, in a dry run)
+        self.archived = {} # status -> ids of items archived by this pass
+
+    def out_of_time(self):
+        return time.monotonic() - self.started >= self.max_seconds
+
+    def _pause(self):
+        if self.pause_seconds: time.sleep(self.pause_seconds)
+
+    def _count(self, step, count):
+        self.counts[step] = self.counts.get(step, 0) + count
+
+    def archive(self, query, reason):
+        """Moves the items selected by an Item query to archived_item, deleting their matches. Returns the number moved.
+
+        Items are deleted through the ORM so blob reference counts and the browse catalogue version stay current.
+        """
+        if self.dry_run:
+            count = query.count(); self._count(f'archive_{reason}', count); return count
+        moved = 0
+        while not self.out_of_time():
+            items = query.order_by(Item.id).limit(self.batch_size).all()
+            if not items: break
+            ids = [item.id for item in items]
+            Match.query.filter(db.or_(Match.found_item_id.in_(ids), Match.lost_item_id.in_(ids))).delete(synchronize_session=False)
+            for item in items:
+                db.session.add(ArchivedItem.from_item(item, reason)); db.session.delete(item)
+                self.archived.setdefault(item.status, []).append(item.id)
+            db.session.commit()
+            moved += len(items)
+            self._pause()
+        self._count(f'archive_{reason}', moved)
+        return moved
+
+    def archive_expired(self, found_after_days=None, searches_after_days=None):
+        """Archives found items reported more than found_after_days ago and saved searches older than searches_after_days (None: keep)."""
+        now = datetime.utcnow()
+        if searches_after_days is not None:
+            self.archive(Item.query.filter(Item.status == 'lost', Item.timestamp < now - timedelta(days=searches_after_days),
+                                           db.or_(Item.search_status.is_(None), Item.search_status != 'running')), 'expired')
+        if found_after_days is not None:
+            self.archive(Item.query.filter(Item.status == 'found', Item.timestamp < now - timedelta(days=found_after_days)), 'stale')
+
+    def remove_unreferenced_blobs(self):
+        """Deletes stored images no item references (their Blob row has ref_count 0 or is missing)."""
+        removed = 0
+        for batch in batched(self.blob_store.iter_files(older_than_seconds=self.grace_seconds), self.batch_size):
+            if self.out_of_time(): break
+            referenced = {sha256 for (sha256,) in db.session.query(Blob.sha256).filter(Blob.sha256.in_({sha256 for _, sha256 in batch}), Blob.ref_count > 0)}
+            unreferenced = [(filename, sha256) for filename, sha256 in batch if sha256 not in referenced]
+            removed += len(unreferenced)
+            if self.dry_run or not unreferenced: continue
+            for filename, _ in unreferenced: self.blob_store.delete(filename)
+            Blob.query.filter(Blob.sha256.in_([sha256 for _, sha256 in unreferenced]), Blob.ref_count <= 0).delete(synchronize_session=False)
+            db.session.commit()
+            self._pause()
+        if not self.dry_run: removed += self.blob_store.clean_tmp(self.grace_seconds)
+        self._count('blobs', removed)
+        return removed
+
+    def remove_orphan_uploads(self):
+        """Deletes files saved directly in the upload folder (before the blob store) that no item references, e.g. old search_*.jpg images."""
+        folder = self.blob_store.upload_folder; cutoff = time.time() - self.grace_seconds
+        try:
+            names = [entry.name for entry in os.scandir(folder) if entry.is_file() and not entry.name.startswith('.') and entry.stat().st_mtime < cutoff]
+        except FileNotFoundError:
+            names = []
+        removed = 0
+        for batch in batched(names, self.batch_size):
+            if self.out_of_time(): break
+            referenced = {filename for (filename,) in db.session.query(Item.image_filename).filter(Item.image_filename.in_(batch))}
+            orphans = [name for name in batch if name not in referenced]
+            removed += len(orphans)
+            if self.dry_run: continue
+            for name in orphans: self.blob_store.delete(name)
+            self._pause()
+        self._count('uploads', removed)
+        return removed
+
+    def remove_orphan_derivatives(self):
+        """Deletes cached analysis images and thumbnails whose original is no longer referenced, and interrupted writes."""
+        folder = os.path.join(self.blob_store.upload_folder, self.image_pipeline.derived_subfolder); cutoff = time.time() - self.grace_seconds
+        try:
+            entries = [(entry.name, entry.name.split('_', 1)[0]) for entry in os.scandir(folder) if entry.is_file() and entry.stat().st_mtime < cutoff]
+        except FileNotFoundError:
+            entries = []
+        legacy = None # Content hashes of pre-store uploads still in use, computed only if needed
+        removed = 0
+        for batch in batched(entries, self.batch_size):
+            if self.out_of_time(): break
+            referenced = {sha256 for (sha256,) in db.session.query(Blob.sha256).filter(Blob.sha256.in_({content_hash for _, content_hash in batch}), Blob.ref_count > 0)}
+            orphans = [name for name, content_hash in batch if content_hash not in referenced]
+            if orphans and legacy is None: legacy = self._legacy_upload_hashes()
+            orphans = [name for name in orphans if name.endswith('.tmp') or name.split('_', 1)[0] not in legacy]
+            removed += len(orphans)
+            if self.dry_run: continue
+            for name in orphans: self.blob_store.delete(f"{self.image_pipeline.derived_subfolder}/{name}")
+            self._pause()
+        self._count('derivatives', removed)
+        return removed
+
+    def _legacy_upload_hashes(self):
+        hashes = set()
+        for (filename,) in db.session.query(Item.image_filename).filter(Item.image_sha256.is_(None)).yield_per(self.batch_size):
+            try: hashes.add(self.image_pipeline.hasher.sha256(self.blob_store.path(filename)))
+            except OSError: pass # Missing file: nothing to keep
+        return hashes
+
+    def optimize_database(self, vacuum=False, vacuum_pages=1000):
+        """Refreshes the query planner's statistics and returns free pages to the file system.
+
+        SQLite: a bounded ANALYZE, an FTS5 'optimize' of the full-text index (merging the segments deletes leave behind),
+        then `incremental_vacuum` of at most vacuum_pages pages when the database uses
+        incremental auto-vacuum. vacuum=True switches it to incremental auto-vacuum and rewrites it with VACUUM, which
+        locks the database for its duration (run it once, off-peak). PostgreSQL: ANALYZE (VACUUM ANALYZE with vacuum=True);
+        autovacuum does the rest.
+        """
+        if self.dry_run: return
+        if db.engine.dialect.name == 'sqlite':
+            with db.engine.connect().execution_options(isolation_level='AUTOCOMMIT') as conn:
+                if vacuum:
+                    conn.exec_driver_sql("PRAGMA auto_vacuum=INCREMENTAL"); conn.exec_driver_sql("VACUUM")
+                conn.exec_driver_sql("PRAGMA analysis_limit=1000"); conn.exec_driver_sql("ANALYZE")
+                if fulltext_available(db.session):
+                    conn.exec_driver_sql(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('optimize')"); self._count('fulltext_optimized', 1)
+                if conn.exec_driver_sql("PRAGMA auto_vacuum").scalar() == 2: # INCREMENTAL
+                    free = conn.exec_driver_sql("PRAGMA freelist_count").scalar()
+                    # Frees one page per step, and a plain execute() only takes the first: executescript() runs it to completion
+                    conn.connection.dbapi_connection.executescript(f"PRAGMA incremental_vacuum({int(vacuum_pages)});")
+                    self._count('vacuumed_pages', free - conn.exec_driver_sql("PRAGMA freelist_count").scalar())
+                elif not vacuum:
+                    log.info("SQLite auto-vacuum is off; run `flask maintenance run --vacuum` once, off-peak, to enable incremental vacuuming.")
+                conn.exec_driver_sql("PRAGMA wal_checkpoint(PASSIVE)")
+        elif db.engine.dialect.name == 'postgresql':
+            with db.engine.connect().execution_options(isolation_level='AUTOCOMMIT') as conn:
+                conn.exec_driver_sql("VACUUM ANALYZE" if vacuum else "ANALYZE")
+        self._count('analyzed', 1)
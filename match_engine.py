@@ -0,0 +1,68 @@
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+log = logging.getLogger(__name__)
+
+
+class Deadline:
+    """Wall-clock budget for one search. `hit` is set once a fan-out gives up because the budget ran out."""
+
+    def __init__(self, seconds):
+        self.expires_at = time.monotonic() + seconds
+        self.hit = False
+
+    def remaining(self):
+        return max(0.0, self.expires_at - time.monotonic())
+
+
+class MatchPool:
+    """Bounded thread pool shared by every search, so at most max_concurrency model calls are in flight at once."""
+
+    def __init__(self, max_concurrency=4):
+        self.max_concurrency = max_concurrency
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix='match')
+
+    def fan_out(self, fn, items, deadline=None, stop=None, window=None):
+        """Calls fn(item) for each item concurrently and yields (item, result) in completion order.
+
+        Only `window` calls per search are queued at a time (default: the pool size) so concurrent searches
+        interleave fairly. Iteration ends early when the deadline passes or stop() returns True after a result;
+        queued calls are then cancelled and calls already running finish in the background, discarded.
+        """
+        window = window or self.max_concurrency
+        remaining_items = iter(items)
+        in_flight = {}
+
+        def submit_next():
+            for item in remaining_items:
+                in_flight[self._executor.submit(fn, item)] = item
+                return True
+            return False
+
+        for _ in range(window):
+            if not submit_next(): break
+        try:
+            while in_flight:
+                done, _ = wait(in_flight, timeout=deadline.remaining() if deadline else None, return_when=FIRST_COMPLETED)
+                if not done:
+                    deadline.hit = True
+                    log.warning("Match deadline reached with %d comparison(s) still running, returning partial results.", len(in_flight))
+                    return
+                for future in done:
+                    item = in_flight.pop(future)
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        log.error("Error in match worker: %s", e)
+                        submit_next(); continue
+                    yield item, result
+                    if stop and stop():
+                        log.info("Enough high-confidence matches found, cancelling outstanding comparisons.")
+                        return
+                    submit_next()
+        finally:
+            for future in in_flight: future.cancel()
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,101 @@
+import numpy as np
+
+from gazetteer import campus
+from models import normalize_field
+
+FIELDS = ("item_type", "color", "brand", "location")
+MAX_SCORE = 1.5 + 1.0 + 1.0 + 1.0 # Same weights as app.calculate_metadata_similarity
+
+
+def _type_score(lost, found):
+    return 1.5 if lost and lost == found else 0.0
+
+def _partial_score(lost, found):
+    if lost and lost == found: return 1.0
+    if lost and found and (lost in found or found in lost): return 0.5
+    return 0.0
+
+def _brand_score(lost, found):
+    score = _partial_score(lost, found)
+    return 0.25 if score == 0.0 and not lost and not found else score
+
+def _location_score(lost, found):
+    lost_place, found_place = campus.resolve(lost), campus.resolve(found)
+    if lost_place and found_place: return campus.proximity(lost_place.id, found_place.id)
+    return _partial_score(lost, found)
+
+FIELD_RULES = {"item_type": _type_score, "color": _partial_score, "brand": _brand_score, "location": _location_score}
+
+
+class MetadataBlock:
+    """Columnar metadata for many candidates: an id array plus, per field, interned integer codes into a list of distinct values.
+
+    Catalogues repeat the same few types, colours, brands and places, so rules are evaluated once per distinct value
+    and broadcast to every row with a single array gather.
+    """
+
+    def __init__(self, ids, codes, values):
+        self.ids = ids
+        self.codes = codes # field -> int32 array, one code per row
+        self.values = values # field -> list of distinct normalized values
+
+    def __len__(self):
+        return len(self.ids)
+
+    @classmethod
+    def from_rows(cls, rows):
+        """Builds a block from (id, item_type, color, brand, location) rows in one streaming pass."""
+        ids = []; interned = {field: {} for field in FIELDS}; codes = {field: [] for field in FIELDS}
+        for row in rows:
+            ids.append(row[0])
+            for field, value in zip(FIELDS, row[1:]):
+                codes[field].append(interned[field].setdefault(normalize_field(value), len(interned[field])))
+        return cls(np.asarray(ids, dtype=np.int64),
+                   {field: np.asarray(codes[field], dtype=np.int32) for field in FIELDS},
+                   {field: list(interned[field]) for field in FIELDS})
+
+    @classmethod
+    def from_items(cls, items):
+        return cls.from_rows((item.id,) + tuple(item.get_metadata()[field] for field in FIELDS) for item in items)
+
+
+def score_metadata_batch(lost_meta, block):
+    """Metadata similarity of one lost item against every row of a MetadataBlock, as a float array.
+
+    Identical, value for value, to calling calculate_metadata_similarity(lost_meta, found.get_metadata()) per row.
+    """
+    score = np.zeros(len(block))
+    for field in FIELDS:
+        rule = FIELD_RULES[field]; lost_value = lost_meta.get(field) or ""
+        per_value = np.fromiter((rule(lost_value, value) for value in block.values[field]), dtype=np.float64, count=len(block.values[field]))
+        if len(block): score = score + per_value[block.codes[field]]
+    return score / MAX_SCORE
+
+
+# Lost-item queries exercising each branch of the rules: missing fields, substrings both ways, brand-less bonus,
+# and values as they arrive unnormalized (None, mixed case, surrounding whitespace)
+PARITY_EDGE_CASES = [
+    {"item_type": "", "color": "", "brand": "", "location": ""},
+    {"item_type": None, "color": None, "brand": None, "location": None},
+    {"item_type": "keys"},
+    {"item_type": "Electronics", "color": "Black", "brand": " HP", "location": "Library"},
+    {"item_type": "electronics", "color": "black", "brand": "", "location": "cafe"},
+    {"item_type": "keys", "color": "blue", "brand": "hp", "location": "library room 201"},
+    {"item_type": "wallet/purse", "color": "dark blue", "brand": "apple inc", "location": "library"},
+    {"item_type": "identification", "color": "white ", "brand": "school id card ", "location": "library "},
+]
+
+
+def find_parity_mismatches(lost_metas, items, reference):
+    """Compares score_metadata_batch with a per-item reference scorer (calculate_metadata_similarity).
+
+    Returns [(lost_meta, item_id, batch_score, reference_score)] for every pair whose scores are not identical.
+    """
+    block = MetadataBlock.from_items(items)
+    found_metas = [item.get_metadata() for item in items]
+    mismatches = []
+    for lost_meta in lost_metas:
+        for item, found_meta, batch_score in zip(items, found_metas, score_metadata_batch(lost_meta, block)):
+            reference_score = reference(lost_meta, found_meta)
+            if float(batch_score) != reference_score: mismatches.append((lost_meta, item.id, float(batch_score), reference_score))
+    return mismatches
@@ -0,0 +1,158 @@
+import cProfile
+import logging
+import os
+import random
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+log = logging.getLogger(__name__)
+
+# Seconds; covers fast local stages up to slow model calls and whole searches
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _escape(value, quote=True):
+    value = str(value).replace('\\', '\\\\').replace('\n', '\\n')
+    return value.replace('"', '\\"') if quote else value # HELP text escapes backslashes and newlines only
+
+
+def _number(value):
+    """A sample value without the rounding of :g (counters past a million would lose digits)."""
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class Metrics:
+    """In-process counters, gauges and timing histograms, rendered in the Prometheus text exposition format.
+
+    Values are per process: with several worker processes each one serves its own numbers.
+    """
+
+    def __init__(self, namespace='lostfound', buckets=DEFAULT_BUCKETS, enabled=True):
+        self.namespace = namespace
+        self.buckets = tuple(buckets)
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._types = {} # metric name -> 'counter', 'gauge' or 'histogram'
+        self._help = {}
+        self._values = defaultdict(float) # (name, labels) -> counter or gauge value
+        self._histograms = {} # (name, labels) -> [count per bucket..., +Inf count, sum]
+
+    def describe(self, name, kind, help_text):
+        self._types[name] = kind; self._help[name] = help_text
+
+    def inc(self, name, amount=1, **labels):
+        if not self.enabled or not amount: return
+        with self._lock:
+            self._types.setdefault(name, 'counter')
+            self._values[(name, tuple(sorted(labels.items())))] += amount
+
+    def set_gauge(self, name, value, **labels):
+        if not self.enabled: return
+        with self._lock:
+            self._types.setdefault(name, 'gauge')
+            self._values[(name, tuple(sorted(labels.items())))] = value
+
+    def observe(self, name, seconds, **labels):
+        if not self.enabled: return
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._types.setdefault(name, 'histogram')
+            histogram = self._histograms.get(key)
+            if histogram is None: histogram = self._histograms[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            for i, bound in enumerate(self.buckets):
+                if seconds <= bound: histogram[i] += 1
+            histogram[-2] += 1; histogram[-1] += seconds
+
+    def error(self, stage, exc):
+        """Counts an exception by stage and type (errors_total)."""
+        self.inc('errors_total', stage=stage, type=type(exc).__name__)
+
+    @contextmanager
+    def timed(self, name, **labels):
+        """Records the duration of the block in histogram `name`."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - started, **labels)
+
+    @contextmanager
+    def span(self, stage):
+        """Times one hot-path stage (stage_seconds{stage=...}) and counts exceptions escaping it in errors_total."""
+        started = time.perf_counter()
+        try:
+            yield
+        except Exception as e:
+            self.error(stage, e); raise
+        finally:
+            elapsed = time.perf_counter() - started
+            self.observe('stage_seconds', elapsed, stage=stage)
+            log.debug("Stage %s took %.1f ms", stage, elapsed * 1000)
+
+    def render(self):
+        with self._lock:
+            types = dict(self._types); values = dict(self._values); histograms = {key: list(h) for key, h in self._histograms.items()}
+        lines = []
+        for name, kind in sorted(types.items()):
+            full_name = f"{self.namespace}_{name}"
+            source = histograms if kind == 'histogram' else values
+            series = sorted(((labels, value) for (n, labels), value in source.items() if n == name), key=lambda s: s[0])
+            if not series: continue
+            if name in self._help: lines.append(f"# HELP {full_name} {_escape(self._help[name], quote=False)}")
+            lines.append(f"# TYPE {full_name} {kind}")
+            for labels, value in series:
+                if kind != 'histogram':
+                    lines.append(f"{full_name}{self._labels(labels)} {_number(value)}"); continue
+                for bound, count in zip(self.buckets + ('+Inf',), value[:-1]):
+                    lines.append(f"{full_name}_bucket{self._labels(labels + (('le', bound if bound == '+Inf' else f'{bound:g}'),))} {count}")
+                lines.append(f"{full_name}_sum{self._labels(labels)} {value[-1]:.6f}")
+                lines.append(f"{full_name}_count{self._labels(labels)} {value[-2]}")
+        return "\n".join(lines) + "\n"
+
+    @staticmethod
+    def _labels(labels):
+        return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels) + "}" if labels else ""
+
+
+class SampledProfiler:
+    """Profiles a random sample of requests with cProfile and writes one .prof file per profiled request.
+
+    Only the request thread is profiled, one request at a time; open the files with `python -m pstats` or snakeviz.
+    """
+
+    def __init__(self, sample_rate, output_dir, max_files=200):
+        self.sample_rate = sample_rate
+        self.output_dir = output_dir
+        self.max_files = max_files
+        self._active = threading.Lock()
+
+    def start(self):
+        """Returns a running profiler for this request, or None if it is not sampled."""
+        if self.sample_rate <= 0 or random.random() >= self.sample_rate: return None
+        if not self._active.acquire(blocking=False): return None
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError: # Another profiling tool is active in this interpreter
+            self._active.release(); return None
+        return profiler
+
+    def stop(self, profiler, name):
+        if profiler is None: return
+        try:
+            profiler.disable()
+            os.makedirs(self.output_dir, exist_ok=True)
+            path = os.path.join(self.output_dir, f"{time.strftime('%Y%m%d-%H%M%S')}_{int(time.time() * 1000) % 1000:03d}_{name}.prof")
+            profiler.dump_stats(path)
+            log.info("Wrote request profile %s", path)
+            self._prune()
+        except Exception as e:
+            log.error("Error writing request profile: %s", e)
+        finally:
+            self._active.release()
+
+    def _prune(self):
+        files = sorted(f for f in os.listdir(self.output_dir) if f.endswith('.prof'))
+        for name in files[:max(0, len(files) - self.max_files)]: os.remove(os.path.join(self.output_dir, name))
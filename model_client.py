@@ -0,0 +1,186 @@
+import logging
+import os
+import random
+import threading
+import time
+
+log = logging.getLogger(__name__)
+
+# Exception class names (google.api_core.exceptions and network errors) worth retrying; they also count against the breaker
+TRANSIENT_ERRORS = frozenset({"ResourceExhausted", "TooManyRequests", "ServiceUnavailable", "DeadlineExceeded", "InternalServerError",
+                              "GatewayTimeout", "Aborted", "TimeoutError", "ConnectionError"})
+
+
+class ModelUnavailable(Exception):
+    """Raised instead of calling the model: its circuit is open or the rate limit could not be met in time."""
+
+
+def is_transient(exc):
+    return type(exc).__name__ in TRANSIENT_ERRORS
+
+
+class TokenBucket:
+    """Token-bucket rate limiter: `rate` calls per second on average, bursts of up to `capacity`."""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, timeout=None):
+        """Takes one token, waiting up to `timeout` seconds (forever if None). Returns False if none became available."""
+        give_up_at = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1; return True
+                wait = (1 - self._tokens) / self.rate
+            if give_up_at is not None and now + wait > give_up_at: return False
+            time.sleep(wait)
+
+
+class CircuitBreaker:
+    """Fails fast after `failure_threshold` consecutive transient failures, for `reset_seconds`.
+
+    After that one trial call is let through (half-open): success closes the circuit, failure opens it again.
+    """
+
+    def __init__(self, failure_threshold=5, reset_seconds=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.state = 'closed'
+        self._failures = 0
+        self._opened_at = 0.0
+        self._lock = threading.Lock()
+
+    def allow(self):
+        with self._lock:
+            if self.state == 'closed': return True
+            if self.state == 'open' and time.monotonic() - self._opened_at >= self.reset_seconds:
+                self.state = 'half_open'; return True # This caller is the trial call
+            return False
+
+    def is_open(self):
+        """True while calls are being refused (the reset period has not elapsed yet)."""
+        with self._lock: return self.state == 'open' and time.monotonic() - self._opened_at < self.reset_seconds
+
+    def record_success(self):
+        with self._lock:
+            self.state = 'closed'; self._failures = 0
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self.state == 'half_open' or self._failures >= self.failure_threshold:
+                if self.state != 'open': log.warning("Model circuit opened after %d failure(s); failing fast for %.0fs.", self._failures, self.reset_seconds)
+                self.state = 'open'; self._opened_at = time.monotonic()
+
+
+class SingleFlight:
+    """Coalesces concurrent calls with the same key: one caller runs the function, the others wait for its result."""
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, fn):
+        """Returns (result, shared); shared is True for callers that waited on another's call. Exceptions are shared too."""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader: call = self._calls[key] = {"done": threading.Event(), "result": None, "error": None}
+        if not leader:
+            call["done"].wait()
+            if call["error"] is not None: raise call["error"]
+            return call["result"], True
+        try:
+            call["result"] = fn()
+            return call["result"], False
+        except BaseException as e:
+            call["error"] = e; raise
+        finally:
+            with self._lock: del self._calls[key]
+            call["done"].set()
+
+
+class ModelClient:
+    """Shared guard around every call to one model API key: rate limit, circuit breaker, jittered retries, coalescing.
+
+    call(fn, key) runs fn() (the actual generate_content request). Calls with the same key made while one is in flight
+    share its response. Raises ModelUnavailable without calling the model when the circuit is open or no rate-limit
+    token frees up within acquire_timeout; callers then fall back to local scoring.
+    """
+
+    def __init__(self, name, limiter, breaker, max_retries=2, backoff_seconds=0.5, backoff_max_seconds=8.0, acquire_timeout=5.0, metrics=None):
+        self.name = name
+        self.limiter = limiter
+        self.breaker = breaker
+        self.max_retries = max_retries
+        self.backoff_seconds = backoff_seconds
+        self.backoff_max_seconds = backoff_max_seconds
+        self.acquire_timeout = acquire_timeout
+        self.metrics = metrics
+        self.flights = SingleFlight()
+
+    def _count(self, name, **labels):
+        if self.metrics: self.metrics.inc(name, api=self.name, **labels)
+
+    def available(self):
+        """False while the circuit is open (without taking the half-open trial call)."""
+        return not self.breaker.is_open()
+
+    def call(self, fn, key=None):
+        if key is None: return self._call(fn)
+        result, shared = self.flights.do(key, lambda: self._call(fn))
+        if shared: self._count('model_coalesced_total')
+        return result
+
+    def _call(self, fn):
+        for attempt in range(self.max_retries + 1):
+            if not self.breaker.is_open() and not self.limiter.acquire(self.acquire_timeout):
+                self._count('model_rejected_total', reason='rate_limited')
+                raise ModelUnavailable(f"{self.name} model rate limit exceeded")
+            if not self.breaker.allow(): # Checked after waiting for a token, so a half-open trial call is never left hanging
+                self._count('model_rejected_total', reason='circuit_open')
+                raise ModelUnavailable(f"{self.name} model circuit is open")
+            try:
+                result = fn()
+            except Exception as e:
+                if not is_transient(e):
+                    self.breaker.record_success(); raise # The request itself is bad; the service answered
+                self.breaker.record_failure()
+                if attempt == self.max_retries or self.breaker.state == 'open': raise
+                delay = random.uniform(0, min(self.backoff_max_seconds, self.backoff_seconds * 2 ** attempt)) # Full jitter
+                log.warning("%s model call failed (%s), retry %d in %.2fs.", self.name.capitalize(), type(e).__name__, attempt + 1, delay)
+                self._count('model_retries_total')
+                time.sleep(delay)
+                continue
+            self.breaker.record_success()
+            return result
+
+
+class PerProcess:
+    """A resource built on first use in each process: the Gemini SDK is slow to import and its gRPC channels must not
+    be inherited by workers forked from a preloading server (gunicorn --preload), so nothing is created at import time.
+    """
+
+    def __init__(self, factory):
+        self.factory = factory
+        self._value = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def get(self):
+        if self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid(): self._value = self.factory(); self._pid = os.getpid()
+        return self._value
+
+    def set(self, value):
+        """Replaces the resource in this process (e.g. with a fake model in benchmarks)."""
+        with self._lock: self._value = value; self._pid = os.getpid()
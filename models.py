@@ -1,28 +1,300 @@
-from flask_sqlalchemy import SQLAlchemy
-from datetime import datetime
-
-db = SQLAlchemy()
-
-class Item(db.Model):
-    id = db.Column(db.Integer, primary_key=True)
-    status = db.Column(db.String(10), nullable=False) # 'lost' or 'found'
-    item_type = db.Column(db.String(100), nullable=False)
-    color = db.Column(db.String(50), nullable=True)
-    brand = db.Column(db.String(100), nullable=True)
-    location = db.Column(db.String(200), nullable=False)
-    image_filename = db.Column(db.String(200), nullable=False)
-    ai_description = db.Column(db.Text, nullable=True)
-    contact_info = db.Column(db.String(200), nullable=False) # WARNING: Store securely in real app
-    timestamp = db.Column(db.DateTime, default=datetime.utcnow)
-
-    def __repr__(self):
-        return f'<Item {self.id} - {self.status} - {self.item_type}>'
-
-    # Helper for metadata comparison
-    def get_metadata(self):
-        return {
-            "item_type": self.item_type.lower() if self.item_type else "",
-            "color": self.color.lower() if self.color else "",
-            "brand": self.brand.lower() if self.brand else "",
-            "location": self.location.lower() if self.location else "" # Simple comparison
-        }
\ No newline at end of file
+import logging
+from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import event
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from datetime import datetime
+
+from lexical import ensure_fulltext_index
+from gazetteer import campus
+
+log = logging.getLogger(__name__)
+
+db = SQLAlchemy()
+
+class Item(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    status = db.Column(db.String(10), nullable=False, index=True) # 'lost' or 'found'
+    item_type = db.Column(db.String(100), nullable=False, index=True)
+    color = db.Column(db.String(50), nullable=True)
+    brand = db.Column(db.String(100), nullable=True)
+    location = db.Column(db.String(200), nullable=False)
+    image_filename = db.Column(db.String(200), nullable=False) # Relative to UPLOAD_FOLDER
+    image_sha256 = db.Column(db.String(64), db.ForeignKey('blob.sha256'), nullable=True, index=True) # NULL for uploads saved before the blob store
+    ai_description = db.Column(db.Text, nullable=True)
+    contact_info = db.Column(db.String(200), nullable=False) # WARNING: Store securely in real app
+    timestamp = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    # Lowercased copies used for metadata matching and the item type pre-filter, kept in sync by normalize_item_fields()
+    item_type_norm = db.Column(db.String(100), nullable=True)
+    color_norm = db.Column(db.String(50), nullable=True)
+    brand_norm = db.Column(db.String(100), nullable=True)
+    location_norm = db.Column(db.String(200), nullable=True)
+    # Image fingerprint (see fingerprints.py), computed once at upload time
+    image_phash = db.Column(db.String(16), nullable=True)
+    image_dhash = db.Column(db.String(16), nullable=True)
+    color_histogram = db.Column(db.String(128), nullable=True)
+    # Gazetteer place the location resolves to ('' if none, NULL until assign_places() has run) and its coordinates
+    place_id = db.Column(db.String(50), nullable=True)
+    latitude = db.Column(db.Float, nullable=True)
+    longitude = db.Column(db.Float, nullable=True)
+    # 'pending' until the background job has filled in ai_description, then 'done' or 'failed' (NULL on older rows means done)
+    description_status = db.Column(db.String(10), nullable=True)
+    # Lost items only: 'running' while a streamed search is in progress, then 'done' or 'failed' (NULL for classic searches)
+    search_status = db.Column(db.String(10), nullable=True)
+    # Keyset pagination of the browse listing (newest first), with and without an item type filter; location partitions of the match cascade
+    __table_args__ = (db.Index('ix_item_status_timestamp_id', 'status', 'timestamp', 'id'),
+                      db.Index('ix_item_status_type_norm_timestamp_id', 'status', 'item_type_norm', 'timestamp', 'id'),
+                      db.Index('ix_item_status_place_type_norm', 'status', 'place_id', 'item_type_norm'))
+
+    def __repr__(self):
+        return f'<Item {self.id} - {self.status} - {self.item_type}>'
+
+    # Helper for metadata comparison (stored normalized columns, computed only for rows not yet migrated)
+    def get_metadata(self):
+        return {
+            "item_type": self.item_type_norm if self.item_type_norm is not None else normalize_item_type(self.item_type),
+            "color": self.color_norm if self.color_norm is not None else normalize_field(self.color),
+            "brand": self.brand_norm if self.brand_norm is not None else normalize_field(self.brand),
+            "location": self.location_norm if self.location_norm is not None else normalize_field(self.location) # Simple comparison
+        }
+
+    def get_fingerprint(self):
+        if not (self.image_phash and self.image_dhash and self.color_histogram): return None
+        return {"image_phash": self.image_phash, "image_dhash": self.image_dhash, "color_histogram": self.color_histogram}
+
+def normalize_field(value):
+    """The form metadata is compared in: lowercased, '' when missing."""
+    return value.lower() if value else ""
+
+def normalize_item_type(value):
+    """Item types come from a fixed list on the forms but are typed freely in imports: also stripped of surrounding spaces."""
+    return normalize_field(value.strip()) if value else ""
+
+@db.event.listens_for(Item, 'before_insert')
+@db.event.listens_for(Item, 'before_update')
+def normalize_item_fields(mapper, connection, item):
+    item.item_type_norm = normalize_item_type(item.item_type)
+    item.color_norm = normalize_field(item.color)
+    item.brand_norm = normalize_field(item.brand)
+    item.location_norm = normalize_field(item.location)
+    item.place_id, item.latitude, item.longitude = place_columns(item.location)
+
+def place_columns(location):
+    """(place_id, latitude, longitude) of a location in the campus gazetteer, ('', None, None) if it names no known place."""
+    place = campus.resolve(location)
+    return (place.id, place.lat, place.lon) if place else ('', None, None)
+
+@db.event.listens_for(Item, 'after_insert')
+def count_blob_reference(mapper, connection, item):
+    if item.image_sha256:
+        connection.execute(Blob.__table__.update().where(Blob.__table__.c.sha256 == item.image_sha256).values(ref_count=Blob.__table__.c.ref_count + 1))
+
+@db.event.listens_for(Item, 'after_delete')
+def release_blob_reference(mapper, connection, item):
+    if item.image_sha256:
+        connection.execute(Blob.__table__.update().where(Blob.__table__.c.sha256 == item.image_sha256).values(ref_count=Blob.__table__.c.ref_count - 1))
+
+class Blob(db.Model):
+    """An image stored once in the content-addressed upload store (blobstore.py) and shared by every Item with the same bytes.
+
+    ref_count is kept up to date by the Item insert/delete listeners; bulk writes that bypass the ORM should call recount_blobs().
+    """
+    sha256 = db.Column(db.String(64), primary_key=True)
+    filename = db.Column(db.String(200), nullable=False, unique=True) # Relative to UPLOAD_FOLDER
+    size = db.Column(db.Integer, nullable=False)
+    ref_count = db.Column(db.Integer, nullable=False, default=0)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<Blob {self.sha256[:12]} - {self.ref_count} ref(s)>'
+
+def register_blob(stored):
+    """Adds a row for a blobstore.StoredBlob to the current session unless it exists (its Item then counts the reference)."""
+    insert = postgresql_insert if db.engine.dialect.name == 'postgresql' else sqlite_insert
+    db.session.execute(insert(Blob).values(sha256=stored.sha256, filename=stored.filename, size=stored.size, ref_count=0, created_at=datetime.utcnow())
+                       .on_conflict_do_nothing(index_elements=['sha256']))
+
+def recount_blobs():
+    """Recomputes every Blob.ref_count from the item table. Returns the number of rows corrected."""
+    counts = db.select(db.func.count(Item.id)).where(Item.image_sha256 == Blob.sha256).scalar_subquery()
+    corrected = db.session.execute(db.update(Blob).where(Blob.ref_count != counts).values(ref_count=counts).execution_options(synchronize_session=False)).rowcount
+    db.session.commit()
+    return corrected
+
+def candidate_query(*columns, status='found', item_type=None, since=None, places=None):
+    """Index-backed pre-filter for match candidates: status, optionally an item type (compared normalized, so 'wallet'
+    finds 'Wallet '), a minimum report time and the gazetteer place ids items must be at ('' selects items whose
+    location names no known place).
+
+    Pass columns (e.g. Item.id) to select only those instead of whole Items.
+    """
+    query = db.session.query(*columns) if columns else Item.query
+    query = query.filter(Item.status == status)
+    if item_type: query = query.filter(Item.item_type_norm == normalize_item_type(item_type))
+    if places is not None: query = query.filter(Item.place_id.in_(places))
+    if since is not None: query = query.filter(Item.timestamp >= since)
+    return query
+
+def browse_query(*columns, item_type=None, location=None, since=None, until=None, after=None):
+    """Found items newest first for the browse listing, optionally filtered by item type, location substring and
+    report time (since <= timestamp < until). `after` is the (timestamp, id) of the previous page's last item.
+    """
+    query = candidate_query(*columns, item_type=item_type, since=since)
+    if until is not None: query = query.filter(Item.timestamp < until)
+    if location: query = query.filter(Item.location_norm.contains(normalize_field(location), autoescape=True))
+    if after is not None: query = query.filter(db.tuple_(Item.timestamp, Item.id) < after)
+    return query.order_by(Item.timestamp.desc(), Item.id.desc())
+
+class ArchivedItem(db.Model):
+    """An item moved out of the `item` table by maintenance: a claimed or stale found item, or an expired saved search.
+
+    Keeps the report's details for the record. Matching, browsing and the vector indexes never read this table, and
+    the image is released (maintenance removes its blob once no item references it).
+    """
+    id = db.Column(db.Integer, primary_key=True)
+    item_id = db.Column(db.Integer, nullable=False, index=True) # Item.id it had (SQLite may reuse the ids of deleted rows)
+    status = db.Column(db.String(10), nullable=False)
+    item_type = db.Column(db.String(100), nullable=False)
+    color = db.Column(db.String(50), nullable=True)
+    brand = db.Column(db.String(100), nullable=True)
+    location = db.Column(db.String(200), nullable=False)
+    image_sha256 = db.Column(db.String(64), nullable=True)
+    ai_description = db.Column(db.Text, nullable=True)
+    contact_info = db.Column(db.String(200), nullable=False)
+    timestamp = db.Column(db.DateTime, nullable=True) # When it was reported
+    archived_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    archive_reason = db.Column(db.String(20), nullable=False) # 'claimed', 'stale' or 'expired'
+
+    COPIED_COLUMNS = ('status', 'item_type', 'color', 'brand', 'location', 'image_sha256', 'ai_description', 'contact_info', 'timestamp')
+
+    @classmethod
+    def from_item(cls, item, reason):
+        return cls(item_id=item.id, archive_reason=reason, **{column: getattr(item, column) for column in cls.COPIED_COLUMNS})
+
+    def __repr__(self):
+        return f'<ArchivedItem {self.item_id} - {self.status} - {self.archive_reason}>'
+
+class Job(db.Model):
+    """A unit of background work, processed by jobs.JobQueue workers."""
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(50), nullable=False)
+    payload = db.Column(db.Text, nullable=False, default='{}') # JSON keyword arguments for the handler
+    status = db.Column(db.String(10), nullable=False, default='queued') # 'queued', 'running', 'done' or 'dead'
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    max_attempts = db.Column(db.Integer, nullable=False, default=5)
+    run_after = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    last_error = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+    heartbeat_at = db.Column(db.DateTime, nullable=True) # Lease of a 'running' job, refreshed by the process running it
+
+    __table_args__ = (db.Index('ix_job_status_run_after', 'status', 'run_after'),)
+
+    def __repr__(self):
+        return f'<Job {self.id} - {self.kind} - {self.status}>'
+
+class Match(db.Model):
+    """A lost-item search paired with a found item that passed every matching tier."""
+    id = db.Column(db.Integer, primary_key=True)
+    lost_item_id = db.Column(db.Integer, db.ForeignKey('item.id'), nullable=False)
+    found_item_id = db.Column(db.Integer, db.ForeignKey('item.id'), nullable=False, index=True)
+    description_score = db.Column(db.Float, nullable=False, default=0.0)
+    metadata_score = db.Column(db.Float, nullable=False, default=0.0)
+    image_score = db.Column(db.Float, nullable=False, default=0.0)
+    confidence = db.Column(db.Float, nullable=False)
+    source = db.Column(db.String(10), nullable=False, default='search') # 'search' (found while searching) or 'new_item' (reported later)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    lost_item = db.relationship('Item', foreign_keys=[lost_item_id])
+    found_item = db.relationship('Item', foreign_keys=[found_item_id])
+
+    __table_args__ = (db.UniqueConstraint('lost_item_id', 'found_item_id', name='uq_match_pair'),
+                      db.Index('ix_match_lost_confidence', 'lost_item_id', 'confidence'))
+
+    @property
+    def scores(self):
+        return {"description": self.description_score, "metadata": self.metadata_score, "image": self.image_score, "confidence": self.confidence}
+
+    def __repr__(self):
+        return f'<Match lost {self.lost_item_id} - found {self.found_item_id} - {self.confidence:.2f}>'
+
+def engine_options(uri, pool_size=5, max_overflow=10, pool_recycle=1800, sqlite_timeout=30):
+    """SQLALCHEMY_ENGINE_OPTIONS for a database URI: a connection pool per process, checked before use for server databases."""
+    if uri.startswith('sqlite'):
+        if uri in ('sqlite://', 'sqlite:///:memory:'): return {} # One shared in-memory connection, nothing to pool
+        return {"pool_size": pool_size, "max_overflow": max_overflow, "connect_args": {"timeout": sqlite_timeout}}
+    return {"pool_size": pool_size, "max_overflow": max_overflow, "pool_pre_ping": True, "pool_recycle": pool_recycle}
+
+def configure_sqlite(engine, wal=True):
+    """Sets WAL journaling on every new SQLite connection, so readers in other worker processes never block the writer.
+
+    synchronous=NORMAL is safe with WAL and avoids an fsync per commit. No-op for other databases.
+    """
+    if engine.dialect.name != 'sqlite' or not wal: return
+    @event.listens_for(engine, 'connect')
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL"); cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.close()
+
+# Indexes replaced by newer ones (item_type became item_type_norm), dropped by ensure_schema()
+OBSOLETE_INDEXES = ('ix_item_status_type_timestamp_id', 'ix_item_status_place_type')
+
+def ensure_schema(batch_size=1000):
+    """Migrates an existing database to the current models (db.create_all never alters existing tables).
+
+    Adds missing columns and indexes (dropping the OBSOLETE_INDEXES they replace), fills the normalized metadata columns and gazetteer places of older rows in
+    batches, and creates the full-text index (lexical.py) on SQLite.
+    """
+    inspector = db.inspect(db.engine)
+    for table in db.metadata.sorted_tables:
+        if not inspector.has_table(table.name): continue
+        existing = {column['name'] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing: continue
+            column_type = column.type.compile(dialect=db.engine.dialect)
+            with db.engine.begin() as conn:
+                conn.exec_driver_sql(f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}')
+            log.info("Added missing column %s.%s (%s).", table.name, column.name, column_type)
+        existing_indexes = {index['name'] for index in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name in existing_indexes: continue
+            index.create(bind=db.engine)
+            log.info("Created missing index %s on %s.", index.name, table.name)
+    with db.engine.begin() as conn:
+        for name in OBSOLETE_INDEXES: conn.exec_driver_sql(f'DROP INDEX IF EXISTS {name}')
+    # Normalized columns, filled in Python so they match normalize_field() exactly (SQLite lower() is ASCII-only)
+    migrated = 0
+    while True:
+        rows = db.session.query(Item.id, Item.item_type, Item.color, Item.brand, Item.location).filter(
+            db.or_(Item.location_norm.is_(None), Item.item_type_norm.is_(None))).limit(batch_size).all()
+        if not rows: break
+        db.session.execute(Item.__table__.update().where(Item.__table__.c.id == db.bindparam('row_id')).values(
+            item_type_norm=db.bindparam('item_type_norm'), color_norm=db.bindparam('color_norm'), brand_norm=db.bindparam('brand_norm'), location_norm=db.bindparam('location_norm')),
+            [{"row_id": row.id, "item_type_norm": normalize_item_type(row.item_type), "color_norm": normalize_field(row.color), "brand_norm": normalize_field(row.brand),
+              "location_norm": normalize_field(row.location)} for row in rows])
+        db.session.commit(); migrated += len(rows)
+    if migrated: log.info("Filled normalized metadata columns for %d item(s).", migrated)
+    placed = assign_places(batch_size)
+    if placed: log.info("Resolved gazetteer places for %d item(s).", placed)
+    ensure_fulltext_index(db.engine)
+
+def assign_places(batch_size=1000, reassign=False):
+    """Fills place_id and coordinates from the campus gazetteer for items that have none yet, or for every item with
+    reassign=True (after editing the gazetteer). Returns the number of rows changed.
+    """
+    changed = 0; last_id = 0
+    while True:
+        query = db.session.query(Item.id, Item.location, Item.place_id, Item.latitude, Item.longitude).filter(Item.id > last_id)
+        if not reassign: query = query.filter(Item.place_id.is_(None))
+        rows = query.order_by(Item.id).limit(batch_size).all()
+        if not rows: break
+        last_id = rows[-1].id
+        updates = [{"row_id": row.id, "place_id": place_id, "latitude": latitude, "longitude": longitude}
+                   for row in rows for place_id, latitude, longitude in [place_columns(row.location)]
+                   if (place_id, latitude, longitude) != (row.place_id, row.latitude, row.longitude)]
+        if updates:
+            db.session.execute(Item.__table__.update().where(Item.__table__.c.id == db.bindparam('row_id')).values(
+                place_id=db.bindparam('place_id'), latitude=db.bindparam('latitude'), longitude=db.bindparam('longitude')), updates)
+            db.session.commit(); changed += len(updates)
+    return changed
\ No newline at end of file
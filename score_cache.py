@@ -0,0 +1,146 @@
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+log = logging.getLogger(__name__)
+
+
+def normalize_text(text):
+    """Collapses whitespace so trivially different copies of a description share a cache key."""
+    return " ".join((text or "").split())
+
+
+class FileHasher:
+    """SHA-256 of file contents, memoized on (path, size, mtime) so unchanged files are read only once."""
+
+    def __init__(self, max_entries=4096):
+        self.max_entries = max_entries
+        self._digests = OrderedDict()
+        self._lock = threading.Lock()
+
+    def sha256(self, path):
+        stat = os.stat(path)
+        memo_key = (os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+        with self._lock:
+            if memo_key in self._digests:
+                self._digests.move_to_end(memo_key); return self._digests[memo_key]
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1024 * 1024), b''): digest.update(block)
+        with self._lock:
+            self._digests[memo_key] = digest.hexdigest()
+            while len(self._digests) > self.max_entries: self._digests.popitem(last=False)
+        return digest.hexdigest()
+
+    def remember(self, path, sha256):
+        """Records the digest of a file the caller has just written and hashed itself."""
+        stat = os.stat(path)
+        with self._lock:
+            self._digests[(os.path.abspath(path), stat.st_size, stat.st_mtime_ns)] = sha256
+            while len(self._digests) > self.max_entries: self._digests.popitem(last=False)
+
+
+class ScoreCache:
+    """Cache for model results: an in-process LRU in front of a SQLite table.
+
+    Entries expire after ttl_seconds; the table is trimmed back to max_entries (least recently used first).
+    Values must be JSON serializable. With enabled=False every lookup misses and nothing is stored.
+    """
+
+    def __init__(self, path, memory_entries=4096, max_entries=200000, ttl_seconds=30 * 24 * 3600, enabled=True):
+        self.path = path
+        self.memory_entries = memory_entries
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.enabled = enabled
+        self._memory = OrderedDict() # key -> (value, created_at)
+        self._lock = threading.Lock()
+        self._writes_since_trim = 0
+        self.counters = {"memory_hits": 0, "db_hits": 0, "misses": 0, "writes": 0, "expired": 0, "evicted": 0}
+        self._conn = None
+        self._conn_pid = None
+
+    def _db(self):
+        """This process's SQLite connection, opened on first use (again in a forked worker), or None. Caller holds the lock."""
+        if not (self.enabled and self.path): return None
+        if self._conn_pid != os.getpid():
+            try:
+                os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+                self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+                self._conn.execute("PRAGMA journal_mode=WAL")
+                self._conn.execute("CREATE TABLE IF NOT EXISTS score_cache (key TEXT PRIMARY KEY, value TEXT NOT NULL, created_at REAL NOT NULL, last_used REAL NOT NULL)")
+                self._conn.execute("CREATE INDEX IF NOT EXISTS ix_score_cache_last_used ON score_cache (last_used)")
+            except (OSError, sqlite3.Error) as e:
+                log.error("Error opening score cache %s: %s. Falling back to the in-memory cache.", self.path, e)
+                self.path = None; self._conn = None; return None
+            self._conn_pid = os.getpid()
+        return self._conn
+
+    @staticmethod
+    def make_key(kind, *parts):
+        """Cache key from the call kind (e.g. model name and prompt version included by the caller) and its inputs."""
+        return hashlib.sha256(json.dumps([kind, *parts], separators=(',', ':')).encode('utf-8')).hexdigest()
+
+    def _remember(self, key, value, created_at):
+        self._memory[key] = (value, created_at); self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries: self._memory.popitem(last=False)
+
+    def get(self, key):
+        """Returns the cached value or None."""
+        if not self.enabled: return None
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry and now - entry[1] <= self.ttl_seconds:
+                self._memory.move_to_end(key); self.counters["memory_hits"] += 1
+                return entry[0]
+            if entry:
+                del self._memory[key]; self.counters["expired"] += 1
+            conn = self._db()
+            if conn is not None:
+                row = conn.execute("SELECT value, created_at FROM score_cache WHERE key = ?", (key,)).fetchone()
+                if row and now - row[1] <= self.ttl_seconds:
+                    conn.execute("UPDATE score_cache SET last_used = ? WHERE key = ?", (now, key))
+                    value = json.loads(row[0])
+                    self._remember(key, value, row[1]); self.counters["db_hits"] += 1
+                    return value
+                if row:
+                    conn.execute("DELETE FROM score_cache WHERE key = ?", (key,)); self.counters["expired"] += 1
+            self.counters["misses"] += 1
+        return None
+
+    def set(self, key, value):
+        if not self.enabled: return
+        now = time.time()
+        with self._lock:
+            self._remember(key, value, now)
+            self.counters["writes"] += 1
+            conn = self._db()
+            if conn is None: return
+            conn.execute("INSERT OR REPLACE INTO score_cache (key, value, created_at, last_used) VALUES (?, ?, ?, ?)", (key, json.dumps(value), now, now))
+            self._writes_since_trim += 1
+            if self._writes_since_trim >= 500: self._trim(now)
+
+    def _trim(self, now):
+        """Drops expired rows, then least recently used rows beyond max_entries. Caller holds the lock."""
+        self._writes_since_trim = 0
+        self.counters["expired"] += self._conn.execute("DELETE FROM score_cache WHERE created_at < ?", (now - self.ttl_seconds,)).rowcount
+        excess = self._conn.execute("SELECT COUNT(*) FROM score_cache").fetchone()[0] - self.max_entries
+        if excess > 0:
+            self._conn.execute("DELETE FROM score_cache WHERE key IN (SELECT key FROM score_cache ORDER BY last_used LIMIT ?)", (excess,))
+            self.counters["evicted"] += excess
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self.counters)
+            stats["memory_entries"] = len(self._memory)
+            conn = self._db()
+            stats["db_entries"] = conn.execute("SELECT COUNT(*) FROM score_cache").fetchone()[0] if conn is not None else 0
+        lookups = stats["memory_hits"] + stats["db_hits"] + stats["misses"]
+        stats["hit_rate"] = round((stats["memory_hits"] + stats["db_hits"]) / lookups, 4) if lookups else 0.0
+        return stats
@@ -0,0 +1,49 @@
+import os
+
+import pytest
+from flask import Flask
+
+from models import db
+
+
+@pytest.fixture
+def app(tmp_path):
+    """A bare Flask app bound to a fresh SQLite file, with every table created, inside an app context."""
+    app = Flask(__name__, instance_path=str(tmp_path))
+    app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{tmp_path / 'test.db'}"
+    db.init_app(app)
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.engine.dispose()
+
+
+@pytest.fixture
+def web(app, tmp_path, monkeypatch):
+    """The app fixture with the routes and templates registered and a test client.
+
+    Uploads, the score cache, the catalogue version and the profiler live under tmp_path, and no job workers are
+    started: tests run queued jobs with job_queue.run_pending().
+    """
+    import app as lost_and_found
+    from blobstore import BlobStore
+    from cascade import Cascade
+    from imaging import ImagePipeline
+    from listing import CatalogVersion
+    from metrics import SampledProfiler
+    from score_cache import ScoreCache
+    uploads = tmp_path / 'uploads'; uploads.mkdir()
+    monkeypatch.setattr(lost_and_found, 'blob_store', BlobStore(str(uploads), lost_and_found.BLOB_SUBFOLDER, hasher=lost_and_found.file_hasher))
+    monkeypatch.setattr(lost_and_found, 'image_pipeline', ImagePipeline(str(uploads), lost_and_found.DERIVED_SUBFOLDER, hasher=lost_and_found.file_hasher))
+    monkeypatch.setattr(lost_and_found, 'score_cache', ScoreCache(str(tmp_path / 'score_cache.db'), enabled=False))
+    monkeypatch.setattr(lost_and_found, 'catalog_version', CatalogVersion(str(tmp_path / 'catalog.version')))
+    monkeypatch.setattr(lost_and_found, 'profiler', SampledProfiler(0, str(tmp_path / 'profiles')))
+    monkeypatch.setattr(lost_and_found, 'match_cascade', Cascade(lost_and_found.MATCH_CASCADE, lost_and_found.CASCADE_SCORERS))
+    monkeypatch.setattr(lost_and_found.job_queue, 'workers', 0)
+    monkeypatch.setattr(lost_and_found, 'vector_indexes', {}); monkeypatch.setattr(lost_and_found, 'vector_index_stamps', {})
+    lost_and_found.browse_cache.clear()
+    app.template_folder = os.path.join(os.path.dirname(lost_and_found.__file__), 'templates')
+    app.config.update(SECRET_KEY='test', UPLOAD_FOLDER=str(uploads), ALLOWED_EXTENSIONS=lost_and_found.ALLOWED_EXTENSIONS)
+    app.register_blueprint(lost_and_found.bp)
+    return app.test_client()
@@ -0,0 +1,11 @@
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_a_broken_config_raises_import_error_instead_of_exiting():
+    code = "import sys, types; sys.modules['config'] = types.ModuleType('config')\ntry:\n    import app\nexcept ImportError as e:\n    print('raised', e)"
+    result = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, timeout=120)
+    assert result.returncode == 0 and result.stdout.startswith("raised Could not import from config.py")
@@ -0,0 +1,73 @@
+import json
+
+import pytest
+
+import app as lost_and_found
+from fake_gemini import FakeGenerativeModel
+from model_client import PerProcess
+from score_cache import ScoreCache
+
+LOST = "A black leather wallet with a zip"
+CANDIDATES = ["A black leather wallet", "A red umbrella", "A black wallet with a zip"]
+
+
+@pytest.mark.parametrize("text, expected", [
+    ('{"scores": [{"id": 1, "score": 0.8}, {"id": 2, "score": 0.1}]}', [0.8, 0.1]),
+    ('```json\n{"scores": [{"id": 2, "score": 0.3}, {"id": 1, "score": 0.6}]}\n```', [0.6, 0.3]), # Fenced, out of order
+    ('[{"id": 1, "score": 0.5}, {"id": 2, "score": 0.25}]', [0.5, 0.25]), # A bare list
+    ('{"scores": [{"id": 1, "score": 7}, {"id": 2, "score": -1}]}', [1.0, 0.0]), # Clamped to 0-1
+    ('{"scores": [{"id": 1, "score": 0.4}]}', [0.4, None]), # Partial
+    ('{"scores": [{"id": 1, "score": 0.4}, {"id": 1, "score": 0.9}, {"id": 3, "score": 0.9}]}', [0.4, None]), # Duplicate, unknown id
+    ('{"scores": [{"id": "x", "score": 0.4}, {"score": 0.2}, {"id": 2, "score": "high"}, 5]}', [None, None]), # Malformed entries
+    ('I cannot compare these.', [None, None]),
+    ('{"scores": 0.5}', [None, None]),
+    ('0.5', [None, None]),
+])
+def test_parse_batch_scores(text, expected):
+    assert lost_and_found.parse_batch_scores(text, 2) == expected
+
+
+class ScriptedBatchModel(FakeGenerativeModel):
+    """The fake model, except that batched requests get `batch_reply`."""
+
+    def __init__(self, batch_reply):
+        super().__init__(latency=0)
+        self.batch_reply = batch_reply; self.prompts = []
+
+    def reply_for(self, contents):
+        self.prompts.append(str(contents))
+        return self.batch_reply if "JSON" in str(contents) else super().reply_for(contents)
+
+
+@pytest.fixture
+def scripted(monkeypatch, tmp_path):
+    def install(batch_reply):
+        model = ScriptedBatchModel(batch_reply)
+        monkeypatch.setattr(lost_and_found, 'gemini_models', PerProcess(lambda: {'text': model, 'image': model}))
+        monkeypatch.setattr(lost_and_found, 'score_cache', ScoreCache(str(tmp_path / 'cache.db')))
+        return model
+    return install
+
+
+def single_score(candidate):
+    return float(FakeGenerativeModel(latency=0).reply_for(f'\n1: "{LOST}"\n2: "{candidate}"\nRespond ONLY with the numerical score'))
+
+
+def test_a_complete_batch_reply_needs_one_request(scripted):
+    model = scripted(json.dumps({"scores": [{"id": 1, "score": 0.9}, {"id": 2, "score": 0.05}, {"id": 3, "score": 0.7}]}))
+    assert lost_and_found.compare_descriptions_batch_gemini(LOST, CANDIDATES) == [0.9, 0.05, 0.7]
+    assert model.calls == 1
+    assert lost_and_found.compare_descriptions_batch_gemini(LOST, CANDIDATES) == [0.9, 0.05, 0.7] and model.calls == 1 # Cached per pair
+
+
+def test_pairs_missing_from_a_partial_reply_are_retried_one_by_one(scripted):
+    model = scripted(json.dumps({"scores": [{"id": 2, "score": 0.05}, {"id": 2, "score": 0.9}, {"id": 9, "score": 0.5}]}))
+    scores = lost_and_found.compare_descriptions_batch_gemini(LOST, CANDIDATES)
+    assert scores == [single_score(CANDIDATES[0]), 0.05, single_score(CANDIDATES[2])]
+    assert model.calls == 3 and sum("JSON" in prompt for prompt in model.prompts) == 1
+
+
+def test_an_unparseable_batch_reply_falls_back_to_single_comparisons(scripted):
+    model = scripted("Sorry, I can only compare two descriptions at a time.")
+    assert lost_and_found.compare_descriptions_batch_gemini(LOST, CANDIDATES) == [single_score(candidate) for candidate in CANDIDATES]
+    assert model.calls == 1 + len(CANDIDATES)
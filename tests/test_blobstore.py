@@ -0,0 +1,84 @@
+import io
+import os
+import time
+
+import app as lost_and_found
+from blobstore import BlobStore
+from models import db, Item, Blob, register_blob, recount_blobs
+
+
+def add_item(stored):
+    item = Item(status='found', item_type='Keys', location='Library', image_filename=stored.filename, image_sha256=stored.sha256, contact_info='c')
+    db.session.add(item); db.session.commit()
+    return item
+
+
+def age(store, filename, seconds):
+    then = time.time() - seconds
+    os.utime(store.path(filename), (then, then))
+
+
+def gc(web, *args):
+    return web.application.test_cli_runner().invoke(lost_and_found.blobs_gc_command, list(args))
+
+
+def test_identical_bytes_are_stored_once(tmp_path):
+    store = BlobStore(str(tmp_path))
+    first = store.save(io.BytesIO(b'image'), '.JPG'); again = store.save(io.BytesIO(b'image'), '.png'); other = store.save(io.BytesIO(b'other'), '.jpg')
+    assert first.created and not again.created and other.created
+    assert again.filename == first.filename and first.filename.endswith(first.sha256 + '.jpg') and first.size == 5
+    assert store.find(first.sha256) == first.filename and sorted(name for name, _ in store.iter_files()) == sorted([first.filename, other.filename])
+    assert os.listdir(store.path('blobs/tmp')) == []
+
+
+def test_items_count_references_to_their_blob(app, tmp_path):
+    stored = BlobStore(str(tmp_path)).save(io.BytesIO(b'image'), '.jpg')
+    register_blob(stored); register_blob(stored) # The second upload of the same bytes adds no row
+    first = add_item(stored); second = add_item(stored)
+    assert Blob.query.count() == 1 and db.session.get(Blob, stored.sha256).ref_count == 2
+    db.session.delete(first); db.session.commit()
+    assert db.session.get(Blob, stored.sha256).ref_count == 1
+    Blob.query.update({'ref_count': 7}); db.session.commit() # Drift left by a write that bypassed the ORM
+    assert recount_blobs() == 1 and db.session.get(Blob, stored.sha256).ref_count == 1
+    db.session.delete(second); db.session.commit()
+    assert db.session.get(Blob, stored.sha256).ref_count == 0
+
+
+def test_gc_removes_only_unreferenced_blobs_past_the_grace_period(web):
+    store = lost_and_found.blob_store
+    kept = store.save(io.BytesIO(b'kept'), '.jpg'); orphan = store.save(io.BytesIO(b'orphan'), '.jpg'); fresh = store.save(io.BytesIO(b'fresh'), '.jpg')
+    for stored in (kept, orphan, fresh): register_blob(stored)
+    add_item(kept)
+    for stored in (kept, orphan): age(store, stored.filename, 7200)
+    result = gc(web, '--grace-seconds', '3600')
+    assert result.exit_code == 0 and "Removed 1 " in result.output
+    assert store.find(orphan.sha256) is None and db.session.get(Blob, orphan.sha256) is None
+    assert store.find(kept.sha256) and store.find(fresh.sha256) # Referenced, and still within its grace period
+
+
+def test_uploading_an_old_blob_again_restarts_its_grace_period(web):
+    store = lost_and_found.blob_store
+    stored = store.save(io.BytesIO(b'image'), '.jpg'); register_blob(stored); db.session.commit()
+    age(store, stored.filename, 7200)
+    store.save(io.BytesIO(b'image'), '.jpg') # Another request is saving the same bytes and has not committed its item yet
+    assert "Removed 0 " in gc(web, '--grace-seconds', '3600').output and store.find(stored.sha256)
+
+
+def test_blobs_are_served_with_their_hash_as_etag_and_immutable_caching(web):
+    stored = lost_and_found.blob_store.save(io.BytesIO(b'image'), '.jpg')
+    response = web.get(f'/uploads/{stored.filename}')
+    assert response.status_code == 200 and response.data == b'image' and response.get_etag() == (stored.sha256, False)
+    assert response.cache_control.immutable and response.cache_control.public and response.cache_control.max_age == lost_and_found.UPLOAD_CACHE_MAX_AGE
+    assert web.get(f'/uploads/{stored.filename}', headers={'If-None-Match': f'"{stored.sha256}"'}).status_code == 304
+    assert web.get('/uploads/blobs/00/00/missing.jpg').status_code == 404
+
+
+def test_x_accel_redirect_hands_the_file_to_the_web_server(web, monkeypatch):
+    monkeypatch.setattr(lost_and_found, 'UPLOAD_SENDFILE', 'x-accel-redirect')
+    stored = lost_and_found.blob_store.save(io.BytesIO(b'image'), '.jpg')
+    response = web.get(f'/uploads/{stored.filename}')
+    assert response.status_code == 200 and response.data == b'' and response.mimetype == 'image/jpeg'
+    assert response.headers['X-Accel-Redirect'] == lost_and_found.UPLOAD_ACCEL_PREFIX + stored.filename
+    assert response.get_etag() == (stored.sha256, False) and response.cache_control.immutable
+    assert web.get(f'/uploads/{stored.filename}', headers={'If-None-Match': f'"{stored.sha256}"'}).status_code == 304
+    assert web.get('/uploads/blobs/00/00/missing.jpg').status_code == 404
@@ -0,0 +1,34 @@
+import pytest
+
+from bulk import ImportCheckpoint, batched, find_manifest, read_manifest
+
+
+def test_csv_rows_are_stripped_and_skipped(tmp_path):
+    path = tmp_path / 'manifest.csv'
+    path.write_text("image,item_type,color\na.jpg, wallet ,\nb.jpg,keys,red\n", encoding='utf-8')
+    assert find_manifest(str(tmp_path)) == str(path)
+    assert list(read_manifest(str(path))) == [(1, {"image": "a.jpg", "item_type": "wallet"}), (2, {"image": "b.jpg", "item_type": "keys", "color": "red"})]
+    assert list(read_manifest(str(path), skip=1)) == [(2, {"image": "b.jpg", "item_type": "keys", "color": "red"})]
+
+
+def test_bad_jsonl_lines_become_error_rows(tmp_path):
+    path = tmp_path / 'manifest.jsonl'
+    path.write_text('{"image": "a.jpg"}\n\nnot json\n[1]\n', encoding='utf-8')
+    rows = list(read_manifest(str(path)))
+    assert rows[0] == (1, {"image": "a.jpg"}) and "_error" in rows[1][1] and rows[2][1] == {"_error": "not a JSON object"}
+
+
+def test_batched():
+    assert list(batched(iter(range(5)), 2)) == [[0, 1], [2, 3], [4]]
+    assert list(batched([], 2)) == []
+
+
+def test_checkpoint_resumes_and_refuses_another_manifest(tmp_path):
+    manifest, path = str(tmp_path / 'manifest.csv'), str(tmp_path / 'checkpoint.json')
+    checkpoint = ImportCheckpoint.load(path, manifest)
+    assert checkpoint.rows_done == 0
+    checkpoint.advance(3, imported=2, failed=1); checkpoint.save()
+    resumed = ImportCheckpoint.load(path, manifest)
+    assert (resumed.rows_done, resumed.imported, resumed.failed) == (3, 2, 1)
+    assert sorted(p.name for p in tmp_path.iterdir()) == ['checkpoint.json']
+    with pytest.raises(ValueError, match="belongs to"): ImportCheckpoint.load(path, str(tmp_path / 'other.csv'))
@@ -0,0 +1,99 @@
+import pytest
+
+from cascade import Cascade, CascadeContext, VectorScores
+
+
+def vector(scores):
+    """A scorer returning fixed {item_id: score} (None: every id, unscored)."""
+    return lambda query, ids, ctx, stage: VectorScores(list(scores), None if scores is None else list(scores.values()))
+
+
+SOURCE = {1: None, 2: None, 3: None, 4: None}
+
+
+def scorers(**extra):
+    return {'sql': ('sql', lambda query, ids, ctx, stage: VectorScores(list(SOURCE), None)), **extra}
+
+
+def test_source_runs_first_then_cheapest_first_with_ties_in_configured_order():
+    plan = [{"stage": "c", "cost": 5}, {"stage": "a", "cost": 1}, {"stage": "sql", "cost": 99}, {"stage": "b", "cost": 1}]
+    cascade = Cascade(plan, scorers(a=('a', None), b=('b', None), c=('c', None)))
+    assert [stage.name for stage in cascade.stages] == ['sql', 'a', 'b', 'c']
+    assert cascade.describe() == "sql -> a -> b -> c"
+
+
+@pytest.mark.parametrize("plan, message", [
+    ([{"stage": "sql"}, {"stage": "nope"}], "Unknown match cascade stage"),
+    ([{"stage": "a"}], "exactly one 'sql' stage"),
+    ([{"stage": "sql"}, {"stage": "sql"}], "exactly one 'sql' stage"),
+    ([{"stage": "sql", "treshold": 0.5}], "Invalid match cascade stage"),
+])
+def test_invalid_plans_raise_value_error(plan, message):
+    with pytest.raises(ValueError, match=message):
+        Cascade(plan, scorers(a=('a', None)))
+
+
+def test_each_stage_narrows_the_candidates_of_the_next():
+    plan = [{"stage": "sql"}, {"stage": "meta", "cost": 1, "threshold": 0.5}, {"stage": "rank", "cost": 2, "top_k": 1}]
+    cascade = Cascade(plan, scorers(meta=('metadata', vector({1: 0.9, 2: 0.4, 3: 0.6, 4: 0.7})), rank=('rank', vector({1: 0.1, 3: 0.8, 4: 0.3}))))
+    ctx = CascadeContext(); passed = []
+    report = cascade.run({}, ctx, on_pass=lambda item_id, scores: passed.append((item_id, scores)))
+    assert [(name, count_in, count_out) for name, count_in, count_out, _ in report] == [('sql', 4, 4), ('meta', 4, 3), ('rank', 3, 1)]
+    assert passed == [(3, {'metadata': 0.6, 'rank': 0.8})]
+
+
+def test_stops_once_no_candidates_are_left():
+    calls = []
+    def never(query, ids, ctx, stage): calls.append(stage.name)
+    plan = [{"stage": "sql"}, {"stage": "meta", "cost": 1, "threshold": 0.5}, {"stage": "late", "cost": 2}]
+    report = Cascade(plan, scorers(meta=('metadata', vector({1: 0.1})), late=('late', never))).run({}, CascadeContext())
+    assert report[-1] == ('late', 0, 0, None) and calls == []
+
+
+def test_skipped_stage_passes_candidates_through():
+    plan = [{"stage": "sql"}, {"stage": "skip", "cost": 1}, {"stage": "meta", "cost": 2, "top_k": 2}]
+    report = Cascade(plan, scorers(skip=('skip', lambda *args: None), meta=('metadata', vector({1: 0.2, 2: 0.9, 3: 0.5})))).run({}, CascadeContext())
+    assert [(name, count_in, count_out, seconds is None) for name, count_in, count_out, seconds in report] == \
+        [('sql', 4, 4, False), ('skip', 4, 4, True), ('meta', 4, 2, False)]
+
+
+def test_streamed_final_stage_reports_passes_as_they_arrive_and_can_stop():
+    def stream(query, ids, ctx, stage):
+        yield 1, 0.9; yield 2, None; yield 3, 0.2; yield 4, 0.95
+    passed = []
+    plan = [{"stage": "sql"}, {"stage": "llm", "cost": 100, "threshold": 0.5}]
+    Cascade(plan, scorers(llm=('description', stream))).run({}, CascadeContext(), on_pass=lambda item_id, scores: passed.append(item_id),
+                                                             stop=lambda: len(passed) >= 2)
+    assert passed == [1, 4]
+
+
+def test_degraded_candidates_use_the_degraded_threshold():
+    def stream(query, ids, ctx, stage):
+        ctx.degraded.add(('llm', 2))
+        yield 1, 0.6; yield 2, 0.6
+    ctx = CascadeContext()
+    plan = [{"stage": "sql"}, {"stage": "llm", "cost": 100, "threshold": 0.5, "degraded_threshold": 0.8}]
+    Cascade(plan, scorers(llm=('description', stream))).run({}, ctx)
+    assert ctx.scores['description'] == {1: 0.6}
+
+
+def test_default_plan_scores_descriptions_before_the_image_prefilter():
+    from config import MATCH_CASCADE, IMAGE_PREFILTER_TOP_K
+    seen = {}
+    def stage_scorer(name, keep):
+        def score(query, ids, ctx, stage):
+            seen[name] = None if ids is None else sorted(ids)
+            return VectorScores(ids, [1.0 - n / 100 if keep(item_id) else 0.0 for n, item_id in enumerate(ids)])
+        return score
+    catalogue = list(range(1, 41))
+    names = [spec["stage"] for spec in MATCH_CASCADE]
+    fns = {name: (name, stage_scorer(name, lambda item_id: True)) for name in names}
+    fns['sql'] = ('sql', lambda query, ids, ctx, stage: VectorScores(catalogue, None))
+    fns['llm_description'] = ('description', stage_scorer('llm_description', lambda item_id: item_id % 2 == 0)) # Only even ids describe a match
+    cascade = Cascade(MATCH_CASCADE, fns)
+    assert cascade.describe() == "sql -> metadata -> lexical -> embedding -> llm_description -> fingerprint -> llm_image"
+    cascade.run({}, CascadeContext())
+    embedded = seen['llm_description']
+    assert len(embedded) == min(len(catalogue), next(spec["top_k"] for spec in MATCH_CASCADE if spec["stage"] == "embedding"))
+    assert seen['fingerprint'] == [item_id for item_id in embedded if item_id % 2 == 0] # The prefilter only sees description matches
+    assert len(seen['llm_image']) == IMAGE_PREFILTER_TOP_K and set(seen['llm_image']) <= set(seen['fingerprint'])
@@ -0,0 +1,74 @@
+import json
+
+import pytest
+
+import app as lost_and_found
+from gazetteer import Gazetteer, Place, campus, load_places, normalize_place_text
+from models import db, Item, candidate_query
+
+PLACES = [Place('library', 'Main Library', ('lib',), 28.6000, 77.2000, ('cafe',)), Place('cafe', 'Campus Cafe', ('canteen',), 28.6005, 77.2005, ()),
+          Place('main-gate', 'Main Gate', (), 28.6100, 77.2100, ()), Place('bus-stop', 'Bus Stop', (), 28.6101, 77.2101, ()),
+          Place('lecture-hall-a', 'Lecture Hall A', (), None, None, ('lecture-hall-b',)), Place('lecture-hall-b', 'Lecture Hall B', (), None, None, ())]
+
+
+@pytest.fixture
+def gazetteer():
+    return Gazetteer(PLACES, radius_meters=150)
+
+
+@pytest.mark.parametrize("text, place_id", [("Library Room 201", 'library'), ("near the main library", 'library'), ("CANTEEN", 'cafe'),
+                                            ("lecture hall b, row 3", 'lecture-hall-b'), ("main-gate", 'main-gate'),
+                                            ("Hostel Block C", None), ("", None), (None, None)])
+def test_resolves_the_longest_phrase(gazetteer, text, place_id):
+    place = gazetteer.resolve(text)
+    assert (place.id if place else None) == place_id
+
+
+def test_proximity_and_partitions(gazetteer):
+    assert gazetteer.proximity('library', 'library') == 1.0
+    assert gazetteer.proximity('library', 'cafe') == gazetteer.proximity('cafe', 'library') == 0.5 # Declared and ~70 m apart
+    assert 0 < gazetteer.proximity('main-gate', 'bus-stop') < 0.5 # Only close by distance
+    assert gazetteer.proximity('library', 'main-gate') == 0.0
+    assert gazetteer.nearby('library') == ['library', 'cafe']
+    assert gazetteer.nearby('lecture-hall-b') == ['lecture-hall-b', 'lecture-hall-a']
+    assert gazetteer.nearby('unknown') == []
+
+
+def test_normalize_place_text():
+    assert normalize_place_text("  Library,  Room_201 ") == "library room 201"
+
+
+@pytest.mark.parametrize("entries, message", [({"id": "x"}, "JSON list"), ([{"name": "x"}], "needs an"), ([{"id": "x", "lat": 1}], "both lat and lon"),
+                                              ([{"id": "x"}, {"id": "x"}], "Duplicate"), ([{"id": "x", "adjacent": ["y"]}], "Unknown place"),
+                                              ([{"id": "x" * 51}], "longer than")])
+def test_invalid_gazetteers_raise_value_error(tmp_path, entries, message):
+    path = tmp_path / 'gazetteer.json'; path.write_text(json.dumps(entries))
+    with pytest.raises(ValueError, match=message):
+        Gazetteer(load_places(str(path)))
+
+
+def test_load_gazetteer_raises_with_the_path(tmp_path):
+    path = tmp_path / 'gazetteer.json'; path.write_text("[{")
+    with pytest.raises(ValueError, match="Invalid gazetteer .*gazetteer.json"):
+        lost_and_found.load_gazetteer(str(path))
+    assert len(campus) == 0
+    lost_and_found.load_gazetteer(str(tmp_path / 'missing.json')) # No file: left empty, no error
+    assert len(campus) == 0
+
+
+@pytest.fixture
+def campus_places():
+    campus.configure(PLACES, 150)
+    yield campus
+    campus.configure([])
+
+
+def test_items_store_their_place_and_searches_fetch_nearby_partitions(app, campus_places):
+    for location in ("Library Room 201", "Canteen", "Main Gate", "Hostel Block C"):
+        db.session.add(Item(status='found', item_type='Keys', location=location, image_filename='x.jpg', contact_info='c'))
+    db.session.commit()
+    assert [(item.place_id, item.latitude) for item in Item.query.order_by(Item.id)] == [('library', 28.6), ('cafe', 28.6005), ('main-gate', 28.61), ('', None)]
+    places = lost_and_found.location_partition("library, 2nd floor")
+    assert places == ['library', 'cafe', '']
+    assert [location for (location,) in candidate_query(Item.location, places=places).order_by(Item.id)] == ["Library Room 201", "Canteen", "Hostel Block C"]
+    assert lost_and_found.location_partition("somewhere else") is None
@@ -0,0 +1,44 @@
+import os
+import threading
+
+from PIL import Image as PILImage
+
+from imaging import ImagePipeline
+
+
+def make_upload(folder, name='photo.png', size=(1600, 1200), color=(200, 30, 30)):
+    path = os.path.join(folder, name)
+    PILImage.new('RGB', size, color).save(path)
+    return path
+
+
+def test_process_creates_bounded_derivatives(tmp_path):
+    pipeline = ImagePipeline(str(tmp_path), analysis_max_size=256, thumbnail_max_size=64)
+    result = pipeline.process(make_upload(str(tmp_path)))
+    with PILImage.open(result["analysis_path"]) as analysis, PILImage.open(result["thumbnail_path"]) as thumbnail:
+        assert max(analysis.size) == 256 and max(thumbnail.size) == 64
+    assert result["fingerprint"]
+    assert not [name for name in os.listdir(tmp_path / 'derived') if name.endswith('.tmp')]
+
+
+def test_concurrent_renders_of_one_derivative_publish_a_complete_file(tmp_path):
+    pipeline = ImagePipeline(str(tmp_path), analysis_max_size=256)
+    upload = make_upload(str(tmp_path))
+    errors = []
+    def render():
+        try: pipeline.process(upload)
+        except Exception as e: errors.append(e)
+    threads = [threading.Thread(target=render) for _ in range(8)]
+    for thread in threads: thread.start()
+    for thread in threads: thread.join()
+    assert errors == []
+    with PILImage.open(pipeline.derived_path(upload, 'analysis')) as img: img.load() # Raises on a truncated JPEG
+    assert sorted(os.listdir(tmp_path / 'derived')) == sorted(os.path.basename(pipeline.derived_path(upload, variant)) for variant in ('analysis', 'thumb'))
+
+
+def test_open_derivative_does_not_hold_the_file_open(tmp_path):
+    pipeline = ImagePipeline(str(tmp_path), analysis_max_size=256)
+    img = pipeline.open_derivative(make_upload(str(tmp_path)))
+    assert img.fp is None # Closed after decoding
+    assert img.format == 'JPEG' and img.filename == pipeline.derived_path(os.path.join(str(tmp_path), 'photo.png'), 'analysis')
+    assert img.size == (256, 192)
@@ -0,0 +1,73 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from jobs import JobQueue
+from models import db, Job
+
+
+@pytest.fixture
+def queue(app):
+    return JobQueue(workers=0, max_attempts=3, backoff_seconds=0.0, lease_seconds=60)
+
+
+def test_failing_job_is_retried_then_dead_lettered(queue):
+    calls = []; dead = []
+    @queue.handler('flaky', on_dead=lambda **payload: dead.append(payload))
+    def flaky(n):
+        calls.append(n); raise RuntimeError("boom")
+    queue.enqueue('flaky', n=1); db.session.commit()
+    assert queue.run_pending() == 3 # Zero backoff: each retry is due at once
+    job = Job.query.one()
+    assert (job.status, job.attempts, len(calls)) == ('dead', 3, 3)
+    assert job.last_error == "RuntimeError: boom"
+    assert dead == [{"n": 1}]
+    assert queue.run_pending() == 0
+
+
+def test_retry_waits_for_backoff(queue):
+    queue.backoff_seconds = queue.backoff_max_seconds = 3600
+    queue.handler('flaky')(lambda: 1 / 0)
+    queue.enqueue('flaky'); db.session.commit()
+    assert queue.run_pending() == 1
+    job = Job.query.one()
+    assert job.status == 'queued' and job.run_after > datetime.utcnow() + timedelta(minutes=29)
+    assert queue.run_pending() == 0
+
+
+def test_retry_dead_resets_attempts(queue):
+    queue.enqueue('unknown', max_attempts=1); db.session.commit()
+    queue.run_pending()
+    assert Job.query.one().status == 'dead'
+    assert queue.retry_dead() == 1
+    job = Job.query.one()
+    assert (job.status, job.attempts) == ('queued', 0)
+
+
+def test_only_jobs_with_an_expired_lease_are_requeued(queue):
+    now = datetime.utcnow()
+    live = Job(kind='k', status='running', heartbeat_at=now - timedelta(seconds=10))
+    lost = Job(kind='k', status='running', heartbeat_at=now - timedelta(seconds=120))
+    legacy = Job(kind='k', status='running', updated_at=now - timedelta(seconds=120)) # Claimed before leases existed
+    db.session.add_all([live, lost, legacy]); db.session.commit()
+    assert queue.requeue_expired() == 2
+    assert [job.status for job in Job.query.order_by(Job.id)] == ['running', 'queued', 'queued']
+
+
+def test_start_leaves_jobs_of_live_processes_running(app, queue):
+    db.session.add(Job(kind='k', status='running', heartbeat_at=datetime.utcnow())); db.session.commit()
+    queue.workers = 1
+    queue.start(app)
+    try:
+        assert Job.query.one().status == 'running'
+    finally:
+        queue.stop()
+
+
+def test_claim_takes_the_lease(queue):
+    queue.handler('ok')(lambda: None)
+    queue.enqueue('ok'); db.session.commit()
+    job = queue._claim()
+    assert job.status == 'running' and job.heartbeat_at is not None and job.id in queue._running
+    queue._run(job)
+    assert job.id not in queue._running and db.session.get(Job, job.id).status == 'done'
@@ -0,0 +1,73 @@
+import pytest
+
+from lexical import ensure_fulltext_index, fulltext_available, match_query, search
+from models import db, Item
+
+
+@pytest.fixture
+def fts(app):
+    assert ensure_fulltext_index(db.engine) and fulltext_available(db.session)
+    return db.session
+
+
+def add(description, status='found', item_type='Keys', color=None):
+    item = Item(status=status, item_type=item_type, color=color, location='Library', image_filename='x.jpg', contact_info='c', ai_description=description)
+    db.session.add(item); db.session.commit()
+    return item
+
+
+def hit_ids(session, query, **kwargs):
+    return [item_id for item_id, _ in search(session, query, 'found', **kwargs)]
+
+
+def test_match_query_quotes_words_and_drops_stopwords():
+    assert match_query("The black wallet, with a zip", "Black", None) == '"black" OR "wallet" OR "zip"'
+    assert match_query('NOT "xy" NEAR(yy) zz*') == '"xy" OR "near" OR "yy" OR "zz"' # FTS5 syntax is never passed through
+    assert match_query("a an the", "") is None
+    assert match_query("one two three four", max_terms=2) == '"one" OR "two"'
+
+
+def test_triggers_follow_inserts_updates_and_deletes(fts):
+    item = add("A black leather wallet")
+    assert hit_ids(fts, '"leather"') == [item.id]
+    item.ai_description = "A red umbrella"; db.session.commit()
+    assert hit_ids(fts, '"leather"') == [] and hit_ids(fts, '"umbrella"') == [item.id]
+    item.color = "Crimson"; db.session.commit()
+    assert hit_ids(fts, '"crimson"') == [item.id]
+    db.session.delete(item); db.session.commit()
+    assert hit_ids(fts, '"umbrella"') == []
+
+
+def test_index_is_built_from_existing_rows(app):
+    item = add("A silver watch with a cracked face") # Before the index exists
+    db.session.execute(db.text("DROP TABLE IF EXISTS item_fts")); db.session.commit()
+    assert ensure_fulltext_index(db.engine)
+    assert hit_ids(db.session, '"cracked"') == [item.id]
+
+
+def test_search_ranks_filters_and_limits_in_sql(fts):
+    strong = add("black wallet black leather black strap", color="Black")
+    weak = add("a wallet found near the black gate")
+    other = add("black wallet", item_type='Electronics')
+    lost = add("black wallet", status='lost')
+    hits = search(fts, '"black" OR "wallet"', 'found')
+    assert hits[0][0] == strong.id
+    assert hits == sorted(hits, key=lambda hit: -hit[1])
+    assert lost.id not in [item_id for item_id, _ in hits]
+    assert hit_ids(fts, '"black" OR "wallet"', item_type='keys') == [strong.id, weak.id]
+    assert hit_ids(fts, '"black" OR "wallet"', limit=1) == [hits[0][0]]
+    assert hit_ids(fts, '"black" OR "wallet"', ids=[weak.id, other.id]) == sorted([weak.id, other.id], key=[item_id for item_id, _ in hits].index)
+    assert hit_ids(fts, '"black"', ids=[]) == []
+
+
+def test_stage_keeps_candidates_without_a_matching_word_while_there_is_room(fts):
+    import app as lost_and_found
+    from cascade import CascadeContext, CascadeStage
+    described = add("black leather wallet"); synonym = add("dark purse"); pending = add(None) # Description job not run yet
+    ids = [described.id, synonym.id, pending.id]
+    ctx = CascadeContext(status='found', item_type='Keys'); ctx.scores['metadata'] = {described.id: 0.7, synonym.id: 0.6, pending.id: 0.9}
+    query = {"ai_description": "a black wallet", "color": None, "brand": None}
+    result = lost_and_found.score_lexical(query, ids, ctx, CascadeStage('lexical', top_k=10))
+    assert result.ids == [described.id, pending.id, synonym.id] and result.scores[0] > 0 and result.scores[1:] == [0.0, 0.0]
+    result = lost_and_found.score_lexical(query, ids, ctx, CascadeStage('lexical', top_k=2))
+    assert result.ids == [described.id, pending.id] # Over the cap, word matches first, then the best metadata matches
@@ -0,0 +1,97 @@
+from datetime import datetime, timedelta
+
+import pytest
+from werkzeug.exceptions import BadRequest
+
+import app as lost_and_found
+from listing import CatalogVersion, ListingCache, decode_cursor, encode_cursor
+from models import db, Item, browse_query
+
+
+def test_cursor_round_trips():
+    timestamp = datetime(2024, 5, 17, 13, 45, 12, 123456)
+    assert decode_cursor(encode_cursor(timestamp, 42)) == (timestamp, 42)
+
+
+@pytest.mark.parametrize("cursor", ["", "not base64!", "bm9waXBl", encode_cursor(datetime(2024, 1, 1), 1)[:-3],
+                                    "MjAyNC0wMS0wMXxhYmM", "MjAyNC0xMy0wMXwx", "__8"]) # No '|', 'abc' id, month 13, invalid UTF-8
+def test_malformed_cursors_raise_value_error(cursor):
+    with pytest.raises(ValueError):
+        decode_cursor(cursor)
+
+
+@pytest.mark.parametrize("query", ["cursor=garbage", "since=2024-02-30", "until=yesterday", "limit=ten"])
+def test_bad_browse_parameters_are_a_400(app, query):
+    with app.test_request_context(f"/api/items?{query}"):
+        with pytest.raises(BadRequest):
+            lost_and_found.browse_filters(lost_and_found.request.args)
+
+
+def test_keyset_pages_cover_every_item_once(app):
+    same_time = datetime(2024, 1, 1, 12, 0) # Ties on timestamp are ordered by id
+    for n in range(25):
+        db.session.add(Item(status='found', item_type='Keys' if n % 3 else 'Wallet/Purse', location='Library', image_filename=f'{n}.jpg',
+                            contact_info='c', timestamp=same_time if n < 10 else same_time + timedelta(minutes=n)))
+    db.session.add(Item(status='lost', item_type='Keys', location='Library', image_filename='lost.jpg', contact_info='c'))
+    db.session.commit()
+    seen = []; after = None
+    while True:
+        rows = browse_query(Item.id, Item.timestamp, after=after).limit(7).all()
+        if not rows: break
+        seen += [row.id for row in rows]; after = (rows[-1].timestamp, rows[-1].id)
+    expected = [item.id for item in Item.query.filter_by(status='found').order_by(Item.timestamp.desc(), Item.id.desc())]
+    assert seen == expected and len(seen) == 25
+    assert all(item_type == 'Keys' for (item_type,) in browse_query(Item.item_type, item_type='Keys'))
+
+
+def test_catalog_version_changes_on_every_bump(tmp_path):
+    version = CatalogVersion(str(tmp_path / 'catalog.version'))
+    assert version.current() == "0"
+    stamps = set()
+    for _ in range(5): version.bump(); stamps.add(version.current())
+    assert len(stamps) == 5
+
+
+def test_listing_cache_misses_once_the_version_changes(tmp_path):
+    version = CatalogVersion(str(tmp_path / 'catalog.version')); cache = ListingCache(max_entries=10, ttl_seconds=60)
+    calls = []
+    def page(): calls.append(1); return len(calls)
+    assert cache.get_or_compute(('page', version.current()), page) == 1
+    assert cache.get_or_compute(('page', version.current()), page) == 1
+    version.bump()
+    assert cache.get_or_compute(('page', version.current()), page) == 2
+
+
+@pytest.fixture
+def catalog_version(app, tmp_path, monkeypatch):
+    version = CatalogVersion(str(tmp_path / 'catalog.version'))
+    monkeypatch.setattr(lost_and_found, 'catalog_version', version)
+    return version
+
+
+def test_commits_changing_found_items_bump_the_version(catalog_version):
+    item = Item(status='found', item_type='Keys', location='Library', image_filename='x.jpg', contact_info='c')
+    db.session.add(item); db.session.commit()
+    added = catalog_version.current(); assert added != "0"
+    item.color = 'Red'; db.session.commit()
+    changed = catalog_version.current(); assert changed != added
+    db.session.delete(item); db.session.commit()
+    assert catalog_version.current() != changed
+
+
+def test_other_commits_leave_the_version_alone(catalog_version):
+    db.session.add(Item(status='lost', item_type='Keys', location='Library', image_filename='x.jpg', contact_info='c')); db.session.commit()
+    assert catalog_version.current() == "0"
+    db.session.add(Item(status='found', item_type='Keys', location='Library', image_filename='y.jpg', contact_info='c')); db.session.flush()
+    db.session.rollback()
+    db.session.commit()
+    assert catalog_version.current() == "0"
+
+
+def test_browse_api_does_not_publish_contact_details(web):
+    db.session.add(Item(status='found', item_type='Keys', location='Library', image_filename='x.jpg', contact_info='finder@example.com'))
+    db.session.commit()
+    response = web.get('/api/items')
+    assert response.status_code == 200 and len(response.get_json()["items"]) == 1
+    assert 'contact_info' not in response.get_json()["items"][0] and b'finder@example.com' not in response.data
+    assert b'finder@example.com' not in web.get('/items').data
@@ -0,0 +1,78 @@
+import io
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from blobstore import BlobStore
+from lexical import ensure_fulltext_index
+from listing import CatalogVersion
+from maintenance import Maintenance
+from models import db, Item, ArchivedItem, Match, Blob
+
+
+def add_item(status, days_old, filename='x.jpg', description=None):
+    item = Item(status=status, item_type='Keys', location='Library', image_filename=filename, contact_info='c', ai_description=description,
+                timestamp=datetime.utcnow() - timedelta(days=days_old))
+    db.session.add(item); db.session.commit()
+    return item.id
+
+
+def maintenance(tmp_path, **options):
+    options = {"batch_size": 2, "pause_seconds": 0, "grace_seconds": 0, **options}
+    return Maintenance(BlobStore(str(tmp_path / 'uploads')), None, **options)
+
+
+def test_archive_expired_moves_items_and_their_matches(app, tmp_path):
+    old = [add_item('found', 100) for _ in range(3)]; recent = add_item('found', 1); lost = add_item('lost', 100)
+    db.session.add(Match(lost_item_id=lost, found_item_id=old[0], confidence=0.9)); db.session.commit()
+    job = maintenance(tmp_path)
+    job.archive_expired(found_after_days=30)
+    assert [item.id for item in Item.query.order_by(Item.id)] == [recent, lost]
+    assert sorted(archived.item_id for archived in ArchivedItem.query) == old and Match.query.count() == 0
+    assert job.counts == {'archive_stale': 3} and job.archived == {'found': old}
+
+
+def test_dry_run_only_counts(app, tmp_path):
+    add_item('found', 100); add_item('lost', 100)
+    job = maintenance(tmp_path, dry_run=True)
+    job.archive_expired(found_after_days=30, searches_after_days=30)
+    assert job.counts == {'archive_expired': 1, 'archive_stale': 1} and Item.query.count() == 2 and ArchivedItem.query.count() == 0
+
+
+def test_out_of_time_stops_archiving(app, tmp_path):
+    for _ in range(3): add_item('found', 100)
+    assert maintenance(tmp_path, max_seconds=0).archive(Item.query, 'stale') == 0 and Item.query.count() == 3
+
+
+def test_only_unreferenced_blobs_are_removed(app, tmp_path):
+    job = maintenance(tmp_path)
+    kept, dropped = job.blob_store.save(io.BytesIO(b'kept'), '.jpg'), job.blob_store.save(io.BytesIO(b'dropped'), '.jpg')
+    db.session.add(Blob(sha256=kept.sha256, filename=kept.filename, size=kept.size, ref_count=1)); db.session.commit()
+    assert job.remove_unreferenced_blobs() == 1
+    assert job.blob_store.find(kept.sha256) == kept.filename and job.blob_store.find(dropped.sha256) is None
+
+
+def test_orphan_uploads_respect_references_and_the_grace_period(app, tmp_path):
+    job = maintenance(tmp_path); folder = tmp_path / 'uploads'; folder.mkdir()
+    for name in ('used.jpg', 'search_1.jpg'): (folder / name).write_bytes(b'x')
+    add_item('found', 1, filename='used.jpg')
+    assert maintenance(tmp_path, grace_seconds=3600).remove_orphan_uploads() == 0
+    assert job.remove_orphan_uploads() == 1 and sorted(p.name for p in folder.iterdir()) == ['used.jpg']
+
+
+def test_maintenance_rewrites_the_vector_index_and_other_processes_reload_it(web, tmp_path, monkeypatch):
+    import app as lost_and_found
+    monkeypatch.setattr(lost_and_found, 'vector_index_version', CatalogVersion(str(tmp_path / 'vector_index.version')))
+    ensure_fulltext_index(db.engine)
+    old = add_item('found', lost_and_found.ARCHIVE_FOUND_AFTER_DAYS + 10, description="A black leather wallet")
+    recent = add_item('found', 1, description="A red umbrella")
+    other_process_copy = lost_and_found.get_vector_index('found')
+    assert old in other_process_copy
+    counts = lost_and_found.run_maintenance(pause_seconds=0)
+    assert counts['archive_stale'] == 1 and counts['fulltext_optimized'] == 1
+    with np.load(tmp_path / 'vector_index.npz') as data: saved = set(data['ids'].tolist())
+    assert old not in saved and recent in saved
+    # A process still holding the old copy reloads it once it sees the new stamp
+    lost_and_found.vector_indexes['found'] = other_process_copy; lost_and_found.vector_index_stamps['found'] = "0"
+    reloaded = lost_and_found.get_vector_index('found')
+    assert reloaded is not other_process_copy and reloaded.ids == {recent}
@@ -0,0 +1,74 @@
+import threading
+import time
+
+import pytest
+
+from match_engine import Deadline, MatchPool
+
+
+class StubScorer:
+    """Sleeps `delays[item]` seconds (0 by default), records calls and the peak number running at once."""
+
+    def __init__(self, delays=None, fail=()):
+        self.delays = delays or {}; self.fail = set(fail)
+        self.calls = []; self.running = 0; self.peak = 0; self.lock = threading.Lock()
+
+    def __call__(self, item):
+        with self.lock: self.calls.append(item); self.running += 1; self.peak = max(self.peak, self.running)
+        try:
+            time.sleep(self.delays.get(item, 0))
+            if item in self.fail: raise RuntimeError(f"model error for {item}")
+            return item * 10
+        finally:
+            with self.lock: self.running -= 1
+
+
+@pytest.fixture
+def pool():
+    pool = MatchPool(max_concurrency=3)
+    yield pool
+    pool.shutdown()
+
+
+def test_yields_every_result_in_completion_order(pool):
+    scorer = StubScorer({1: 0.15, 2: 0.0, 3: 0.05})
+    assert list(pool.fan_out(scorer, [1, 2, 3])) == [(2, 20), (3, 30), (1, 10)]
+
+
+def test_deadline_returns_partial_results_and_marks_the_deadline_hit(pool):
+    scorer = StubScorer({2: 1.0, 3: 1.0})
+    deadline = Deadline(0.2); started = time.monotonic()
+    assert list(pool.fan_out(scorer, [1, 2, 3], deadline=deadline)) == [(1, 10)]
+    assert deadline.hit and time.monotonic() - started < 0.9
+
+
+def test_stop_cancels_the_calls_not_yet_started(pool):
+    scorer = StubScorer({item: 0.05 for item in range(20)})
+    results = list(pool.fan_out(scorer, range(20), stop=lambda: True))
+    time.sleep(0.2) # Let the calls already running finish
+    assert len(results) == 1 and len(scorer.calls) <= 3 # Only the first window was ever submitted
+
+
+def test_closing_the_generator_cancels_queued_calls(pool):
+    scorer = StubScorer({item: 0.05 for item in range(20)})
+    results = pool.fan_out(scorer, range(20), window=10)
+    next(results); results.close()
+    time.sleep(0.3)
+    assert len(scorer.calls) < 20
+
+
+def test_failed_calls_are_skipped_and_the_rest_still_run(pool):
+    scorer = StubScorer(fail={2})
+    assert sorted(pool.fan_out(scorer, [1, 2, 3, 4])) == [(1, 10), (3, 30), (4, 40)]
+
+
+def test_window_of_one_scores_sequentially(pool):
+    scorer = StubScorer({item: 0.02 for item in range(5)})
+    assert [item for item, _ in pool.fan_out(scorer, range(5), window=1)] == [0, 1, 2, 3, 4]
+    assert scorer.peak == 1
+
+
+def test_concurrency_is_bounded_by_the_pool_size(pool):
+    scorer = StubScorer({item: 0.05 for item in range(12)})
+    assert len(list(pool.fan_out(scorer, range(12), window=12))) == 12
+    assert scorer.peak <= 3
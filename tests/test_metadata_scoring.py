@@ -0,0 +1,54 @@
+import pytest
+
+from app import calculate_metadata_similarity
+from gazetteer import campus, Place
+from metadata_scoring import MetadataBlock, PARITY_EDGE_CASES, find_parity_mismatches, score_metadata_batch
+from models import Item
+
+# Found items covering the same branches: missing and empty fields, case and whitespace differences, substrings
+FOUND = [("Electronics", "Black", "HP", "Library Room 201"), ("Electronics", "black", None, "library"), ("Keys", "", "", "Cafe"),
+         ("Keys", "Dark Blue", "Apple Inc", "Main Gate"), ("Identification", " White ", "School ID Card", "LIBRARY "),
+         ("Wallet/Purse", None, None, "Canteen"), ("Other", "blue", "apple", "Lecture Hall B, row 3")]
+
+
+@pytest.fixture
+def items():
+    return [Item(id=n, status='found', item_type=item_type, color=color, brand=brand, location=location, image_filename='x.jpg', contact_info='c')
+            for n, (item_type, color, brand, location) in enumerate(FOUND, 1)]
+
+
+@pytest.fixture
+def gazetteer():
+    campus.configure([Place('library', 'Main Library', (), 28.6, 77.2, ('cafe',)), Place('cafe', 'Campus Cafe', ('canteen',), 28.6005, 77.2005, ()),
+                      Place('main-gate', 'Main Gate', (), 28.61, 77.21, ())])
+    yield campus
+    campus.configure([])
+
+
+def queries(items):
+    return [item.get_metadata() for item in items] + PARITY_EDGE_CASES
+
+
+def test_batch_scores_equal_the_reference_for_every_edge_case(items):
+    assert find_parity_mismatches(queries(items), items, calculate_metadata_similarity) == []
+
+
+def test_batch_scores_equal_the_reference_with_a_gazetteer(items, gazetteer):
+    assert find_parity_mismatches(queries(items), items, calculate_metadata_similarity) == []
+
+
+@pytest.mark.parametrize("lost_meta", PARITY_EDGE_CASES)
+def test_each_edge_case_scores_identically(items, lost_meta):
+    batch = score_metadata_batch(lost_meta, MetadataBlock.from_items(items))
+    assert [float(score) for score in batch] == [calculate_metadata_similarity(lost_meta, item.get_metadata()) for item in items]
+
+
+def test_found_values_are_normalized_before_scoring(items):
+    found = items[4].get_metadata() # " White ", "School ID Card", "LIBRARY "
+    assert found == {"item_type": "identification", "color": " white ", "brand": "school id card", "location": "library "}
+    lost = {"item_type": "identification", "color": "white ", "brand": "school id card ", "location": "library "}
+    assert calculate_metadata_similarity(lost, found) == float(score_metadata_batch(lost, MetadataBlock.from_items([items[4]]))[0])
+
+
+def test_empty_block():
+    assert len(score_metadata_batch(PARITY_EDGE_CASES[0], MetadataBlock.from_rows([]))) == 0
@@ -0,0 +1,68 @@
+import re
+
+import app as lost_and_found
+from metrics import Metrics
+
+SAMPLE = re.compile(r'^([a-zA-Z_:][a-zA-Z0-9_:]*)(\{[a-zA-Z_][a-zA-Z0-9_]*="(?:[^"\\\n]|\\[\\"n])*"(?:,[a-zA-Z_][a-zA-Z0-9_]*="(?:[^"\\\n]|\\[\\"n])*")*\})? (\S+)$')
+
+
+def parse(text):
+    """Checks the Prometheus text exposition format line by line; returns {family: (kind, help, [(name, labels, value)])}."""
+    assert text.endswith("\n")
+    families = {}; current = None
+    for line in text.splitlines():
+        if line.startswith("# HELP "):
+            name, help_text = line[7:].split(" ", 1)
+            assert name not in families and "\n" not in help_text
+            families[name] = [None, help_text, []]; current = name
+        elif line.startswith("# TYPE "):
+            name, kind = line[7:].split(" ")
+            assert kind in ('counter', 'gauge', 'histogram') and families.setdefault(name, [None, None, []])[0] is None and not families[name][2]
+            families[name][0] = kind; current = name
+        else:
+            match = SAMPLE.match(line)
+            assert match, line
+            name, labels, value = match.groups()
+            assert re.fullmatch(rf"{current}(_bucket|_sum|_count)?" if families[current][0] == 'histogram' else current, name), (current, line)
+            float(value)
+            families[current][2].append((name, labels or "", value))
+    return {name: tuple(family) for name, family in families.items()}
+
+
+def test_render_is_valid_prometheus_text():
+    metrics = Metrics(buckets=(0.1, 1.0))
+    metrics.describe('stage_seconds', 'histogram', 'Time per stage.')
+    metrics.describe('odd_total', 'counter', 'A help text with a \\ and a\nnewline.')
+    metrics.inc('odd_total', stage='say "hi"\\n\nbye')
+    metrics.inc('uploads_total', 1234567, outcome='stored')
+    metrics.set_gauge('jobs', 0.25, status='queued')
+    for seconds in (0.05, 0.5, 2.0): metrics.observe('stage_seconds', seconds, stage='describe')
+    families = parse(metrics.render())
+    assert families['lostfound_odd_total'] == ('counter', 'A help text with a \\\\ and a\\nnewline.',
+                                               [('lostfound_odd_total', '{stage="say \\"hi\\"\\\\n\\nbye"}', '1')])
+    assert families['lostfound_uploads_total'] == ('counter', None, [('lostfound_uploads_total', '{outcome="stored"}', '1234567')]) # Not 1.23457e+06
+    assert families['lostfound_jobs'] == ('gauge', None, [('lostfound_jobs', '{status="queued"}', '0.25')])
+    kind, _, samples = families['lostfound_stage_seconds']
+    assert kind == 'histogram' and samples == [
+        ('lostfound_stage_seconds_bucket', '{stage="describe",le="0.1"}', '1'),
+        ('lostfound_stage_seconds_bucket', '{stage="describe",le="1"}', '2'),
+        ('lostfound_stage_seconds_bucket', '{stage="describe",le="+Inf"}', '3'),
+        ('lostfound_stage_seconds_sum', '{stage="describe"}', '2.550000'),
+        ('lostfound_stage_seconds_count', '{stage="describe"}', '3')]
+
+
+def test_disabled_metrics_render_nothing():
+    metrics = Metrics(enabled=False)
+    metrics.inc('uploads_total'); metrics.observe('stage_seconds', 1.0)
+    assert metrics.render() == "\n"
+
+
+def test_metrics_endpoint_serves_the_text_format(web, monkeypatch):
+    monkeypatch.setattr(lost_and_found, 'metrics', Metrics())
+    web.get('/api/items')
+    response = web.get('/metrics')
+    assert response.status_code == 200 and response.mimetype == 'text/plain'
+    families = parse(response.get_data(as_text=True))
+    assert families['lostfound_jobs'][0] == 'gauge' and families['lostfound_model_circuit_open'][0] == 'gauge'
+    monkeypatch.setattr(lost_and_found, 'METRICS_ENABLED', False)
+    assert web.get('/metrics').status_code == 404
@@ -0,0 +1,54 @@
+import pytest
+
+from model_client import CircuitBreaker, ModelClient, ModelUnavailable, TokenBucket
+
+
+class ServiceUnavailable(Exception):
+    """Named like the google.api_core error, so it counts as transient."""
+
+
+def client(failures=3, retries=2, rate=1000.0, burst=100, reset_seconds=60.0):
+    return ModelClient('text', TokenBucket(rate, burst), CircuitBreaker(failures, reset_seconds), max_retries=retries, backoff_seconds=0.0, acquire_timeout=0.01)
+
+
+def flaky(errors, result="ok"):
+    calls = []
+    def call():
+        calls.append(1)
+        if len(calls) <= errors: raise ServiceUnavailable("try again")
+        return result
+    return call, calls
+
+
+def test_transient_errors_are_retried():
+    fn, calls = flaky(2)
+    assert client().call(fn) == "ok" and len(calls) == 3
+
+
+def test_other_errors_are_not_retried_and_do_not_trip_the_breaker():
+    model = client(failures=1); calls = []
+    def bad_request(): calls.append(1); raise ValueError("bad prompt")
+    with pytest.raises(ValueError): model.call(bad_request)
+    assert len(calls) == 1 and model.available()
+
+
+def test_breaker_opens_and_fails_fast():
+    model = client(failures=2, retries=5)
+    fn, calls = flaky(10)
+    with pytest.raises(ServiceUnavailable): model.call(fn)
+    assert len(calls) == 2 and not model.available()
+    with pytest.raises(ModelUnavailable): model.call(fn)
+    assert len(calls) == 2
+
+
+def test_half_open_trial_call_closes_the_breaker():
+    model = client(failures=1, retries=0, reset_seconds=0.0)
+    fn, calls = flaky(1)
+    with pytest.raises(ServiceUnavailable): model.call(fn)
+    assert model.call(fn) == "ok" and model.breaker.state == 'closed'
+
+
+def test_rate_limit_refuses_when_no_token_frees_up():
+    model = client(rate=0.01, burst=1)
+    assert model.call(lambda: 1) == 1
+    with pytest.raises(ModelUnavailable, match="rate limit"): model.call(lambda: 2)
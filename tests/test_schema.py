@@ -0,0 +1,51 @@
+from models import db, Item, candidate_query, ensure_schema
+
+# The item table as the first release created it, before any of the migrated columns and indexes
+BASELINE_ITEM_DDL = """CREATE TABLE item (id INTEGER PRIMARY KEY, status VARCHAR(10) NOT NULL, item_type VARCHAR(100) NOT NULL,
+    color VARCHAR(50), brand VARCHAR(100), location VARCHAR(200) NOT NULL, image_filename VARCHAR(200) NOT NULL,
+    ai_description TEXT, contact_info VARCHAR(200) NOT NULL, timestamp DATETIME)"""
+
+
+def make_baseline_database(rows=5):
+    db.drop_all()
+    with db.engine.begin() as conn:
+        conn.exec_driver_sql(BASELINE_ITEM_DDL)
+        for n in range(rows):
+            conn.exec_driver_sql("INSERT INTO item (status, item_type, color, brand, location, image_filename, contact_info) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                                 ('found', ' KEYS ' if n % 2 else 'Keys', 'Dark BLUE', None if n % 2 else 'HP', f'Library Room {n}', f'{n}.jpg', 'desk'))
+    db.create_all() # Creates the tables added later, leaves item as it is
+
+
+def test_ensure_schema_migrates_a_baseline_item_table(app):
+    make_baseline_database()
+    ensure_schema(batch_size=2)
+    inspector = db.inspect(db.engine)
+    assert {column.name for column in Item.__table__.columns} <= {column['name'] for column in inspector.get_columns('item')}
+    assert {index.name for index in Item.__table__.indexes} <= {index['name'] for index in inspector.get_indexes('item')}
+    rows = db.session.query(Item.item_type_norm, Item.color_norm, Item.brand_norm, Item.location_norm, Item.place_id).order_by(Item.id).all()
+    assert len(rows) == 5
+    assert rows[0] == ('keys', 'dark blue', 'hp', 'library room 0', '') and rows[1] == ('keys', 'dark blue', '', 'library room 1', '')
+
+
+def test_ensure_schema_drops_the_indexes_it_replaced(app):
+    make_baseline_database()
+    with db.engine.begin() as conn: conn.exec_driver_sql("CREATE INDEX ix_item_status_place_type ON item (status, item_type)")
+    ensure_schema()
+    assert 'ix_item_status_place_type' not in {index['name'] for index in db.inspect(db.engine).get_indexes('item')}
+
+
+def test_ensure_schema_is_idempotent(app):
+    make_baseline_database()
+    ensure_schema(); ensure_schema()
+    assert Item.query.filter(Item.location_norm.is_(None)).count() == 0
+    assert db.session.execute(db.text("SELECT count(*) FROM item_fts WHERE item_fts MATCH 'blue'")).scalar() == 5
+
+
+def test_item_type_filter_ignores_case_and_surrounding_spaces(app):
+    for item_type in ('Wallet/Purse', 'wallet/purse', ' WALLET/PURSE ', 'Keys'):
+        db.session.add(Item(status='found', item_type=item_type, location='Library', image_filename='x.jpg', contact_info='c'))
+    db.session.commit()
+    assert candidate_query(Item.id, item_type='Wallet/Purse').count() == 3
+    assert candidate_query(Item.id, item_type=' wallet/purse').count() == 3
+    make_baseline_database(); ensure_schema() # Rows written before the normalized column existed
+    assert candidate_query(Item.id, item_type='keys').count() == 5
@@ -0,0 +1,37 @@
+import os
+import time
+
+from score_cache import FileHasher, ScoreCache, normalize_text
+
+
+def test_values_persist_across_instances(tmp_path):
+    path = str(tmp_path / 'cache.db'); key = ScoreCache.make_key('describe:v1', 'abc')
+    ScoreCache(path).set(key, {"score": 0.75})
+    cache = ScoreCache(path)
+    assert cache.get(key) == {"score": 0.75} and cache.counters["db_hits"] == 1
+    assert cache.get(key) == {"score": 0.75} and cache.counters["memory_hits"] == 1
+
+
+def test_keys_depend_on_kind_and_inputs():
+    assert ScoreCache.make_key('compare:v1', 'a', 'b') != ScoreCache.make_key('compare:v2', 'a', 'b') != ScoreCache.make_key('compare:v1', 'b', 'a')
+    assert normalize_text("  A  black\n wallet ") == "A black wallet"
+
+
+def test_expired_entries_miss(tmp_path):
+    cache = ScoreCache(str(tmp_path / 'cache.db'), ttl_seconds=0.05)
+    cache.set('k', 1); time.sleep(0.1)
+    assert cache.get('k') is None and cache.counters["expired"] >= 1
+
+
+def test_disabled_cache_stores_nothing(tmp_path):
+    cache = ScoreCache(str(tmp_path / 'cache.db'), enabled=False)
+    cache.set('k', 1)
+    assert cache.get('k') is None and not os.path.exists(tmp_path / 'cache.db')
+
+
+def test_file_hasher_rehashes_changed_files(tmp_path):
+    path = tmp_path / 'image.jpg'; path.write_bytes(b'one')
+    hasher = FileHasher(); first = hasher.sha256(str(path))
+    assert hasher.sha256(str(path)) == first
+    path.write_bytes(b'two!')
+    assert hasher.sha256(str(path)) != first
@@ -0,0 +1,88 @@
+import io
+import json
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+from PIL import Image as PILImage
+
+import app as lost_and_found
+from fake_gemini import FakeGenerativeModel
+from model_client import PerProcess
+from models import db, Item, Match, Job
+
+
+def add_search(search_status='running'):
+    item = Item(status='lost', item_type='Keys', location='Library', image_filename='lost.jpg', contact_info='', search_status=search_status)
+    db.session.add(item); db.session.commit()
+    return item.id
+
+
+def events(data):
+    """(event name, data) pairs of an SSE body, plus ('retry', milliseconds) fields."""
+    parsed = []
+    for block in data.decode().split("\n\n"):
+        fields = dict(line.split(": ", 1) for line in block.splitlines() if ": " in line)
+        if 'retry' in fields: parsed.append(('retry', fields['retry']))
+        if 'event' in fields: parsed.append((fields['event'], fields['data']))
+    return parsed
+
+
+def test_running_search_stream_ends_quickly_and_asks_the_browser_to_reconnect(web, monkeypatch):
+    monkeypatch.setattr(lost_and_found, 'SEARCH_STREAM_MAX_SECONDS', 0.2); monkeypatch.setattr(lost_and_found, 'SEARCH_STREAM_POLL_SECONDS', 0.05)
+    response = web.get(f'/searches/{add_search()}/events')
+    names = [name for name, _ in events(response.data)]
+    assert names == ['retry', 'state'] # No 'done': the browser reconnects and the next stream carries on
+
+
+@pytest.fixture
+def fake_model(monkeypatch):
+    model = FakeGenerativeModel(latency=0)
+    monkeypatch.setattr(lost_and_found, 'gemini_models', PerProcess(lambda: {'text': model, 'image': model}))
+    return model
+
+
+def jpeg(seed):
+    """A distinct, detailed test photo per seed."""
+    pixels = np.random.default_rng(seed).integers(0, 256, (8, 8, 3), dtype=np.uint8)
+    out = io.BytesIO(); PILImage.fromarray(pixels).resize((64, 64)).save(out, 'JPEG')
+    return out.getvalue()
+
+
+def report_found(web, seed):
+    web.post('/report_found', data={'item_image': (io.BytesIO(jpeg(seed)), 'found.jpg'), 'item_type': 'Keys', 'location': 'Library', 'contact_info': 'desk'},
+             content_type='multipart/form-data')
+    return Item.query.filter_by(status='found').order_by(Item.id.desc()).first().id
+
+
+def start_search(web, seed):
+    response = web.post('/searches', data={'item_image': (io.BytesIO(jpeg(seed)), 'lost.jpg'), 'item_type': 'Keys', 'location': 'Library'},
+                        content_type='multipart/form-data')
+    assert response.status_code == 202
+    return response.get_json()['id']
+
+
+def test_search_job_streams_its_matches_then_done(web, fake_model, monkeypatch):
+    monkeypatch.setattr(lost_and_found, 'SEARCH_STREAM_MAX_SECONDS', 0.1)
+    found = report_found(web, 1); report_found(web, 2)
+    lost_and_found.job_queue.run_pending()
+    search = start_search(web, 1)
+    assert [name for name, _ in events(web.get(f'/searches/{search}/events').data)][:2] == ['retry', 'state'] # Queued, not yet run
+    assert lost_and_found.job_queue.run_pending() == 1
+    streamed = events(web.get(f'/searches/{search}/events').data)
+    assert [name for name, _ in streamed] == ['retry', 'state', 'match', 'done']
+    match = json.loads(streamed[2][1]); done = json.loads(streamed[3][1])
+    assert match['found_item_id'] == found and match['source'] == 'search' and done['search_status'] == 'done' and done['description_status'] == 'done'
+    resumed = events(web.get(f'/searches/{search}/events', headers={'Last-Event-ID': str(match['id'])}).data)
+    assert [name for name, _ in resumed] == ['retry', 'state', 'done'] # A reconnecting browser is not sent the match again
+    assert [m['found_item_id'] for m in web.get(f'/searches/{search}/matches').get_json()['matches']] == [found]
+
+
+def test_a_new_found_item_is_matched_against_open_searches_only(web, fake_model):
+    open_search = start_search(web, 1); expired = start_search(web, 1); start_search(web, 2) # A different photo
+    lost_and_found.job_queue.run_pending()
+    db.session.get(Item, expired).timestamp = datetime.utcnow() - timedelta(days=lost_and_found.LOST_SEARCH_OPEN_DAYS + 1); db.session.commit()
+    found = report_found(web, 1)
+    lost_and_found.job_queue.run_pending() # enrich_found_item, then the match_found_item job it queues
+    assert [(m.lost_item_id, m.found_item_id, m.source) for m in Match.query] == [(open_search, found, 'new_item')]
+    assert Job.query.filter(Job.status != 'done').count() == 0
@@ -0,0 +1,51 @@
+import pytest
+
+import app as lost_and_found
+from cascade import CascadeContext, CascadeStage
+from embeddings import VectorIndex, get_embedder
+from models import db, Item
+
+DESCRIPTION = "A black leather wallet with a silver zip and a worn corner."
+
+
+@pytest.fixture
+def indexes(app):
+    lost_and_found.vector_indexes.clear()
+    yield lost_and_found.vector_indexes
+    lost_and_found.vector_indexes.clear()
+
+
+def add_found_item(description=DESCRIPTION):
+    item = Item(status='found', item_type='Wallet/Purse', location='Library', image_filename='x.jpg', contact_info='c', ai_description=description)
+    db.session.add(item); db.session.commit()
+    return item.id
+
+
+def test_search_finds_items_indexed_by_another_process(indexes):
+    first = add_found_item()
+    assert first in lost_and_found.get_vector_index('found') # Loaded and synced once by this process
+    # Reported through another process: committed to the DB, absent from this process's copy of the index
+    second = db.session.execute(db.insert(Item).values(status='found', item_type='Wallet/Purse', location='Library', image_filename='y.jpg',
+                                                       contact_info='c', ai_description=DESCRIPTION)).inserted_primary_key[0]
+    db.session.commit()
+    scores = lost_and_found.score_embedding({"ai_description": DESCRIPTION}, [first, second], CascadeContext(), CascadeStage('embedding', top_k=5))
+    assert sorted(scores.ids) == [first, second]
+    assert scores.scores[0] == pytest.approx(scores.scores[1])
+
+
+def test_undescribed_candidates_are_not_embedded(indexes):
+    first = add_found_item(); pending = add_found_item(description=None)
+    index = lost_and_found.get_vector_index('found')
+    assert lost_and_found.index_missing_candidates(index, [first, pending]) == 0
+    assert pending not in index
+
+
+def test_saved_index_round_trips(tmp_path):
+    embedder = get_embedder('local', dim=32)
+    index = VectorIndex(str(tmp_path / 'index.npz'), embedder.name)
+    index.add(7, embedder.embed(DESCRIPTION)); index.add(9, embedder.embed("A red umbrella."))
+    index.save()
+    loaded = VectorIndex.load(str(tmp_path / 'index.npz'), embedder.name)
+    assert loaded.ids == {7, 9} and loaded.search(embedder.embed(DESCRIPTION), 1)[0][0] == 7
+    assert [path.name for path in tmp_path.iterdir()] == ['index.npz'] # No temporary file left behind
+    assert VectorIndex.load(str(tmp_path / 'index.npz'), 'other-backend').ids == set()
@@ -0,0 +1,4 @@
+"""WSGI entry point for production servers: `gunicorn -c gunicorn.conf.py wsgi:app` (or any WSGI server)."""
+from app import create_app
+
+app = create_app()